@@ -1,11 +1,27 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
-from typing import Optional
-from openai_integration import OpenAIIntegration
+from typing import List, Optional
+from datetime import date
+from openai_integration import OpenAIIntegration, get_call_stats
+from job_store import create_job_store, run_leased, SQLiteJobStore
+from response_cache import create_response_cache, make_cache_key
+from scheduler import ScheduledPlanStore, create_scheduler
+from metrics import Counter, Gauge, Histogram, CONTENT_TYPE, render as render_metrics
+from prompts import FormData, PROMPT_TEMPLATE_VERSION, generate_lecture_plan_prompt, generate_feedback_prompt
+from feedback_pipeline import (
+    split_transcript, should_chunk, notes_as_transcript, summarize_chunks_async, stream_report_sections_async,
+    generate_report_json_async
+)
+from stream_parser import FeedbackReportStreamParser
+from schemas import OUTPUT_FORMATS, schema_fingerprint, schema_instructions, validate_result, repair_prompt
 from dotenv import load_dotenv
 import os
+import json
+import socket
+import time
 import asyncio
-from fastapi.responses import JSONResponse
+import threading
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # Load environment variables
@@ -27,166 +43,507 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI integration with error handling
-try:
-    ai = OpenAIIntegration()
-except Exception as e:
-    print(f"Error initializing OpenAI integration: {str(e)}")
-    raise
-
-# Store for ongoing requests
-ongoing_requests = {}
-
-class FormData(BaseModel):
-    grade: str
-    topic: str
-    country: str
-    location: str
-    number_of_students: str
-    teaching_tenure_years: str
-    percentage_of_girls: str
-    percentage_of_boys: str
-    attendance_percentage: str
-    grade_level_competence: str
-    classroom_challenges: str
-    lecture_transcript: Optional[str] = None
-
-def generate_lecture_plan_prompt(form_data: FormData) -> str:
-    """Generate the prompt for lecture plan generation."""
-    # Extract subject from topic
-    subject = form_data.topic.split(' - ')[0] if ' - ' in form_data.topic else form_data.topic
-    
-    return f"""
-    Create a detailed lecture plan for teaching {form_data.topic} to grade {form_data.grade} students.
-    Consider the following context:
-    - Class size: {form_data.number_of_students} students
-    - Grade level competence: {form_data.grade_level_competence}
-    - Location: {form_data.location}
-    - Classroom challenges: {form_data.classroom_challenges}
-    
-    Please provide a structured lecture plan that includes:
-    
-    1. SUBTOPICS BREAKDOWN
-    - List 4-6 key subtopics that should be covered
-    - For each subtopic, provide:
-      * A brief summary of the content
-      * Estimated time allocation (in minutes)
-      * Key learning objectives
-    
-    2. ENGAGEMENT STRATEGIES
-    - For each subtopic, suggest:
-      * An interactive activity or demonstration
-      * A real-world example or application
-      * A way to check for understanding
-    
-    3. DIFFERENTIATION STRATEGIES
-    - How to support struggling students
-    - How to challenge advanced students
-    - How to maintain engagement for all ability levels
-    
-    4. TIMING AND PACING
-    - Total lecture duration
-    - Time allocation for each subtopic
-    - Suggested breaks or transitions
-    
-    Format the response in a clear, structured way that's easy to follow.
-    Consider the cultural context of {form_data.location} and the specific challenges mentioned.
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time responses per endpoint."""
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so request IDs do not create new series
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+        HTTP_LATENCY.observe(time.monotonic() - started, method=request.method, path=path)
+
+# OpenAI integration, created on first use so the API starts (and reports liveness) quickly
+_ai = None
+_ai_lock = threading.Lock()
+
+def get_ai() -> OpenAIIntegration:
     """
+    Return the shared OpenAI integration, creating it on first use.
+    
+    Raises:
+        HTTPException: 503 if the integration cannot be initialized, e.g. no API key is configured
+    """
+    global _ai
+    if _ai is None:
+        with _ai_lock:
+            if _ai is None:
+                try:
+                    _ai = OpenAIIntegration()
+                except Exception as e:
+                    print(f"Error initializing OpenAI integration: {str(e)}")
+                    raise HTTPException(status_code=503, detail=f"OpenAI integration unavailable: {str(e)}")
+    return _ai
 
-def generate_feedback_prompt(form_data: FormData) -> str:
-    """Generate the prompt for feedback generation."""
-    if not form_data.lecture_transcript:
-        raise HTTPException(status_code=400, detail="Lecture transcript is required for feedback generation")
-        
-    # Extract subject from topic
-    subject = form_data.topic.split(' - ')[0] if ' - ' in form_data.topic else form_data.topic
-    
-    return f"""
-    We are teaching grade {form_data.grade} the topic {form_data.topic} in {form_data.country}. 
-    My class is based out of {form_data.location}. There are {form_data.number_of_students} in my class, 
-    {form_data.percentage_of_girls} of girls and {form_data.percentage_of_boys} of boys.
-    The attendance is expected to be {form_data.attendance_percentage}, and the grade level competence 
-    of my students is {form_data.grade_level_competence}. I have been teaching this grade for 
-    {form_data.teaching_tenure_years}. The challenges I face are usually {form_data.classroom_challenges}. 
-    
-    Below is the transcript of my recent lecture. Please provide specific, actionable feedback based on the actual content of this lecture.
-    For each point below, provide:
-    1. A specific observation from the lecture
-    2. A concrete suggestion for improvement
-    3. An example of how to implement the suggestion
-
-    LECTURE TRANSCRIPT:
-    {form_data.lecture_transcript}
-    
-    Please provide feedback for EACH of the following points, specifically tailored for teaching {subject} at the {form_data.grade} grade level:
-
-    DOMAIN 1: PLANNING AND PREPARATION
-    1. Lecture Sequence: How well does the lecture sequence build understanding of {subject} concepts?
-    2. Mixed Ability Levels: Are the examples and explanations appropriate for the mixed ability levels in {form_data.grade} grade?
-    3. Key Concepts: How effectively are key {subject} concepts introduced and connected?
-    4. Misconceptions: What specific misconceptions might {form_data.grade} grade students have about {subject}?
-    5. Lesson Structure: How could the lesson be better structured for different learning levels in {form_data.grade} grade?
-
-    DOMAIN 2: CLASSROOM ENVIRONMENT
-    1. Student Engagement: How can the lecture be made more engaging for {form_data.grade} grade students with varying abilities?
-    2. Attention Maintenance: What specific strategies could be used to maintain student attention during {subject} concepts?
-    3. Content Relevance: How can the {subject} content be made more relevant to {form_data.grade} grade students' lives?
-    4. Interactive Learning: What specific activities could be added to make the {subject} learning more interactive?
-    5. Learning Styles: How can the lecture better accommodate different learning styles for {form_data.grade} grade students?
-
-    DOMAIN 3: INSTRUCTION
-    1. Problem-Solving Steps: How effectively are the steps for {subject} concepts explained?
-    2. Visual Aids: What specific visual aids or examples could enhance understanding of {subject}?
-    3. Concept Explanation: How could the explanation of key {subject} concepts be improved?
-    4. Practice Opportunities: What specific practice opportunities could be added for {form_data.grade} grade level?
-    5. Differentiated Instruction: How could the lecture better address the needs of students at different grade levels?
-
-    For each point above, provide specific examples and concrete suggestions that can be implemented immediately in the classroom.
-    Consider the cultural context of {form_data.location} and the specific challenges mentioned: {form_data.classroom_challenges}.
+# Store for ongoing requests (in-memory or SQLite, see job_store.py)
+job_store = create_job_store()
+
+# "inline" runs jobs in this process; "worker" leaves them queued for worker.py processes
+JOB_EXECUTION = os.getenv("JOB_EXECUTION", "inline").lower()
+if JOB_EXECUTION not in ("inline", "worker"):
+    raise ValueError(f"Unknown JOB_EXECUTION: {JOB_EXECUTION}")
+if JOB_EXECUTION == "worker" and not isinstance(job_store, SQLiteJobStore):
+    raise ValueError("JOB_EXECUTION=worker requires JOB_STORE_BACKEND=sqlite so all processes share jobs")
+
+# Jobs run inline are claimed by this process and their lease renewed while they run, so
+# other API processes sharing the store only take them over once this one has died
+PROCESS_ID = f"{socket.gethostname()}-{os.getpid()}"
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+
+# Keep references to jobs resumed at startup so they are not garbage collected
+resumed_jobs = set()
+
+# Cache of generated responses keyed by prompt, model and sampling parameters
+response_cache = create_response_cache()
+
+# Registered upcoming lectures and their pre-generated plans
+scheduled_plans = ScheduledPlanStore(os.getenv("SCHEDULE_STORE_PATH", "scheduled_plans.db"))
+
+# Upper bound on forms per batch and on batch items generated at once in this process
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Minimum seconds between writes of a job's partial text to the store
+PARTIAL_UPDATE_INTERVAL = float(os.getenv("PARTIAL_UPDATE_INTERVAL", "0.5"))
+
+# Exported on /metrics; upstream latency, tokens and errors are recorded in openai_integration
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by endpoint and status code", ["method", "path", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time to produce the HTTP response", ["method", "path"])
+PROMPT_BUILD_SECONDS = Histogram(
+    "prompt_build_seconds", "Time to build a prompt from a form", ["kind"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+)
+QUEUE_WAIT_SECONDS = Histogram("job_queue_wait_seconds", "Time from job submission until generation starts", ["kind"])
+JOB_SECONDS = Histogram("job_duration_seconds", "Time from submission to the end of a job or stream", ["kind", "outcome"])
+JOB_ERRORS = Counter("job_errors_total", "Jobs and streams that ended in an error", ["kind"])
+JOBS_IN_FLIGHT = Gauge("jobs_in_flight", "Jobs and streams being generated by this process", ["kind"])
+STRUCTURED_REPAIRS = Counter(
+    "structured_output_repairs_total", "JSON replies that failed validation and were sent back for repair", ["schema"]
+)
+JOBS_QUEUED = Gauge("jobs_queued", "Jobs waiting in the job store for a free slot or worker")
+JOBS_QUEUED.set_function(lambda: job_store.count_by_status().get("queued", 0))
+
+# Feedback generation strategies; "single" sends the whole transcript in one prompt
+FEEDBACK_MODES = ("single", "chunked", "per_domain")
+
+class BatchRequest(BaseModel):
+    forms: List[FormData]
+
+class ScheduledLecture(BaseModel):
+    form: FormData
+    lecture_date: date
+
+def cache_key_for(prompt: str, mode: Optional[str] = None, schema: Optional[str] = None) -> str:
+    """Return the response cache key for a prompt sent with the current model settings."""
+    ai = get_ai()
+    params = ai.generation_params()
+    if mode:
+        params = dict(params, mode=mode)
+    if schema:
+        params = dict(params, schema=schema, schema_version=schema_fingerprint(schema))
+    return make_cache_key(prompt, ai.model, params, PROMPT_TEMPLATE_VERSION)
+
+def build_prompt(kind: str, build, form_data: FormData) -> str:
+    """Build a prompt, recording how long it took."""
+    with PROMPT_BUILD_SECONDS.time(kind=kind):
+        return build(form_data)
+
+def resolve_feedback_mode(form_data: FormData) -> Optional[str]:
+    """
+    Pick the feedback strategy for a form.
+    
+    Long transcripts use map-reduce unless the client asks otherwise. Returns None
+    for the default single-prompt strategy so its jobs and cache keys are unchanged.
     """
+    mode = form_data.feedback_mode
+    if mode is None:
+        mode = "chunked" if should_chunk(form_data.lecture_transcript) else "single"
+    if mode not in FEEDBACK_MODES:
+        raise HTTPException(status_code=400, detail=f"feedback_mode must be one of: {', '.join(FEEDBACK_MODES)}")
+    return None if mode == "single" else mode
 
-async def generate_response(request_id: str, prompt: str):
+def resolve_schema(kind: str, form_data: FormData, mode: Optional[str] = None) -> Optional[str]:
+    """Return the schema a job's reply must match, or None for plain text output."""
+    output_format = form_data.output_format or "text"
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}")
+    if output_format == "text":
+        return None
+    if kind == "lecture_plan":
+        return "lecture_plan"
+    return "feedback_report" if mode == "per_domain" else "feedback"
+
+async def parse_structured(schema: str, text: str):
+    """
+    Validate a JSON reply, asking the model once to repair it if validation fails.
+    
+    Returns:
+        tuple: (result, text) with the validated object and the text it came from
+    
+    Raises:
+        ValueError: If the reply is still invalid after the repair
+    """
+    try:
+        return validate_result(schema, text), text
+    except ValueError as e:
+        # A short repair call is cheaper than the user regenerating the whole reply
+        print(f"Repairing invalid {schema} reply: {str(e)}")
+        STRUCTURED_REPAIRS.inc(schema=schema)
+        repaired = await get_ai().get_response_async(repair_prompt(schema, text, str(e)), json_mode=True)
+        if not repaired:
+            raise
+        return validate_result(schema, repaired), repaired
+
+def cached_response(cache_key: str, schema: Optional[str] = None, scheduled: bool = False):
+    """
+    Look up a generated response.
+    
+    An entry that does not validate against its schema, e.g. one stored by an
+    older version of the schema, counts as a miss and is generated again.
+    
+    Args:
+        cache_key (str): Key from cache_key_for
+        schema (str, optional): Schema the response must match
+        scheduled (bool): Also look for plans pre-generated by the off-peak scheduler
+    
+    Returns:
+        tuple: (text, result), or None if there is no usable response
+    """
+    cached = response_cache.get(cache_key)
+    if not cached and scheduled:
+        # Plans pre-generated overnight outlive cache eviction in the schedule store
+        cached = scheduled_plans.find_generated(cache_key)
+        if cached:
+            response_cache.put(cache_key, cached)
+    if not cached:
+        return None
+    if not schema:
+        return cached, None
+    try:
+        return cached, validate_result(schema, cached)
+    except ValueError as e:
+        print(f"Ignoring cached {schema} reply that no longer validates: {str(e)}")
+        return None
+
+async def generation_stream(prompt: str, mode: Optional[str] = None, form: Optional[dict] = None,
+                            schema: Optional[str] = None):
+    """Yield the response text of a job using the strategy it was submitted with."""
+    ai = get_ai()
+    if mode == "chunked" or (mode == "per_domain" and should_chunk(form["lecture_transcript"])):
+        # Map: analyse transcript segments in parallel. Reduce: the usual feedback prompt over the notes
+        chunks = split_transcript(form["lecture_transcript"])
+        notes = await summarize_chunks_async(ai, form, chunks)
+        form = dict(form, lecture_transcript=notes_as_transcript(notes))
+        prompt = generate_feedback_prompt(FormData(**form))
+    
+    if mode == "per_domain":
+        # Overall feedback and each domain are written concurrently, in the dashboard report format
+        if schema:
+            yield await generate_report_json_async(ai, form)
+            return
+        async for chunk in stream_report_sections_async(ai, form):
+            yield chunk
+        return
+    
+    if schema:
+        prompt += schema_instructions(schema)
+    async for chunk in ai.stream_response_async(prompt, json_mode=schema is not None):
+        yield chunk
+
+async def generate_response(request_id: str, prompt: str, mode: Optional[str] = None, form: Optional[dict] = None,
+                            schema: Optional[str] = None):
     """Generate response asynchronously"""
+    kind = request_id.rsplit("_", 1)[0]
+    job = job_store.get(request_id)
+    submitted = job["created_at"] if job else time.time()
+    QUEUE_WAIT_SECONDS.observe(time.time() - submitted, kind=kind)
+    
+    with JOBS_IN_FLIGHT.track_inprogress(kind=kind):
+        outcome = await _run_generation(request_id, prompt, mode, form, schema)
+    
+    JOB_SECONDS.observe(time.time() - submitted, kind=kind, outcome=outcome)
+    if outcome == "error":
+        JOB_ERRORS.inc(kind=kind)
+
+async def _run_generation(request_id: str, prompt: str, mode: Optional[str], form: Optional[dict],
+                          schema: Optional[str]) -> str:
+    """Generate a job's response; returns "completed", "cached" or "error"."""
     try:
-        response = ai.get_response(prompt)
+        # An identical job may have finished while this one was queued
+        cache_key = cache_key_for(prompt, mode, schema)
+        cached = cached_response(cache_key, schema)
+        if cached:
+            text, result = cached
+            job_store.update(request_id, status="completed", data=text, result=result, cached=True)
+            return "cached"
+        
+        job_store.update(request_id, status="processing", partial="")
+        
+        # Stream the upstream call so pollers can see the text produced so far
+        chunks = []
+        started = time.monotonic()
+        last_update = started
+        async for chunk in generation_stream(prompt, mode, form, schema):
+            chunks.append(chunk)
+            if time.monotonic() - last_update >= PARTIAL_UPDATE_INTERVAL:
+                job_store.update(request_id, partial="".join(chunks))
+                last_update = time.monotonic()
+        
+        response = "".join(chunks)
         if response:
-            ongoing_requests[request_id] = {
-                "status": "completed",
-                "data": response
-            }
-        else:
-            ongoing_requests[request_id] = {
-                "status": "error",
-                "error": "Failed to generate response"
-            }
+            result = None
+            if schema:
+                result, response = await parse_structured(schema, response)
+            response_cache.put(cache_key, response, cost=time.monotonic() - started)
+            job_store.update(request_id, status="completed", data=response, result=result, partial=None)
+            return "completed"
+        job_store.update(request_id, status="error", error="Failed to generate response")
+        return "error"
     except Exception as e:
-        ongoing_requests[request_id] = {
-            "status": "error",
-            "error": str(e)
+        print(f"Error generating response for {request_id}: {str(e)}")
+        job_store.update(request_id, status="error", error=str(e))
+        return "error"
+
+async def run_job(job: dict):
+    """Run a stored job."""
+    await generate_response(job["id"], job["prompt"], job.get("mode"), job.get("form"), job.get("schema"))
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_parser_for(kind: str, mode: Optional[str], schema: Optional[str]):
+    """Return an incremental parser if the reply is in the dashboard report format, else None."""
+    if kind == "feedback" and mode == "per_domain" and not schema:
+        return FeedbackReportStreamParser()
+    return None
+
+def parsed_events(parser, text: str = "", close: bool = False) -> list:
+    """Feed streamed text to the parser and format the sections and items it completed as server-sent events."""
+    if parser is None:
+        return []
+    events = parser.feed(text)
+    if close:
+        events += parser.close()
+    return [sse_event(event["event"], {key: value for key, value in event.items() if key != "event"}) for event in events]
+
+async def stream_generation(kind: str, prompt: str, mode: Optional[str] = None, form: Optional[dict] = None,
+                            schema: Optional[str] = None):
+    """Forward upstream tokens as server-sent events as soon as they arrive."""
+    # Replies in the report format also get section and item events as each one completes
+    parser = stream_parser_for(kind, mode, schema)
+    kind = f"{kind}_stream"
+    started = time.monotonic()
+    outcome = "error"
+    JOBS_IN_FLIGHT.inc(kind=kind)
+    try:
+        cache_key = cache_key_for(prompt, mode, schema)
+        cached = cached_response(cache_key, schema)
+        if cached:
+            text, result = cached
+            outcome = "cached"
+            yield sse_event("delta", {"text": text})
+            for event in parsed_events(parser, text, close=True):
+                yield event
+            yield sse_event("done", {"cached": True, "result": result})
+            return
+        
+        chunks = []
+        async for chunk in generation_stream(prompt, mode, form, schema):
+            chunks.append(chunk)
+            yield sse_event("delta", {"text": chunk})
+            for event in parsed_events(parser, chunk):
+                yield event
+        for event in parsed_events(parser, close=True):
+            yield event
+        
+        result = None
+        if chunks:
+            response = "".join(chunks)
+            if schema:
+                result, response = await parse_structured(schema, response)
+            response_cache.put(cache_key, response, cost=time.monotonic() - started)
+            outcome = "completed"
+        yield sse_event("done", {"result": result} if schema else {})
+    except Exception as e:
+        print(f"Error streaming response: {str(e)}")
+        yield sse_event("error", {"error": str(e)})
+    finally:
+        JOBS_IN_FLIGHT.dec(kind=kind)
+        JOB_SECONDS.observe(time.monotonic() - started, kind=kind, outcome=outcome)
+        if outcome == "error":
+            JOB_ERRORS.inc(kind=kind)
+
+def sse_response(kind: str, prompt: str, mode: Optional[str] = None, form: Optional[dict] = None,
+                 schema: Optional[str] = None) -> StreamingResponse:
+    """Wrap stream_generation in a response that proxies will not buffer."""
+    # Fail with a 503 before the stream starts if OpenAI is not configured
+    get_ai()
+    return StreamingResponse(
+        stream_generation(kind, prompt, mode, form, schema),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def create_job(kind: str, prompt: str, mode: Optional[str] = None, form: Optional[dict] = None,
+               schema: Optional[str] = None, in_batch: bool = False):
+    """
+    Register a generation job, completing it immediately if the response is cached.
+    
+    Args:
+        kind (str): Job type, used as the request ID prefix
+        prompt (str): Prompt to generate from
+        mode (str, optional): Generation strategy other than a single prompt
+        form (dict, optional): Form data the strategy needs
+        schema (str, optional): Schema of a JSON reply, see schemas.SCHEMAS
+        in_batch (bool): The job is a batch item; /status then leaves it for /batch to report
+    
+    Returns:
+        tuple: (request_id, cached) where cached is True if no generation is needed
+    """
+    cache_key = cache_key_for(prompt, mode, schema)
+    cached = cached_response(cache_key, schema, scheduled=True)
+    extra = {"in_batch": True} if in_batch else {}
+    if cached:
+        text, result = cached
+        return job_store.create(
+            kind, status="completed", prompt=prompt, data=text, result=result, cached=True, **extra
+        ), True
+    
+    if mode:
+        extra.update(mode=mode, form=form)
+    if schema:
+        extra["schema"] = schema
+    if JOB_EXECUTION == "inline":
+        # Owned by this process from the start, so no other process resumes it
+        extra.update(status="processing", worker_id=PROCESS_ID)
+    return job_store.create(kind, prompt=prompt, **extra), False
+
+def submit_job(kind: str, prompt: str, background_tasks: BackgroundTasks,
+               mode: Optional[str] = None, form: Optional[dict] = None, schema: Optional[str] = None) -> dict:
+    """
+    Register a generation job and return the response for the client.
+    
+    Cached responses complete the job immediately; otherwise the job runs in this
+    process or is left queued for the worker pool.
+    """
+    request_id, cached = create_job(kind, prompt, mode, form, schema)
+    if cached:
+        return {
+            "status": "completed",
+            "request_id": request_id,
+            "message": "Result served from cache. Use the request_id to fetch it."
         }
+    
+    if JOB_EXECUTION == "inline":
+        background_tasks.add_task(run_owned_job, job_store.get(request_id))
+    
+    return {
+        "status": "processing",
+        "request_id": request_id,
+        "message": "Request accepted. Use the request_id to check status."
+    }
+
+async def run_owned_job(job: dict):
+    """Run a job this process has claimed, renewing its lease until it finishes."""
+    await run_leased(job_store, job, PROCESS_ID, JOB_LEASE_SECONDS, run_job)
+
+async def run_batch(items: list):
+    """Generate batch items with at most BATCH_CONCURRENCY upstream calls in flight."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run_item(job: dict):
+        async with semaphore:
+            await generate_response(job["id"], job["prompt"], schema=job.get("schema"))
+    
+    # Items waiting for a slot keep their lease too
+    await asyncio.gather(*(
+        run_leased(job_store, {"id": request_id, "prompt": prompt, "schema": schema}, PROCESS_ID, JOB_LEASE_SECONDS, run_item)
+        for request_id, prompt, schema in items
+    ))
+
+def store_pregenerated_plan(record: dict, text: str, seconds: float):
+    """Put an overnight plan in the response cache so the morning request is a cache hit."""
+    response_cache.put(record["cache_key"], text, cost=seconds)
+
+async def generate_scheduled_plan(prompt: str):
+    """Generate a scheduled plan with the shared OpenAI integration."""
+    return await get_ai().get_response_async(prompt)
+
+# Generates registered lectures overnight at a controlled rate
+plan_scheduler = create_scheduler(scheduled_plans, generate_scheduled_plan, store_pregenerated_plan)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+scheduler_task = None
+
+@app.on_event("startup")
+async def start_scheduler():
+    """Run the off-peak scheduler alongside the API."""
+    global scheduler_task
+    if SCHEDULER_ENABLED:
+        scheduler_task = asyncio.create_task(plan_scheduler.run())
+
+# Open a connection to OpenAI at startup so the first request does not pay for it
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+warm_up_state = "disabled"
+warm_up_task = None
+
+async def run_warm_up():
+    """Create the OpenAI integration and open a pooled connection; never raises."""
+    global warm_up_state
+    warm_up_state = "pending"
+    try:
+        seconds = await get_ai().warm_up_async()
+        warm_up_state = "ok"
+        print(f"Warmed up OpenAI connection in {seconds:.2f}s")
+    except HTTPException as e:
+        warm_up_state = f"failed: {e.detail}"
+    except Exception as e:
+        warm_up_state = f"failed: {str(e)}"
+    if warm_up_state != "ok":
+        print(f"OpenAI warm-up {warm_up_state}")
+
+@app.on_event("startup")
+async def start_warm_up():
+    """Warm up in the background so startup itself is not delayed."""
+    global warm_up_task
+    if WARMUP_ON_STARTUP:
+        warm_up_task = asyncio.create_task(run_warm_up())
+
+@app.on_event("startup")
+async def resume_pending_jobs():
+    """Restart jobs that were queued, or whose process stopped while running them."""
+    if JOB_EXECUTION == "worker":
+        # Workers pick up queued jobs and reclaim ones whose lease expired
+        return
+    
+    # Claimed like a worker would, so jobs another live process is running are left alone
+    while True:
+        job = job_store.claim(PROCESS_ID, JOB_LEASE_SECONDS)
+        if job is None:
+            break
+        task = asyncio.create_task(run_owned_job(job))
+        resumed_jobs.add(task)
+        task.add_done_callback(resumed_jobs.discard)
 
 @app.post("/generate-lecture-plan")
 async def generate_lecture_plan(form_data: FormData, background_tasks: BackgroundTasks):
     """Generate a lecture plan based on form data."""
     try:
-        # Generate unique request ID
-        request_id = f"lecture_plan_{len(ongoing_requests)}"
-        
-        # Initialize request status
-        ongoing_requests[request_id] = {"status": "processing"}
-        
         # Generate prompt
-        prompt = generate_lecture_plan_prompt(form_data)
-        
-        # Start background task
-        background_tasks.add_task(generate_response, request_id, prompt)
+        prompt = build_prompt("lecture_plan", generate_lecture_plan_prompt, form_data)
         
-        return {
-            "status": "processing",
-            "request_id": request_id,
-            "message": "Request accepted. Use the request_id to check status."
-        }
+        # Register the job (or serve it from cache) under a unique request ID
+        schema = resolve_schema("lecture_plan", form_data)
+        return submit_job("lecture_plan", prompt, background_tasks, schema=schema)
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate-feedback")
@@ -196,51 +553,191 @@ async def generate_feedback(form_data: FormData, background_tasks: BackgroundTas
         if not form_data.lecture_transcript:
             raise HTTPException(status_code=400, detail="Lecture transcript is required")
         
-        # Generate unique request ID
-        request_id = f"feedback_{len(ongoing_requests)}"
-        
-        # Initialize request status
-        ongoing_requests[request_id] = {"status": "processing"}
-        
         # Generate prompt
-        prompt = generate_feedback_prompt(form_data)
+        prompt = build_prompt("feedback", generate_feedback_prompt, form_data)
+        mode = resolve_feedback_mode(form_data)
         
-        # Start background task
-        background_tasks.add_task(generate_response, request_id, prompt)
-        
-        return {
-            "status": "processing",
-            "request_id": request_id,
-            "message": "Request accepted. Use the request_id to check status."
-        }
+        # Register the job (or serve it from cache) under a unique request ID
+        schema = resolve_schema("feedback", form_data, mode)
+        return submit_job("feedback", prompt, background_tasks, mode, form_data.model_dump() if mode else None, schema)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate-lecture-plans/batch")
+async def generate_lecture_plans_batch(batch: BatchRequest, background_tasks: BackgroundTasks):
+    """Generate lecture plans for many forms under a single batch ID."""
+    if not batch.forms:
+        raise HTTPException(status_code=400, detail="At least one form is required")
+    if len(batch.forms) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} forms")
+    
+    item_ids = []
+    to_generate = []
+    for form_data in batch.forms:
+        prompt = build_prompt("lecture_plan", generate_lecture_plan_prompt, form_data)
+        schema = resolve_schema("lecture_plan", form_data)
+        request_id, cached = create_job("lecture_plan", prompt, schema=schema, in_batch=True)
+        item_ids.append(request_id)
+        if not cached:
+            to_generate.append((request_id, prompt, schema))
+    
+    # The batch record only lists its items; it is never run or resumed itself
+    batch_id = job_store.create("batch", status="batch", item_ids=item_ids)
+    
+    if to_generate and JOB_EXECUTION == "inline":
+        background_tasks.add_task(run_batch, to_generate)
+    
+    return {
+        "status": "processing" if to_generate else "completed",
+        "batch_id": batch_id,
+        "total": len(item_ids),
+        "message": "Batch accepted. Use the batch_id to check progress."
+    }
+
+@app.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Report per-item progress and results of a batch."""
+    batch = job_store.get(batch_id)
+    if batch is None or batch["status"] != "batch":
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    items = []
+    counts = {"completed": 0, "error": 0, "processing": 0, "expired": 0}
+    for request_id in batch["item_ids"]:
+        job = job_store.get(request_id)
+        if job is None:
+            item = {"request_id": request_id, "status": "expired"}
+        elif job["status"] == "completed":
+            item = {"request_id": request_id, "status": "completed", "data": job["data"], "result": job.get("result")}
+        elif job["status"] == "error":
+            item = {"request_id": request_id, "status": "error", "error": job["error"]}
+        else:
+            item = {"request_id": request_id, "status": "processing"}
+        counts[item["status"]] += 1
+        items.append(item)
+    
+    return {
+        "status": "processing" if counts["processing"] else "completed",
+        "total": len(items),
+        **counts,
+        "items": items
+    }
+
+@app.post("/generate-lecture-plan/stream")
+async def stream_lecture_plan(form_data: FormData):
+    """Stream a lecture plan as server-sent events while it is generated."""
+    prompt = build_prompt("lecture_plan", generate_lecture_plan_prompt, form_data)
+    return sse_response("lecture_plan", prompt, schema=resolve_schema("lecture_plan", form_data))
+
+@app.post("/generate-feedback/stream")
+async def stream_feedback(form_data: FormData):
+    """Stream teaching feedback as server-sent events while it is generated."""
+    prompt = build_prompt("feedback", generate_feedback_prompt, form_data)
+    mode = resolve_feedback_mode(form_data)
+    schema = resolve_schema("feedback", form_data, mode)
+    return sse_response("feedback", prompt, mode, form_data.model_dump() if mode else None, schema)
+
+@app.post("/scheduled-lecture-plans")
+async def schedule_lecture_plan(scheduled: ScheduledLecture):
+    """Register an upcoming lecture whose plan is generated off-peak before the lecture date."""
+    if scheduled.lecture_date < date.today():
+        raise HTTPException(status_code=400, detail="Lecture date must not be in the past")
+    
+    prompt = generate_lecture_plan_prompt(scheduled.form)
+    schedule_id = scheduled_plans.register(
+        scheduled.lecture_date, scheduled.form.model_dump(), prompt, cache_key_for(prompt)
+    )
+    return {
+        "status": "scheduled",
+        "schedule_id": schedule_id,
+        "message": "Lecture registered. The plan will be generated off-peak before the lecture date."
+    }
+
+@app.get("/scheduled-lecture-plans/{schedule_id}")
+async def get_scheduled_lecture_plan(schedule_id: str):
+    """Get a registered lecture and its plan once generated."""
+    record = scheduled_plans.get(schedule_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Scheduled lecture not found")
+    
+    return {
+        "status": record["status"],
+        "lecture_date": record["lecture_date"],
+        "data": record["data"],
+        "error": record["error"]
+    }
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: OpenAI is configured, the job store answers and any startup warm-up is done."""
+    checks = {}
+    try:
+        get_ai()
+        checks["openai"] = "ok"
+    except HTTPException as e:
+        checks["openai"] = e.detail
+    try:
+        job_store.count_by_status()
+        checks["job_store"] = "ok"
+    except Exception as e:
+        checks["job_store"] = f"error: {str(e)}"
+    if WARMUP_ON_STARTUP:
+        checks["warm_up"] = warm_up_state
+    
+    ready = all(value in ("ok", "disabled") for value in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Expose latency histograms, counters and gauges in the Prometheus text format."""
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report response cache hit/miss counters and tier sizes."""
+    return response_cache.stats()
+
+@app.get("/upstream/stats")
+async def upstream_stats():
+    """Report upstream retry/hedge counters and recent latency percentiles."""
+    return get_call_stats()
+
 @app.get("/status/{request_id}")
 async def get_status(request_id: str):
     """Get the status of a request"""
-    if request_id not in ongoing_requests:
+    status = job_store.get(request_id)
+    if status is None or status["status"] == "batch":
         raise HTTPException(status_code=404, detail="Request not found")
     
-    status = ongoing_requests[request_id]
-    
+    # Batch items stay until they expire so /batch can still report them
+    in_batch = status.get("in_batch", False)
     if status["status"] == "completed":
         # Clean up completed request
-        response_data = ongoing_requests.pop(request_id)
+        response_data = status if in_batch else job_store.pop(request_id)
         return {
             "status": "success",
-            "data": response_data["data"]
+            "data": response_data["data"],
+            "result": response_data.get("result")
         }
     elif status["status"] == "error":
         # Clean up failed request
-        error_data = ongoing_requests.pop(request_id)
+        error_data = status if in_batch else job_store.pop(request_id)
         raise HTTPException(status_code=500, detail=error_data["error"])
     else:
         return {
             "status": "processing",
-            "message": "Request is still being processed"
+            "message": "Request is still being processed",
+            "partial": status.get("partial") or ""
         }
 
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+"""
+Disk-backed buffer for the audio of a recording.
+
+Captured segments are appended to a spool file as they arrive and only the last
+few are kept in memory, so memory use does not grow with the length of a lecture.
+Any segment can be read back by its index with segment(), e.g. by the recognizer.
+Every segment is flushed to disk before append() returns: if the recorder crashes,
+the spool file still holds everything captured up to that point.
+
+    python audio_buffer.py recordings/lecture-20240101-090000.spool lecture.wav
+
+exports a spool file, e.g. one left behind by a crash, as a WAV file.
+
+Spool format: an 8-byte file header (SPOOL_MAGIC), then one record per segment of
+a RECORD_HEADER (start offset in seconds, sample rate, sample width, codec, payload
+length) followed by the payload, raw PCM or FLAC.
+"""
+import argparse
+import array
+import glob
+import io
+import os
+import struct
+import threading
+import time
+import wave
+from collections import deque
+
+import speech_recognition as sr
+
+SPOOL_MAGIC = b"ASPOOL01"
+RECORD_HEADER = struct.Struct("<dIHBI")
+CODEC_RAW = 0
+CODEC_FLAC = 1
+
+# Where recordings are spooled, and whether segments are FLAC-compressed on disk
+AUDIO_SPOOL_DIR = os.getenv("AUDIO_SPOOL_DIR", "recordings")
+AUDIO_SPOOL_FLAC = os.getenv("AUDIO_SPOOL_FLAC", "0") == "1"
+
+
+class AudioSpool:
+    """Append-only file of audio segments with a small in-memory window of recent ones."""
+
+    def __init__(self, path, compress=False, window=4):
+        """
+        Args:
+            path (str): Spool file; created if missing, appended to otherwise
+            compress (bool): Store segments FLAC-compressed (needs the flac encoder speech_recognition uses)
+            window (int): Number of recent segments also kept in memory
+        """
+        self.path = path
+        self.compress = compress
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # File offset of each record, so segments can be read back without scanning
+        self._offsets = array.array("q")
+        self._end = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Continue an existing spool after its last complete record
+            offsets, self._end = _scan(path)
+            self._offsets.extend(offsets)
+            os.truncate(path, self._end)
+        self._file = open(path, "ab")
+        if self._end == 0:
+            self._file.write(SPOOL_MAGIC)
+            self._sync()
+            self._end = len(SPOOL_MAGIC)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, audio, start=0.0):
+        """
+        Write a segment to disk.
+
+        Args:
+            audio (sr.AudioData): The segment
+            start (float): Seconds from the start of the recording to the start of the segment
+
+        Returns:
+            int: Index of the segment in the recording
+        """
+        if self.compress:
+            codec, payload = CODEC_FLAC, audio.get_flac_data()
+        else:
+            codec, payload = CODEC_RAW, audio.get_raw_data()
+        header = RECORD_HEADER.pack(start, audio.sample_rate, audio.sample_width, codec, len(payload))
+
+        with self._lock:
+            self._file.write(header + payload)
+            self._sync()
+            index = len(self._offsets)
+            self._offsets.append(self._end)
+            self._end += len(header) + len(payload)
+            self._recent.append((index, start, audio))
+        return index
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def recent(self):
+        """The last few (start, AudioData) segments, from memory."""
+        with self._lock:
+            return [(start, audio) for _, start, audio in self._recent]
+
+    def segment(self, index):
+        """
+        One segment by the index append() returned, from memory if it is recent, else from disk.
+
+        Returns:
+            sr.AudioData: The segment
+
+        Raises:
+            IndexError: If there is no such segment
+        """
+        with self._lock:
+            for recent_index, _, audio in self._recent:
+                if recent_index == index:
+                    return audio
+            offset = self._offsets[index]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            _, sample_rate, sample_width, codec, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            payload = f.read(length)
+        return _decode(codec, payload, sample_rate, sample_width)
+
+    def segments(self):
+        """Every (start, AudioData) segment so far, read back from disk."""
+        return read_segments(self.path)
+
+    def export_wav(self, output_path, pad_gaps=True):
+        """Write the recording as a WAV file; see export_wav()."""
+        return export_wav(self.path, output_path, pad_gaps)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def clear(self):
+        """Close the spool and delete its file."""
+        self.close()
+        with self._lock:
+            self._recent.clear()
+            del self._offsets[:]
+            self._end = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _decode(codec, payload, sample_rate, sample_width):
+    if codec == CODEC_RAW:
+        return sr.AudioData(payload, sample_rate, sample_width)
+    with sr.AudioFile(io.BytesIO(payload)) as source:
+        audio = sr.Recognizer().record(source)
+    return sr.AudioData(audio.get_raw_data(sample_rate, sample_width), sample_rate, sample_width)
+
+
+def _scan(path):
+    """Return (offsets of the complete records, offset where they end) of a spool file."""
+    offsets = []
+    with open(path, "rb") as f:
+        if f.read(len(SPOOL_MAGIC)) != SPOOL_MAGIC:
+            raise ValueError(f"{path} is not an audio spool file")
+        end = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            length = RECORD_HEADER.unpack(header)[-1]
+            if f.tell() + length > size:
+                break
+            offsets.append(end)
+            end = f.seek(length, os.SEEK_CUR)
+    return offsets, end
+
+
+def _records(path):
+    """Yield the undecoded records of a spool file; a record cut short by a crash ends the file."""
+    with open(path, "rb") as f:
+        if f.read(len(SPOOL_MAGIC)) != SPOOL_MAGIC:
+            raise ValueError(f"{path} is not an audio spool file")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            start, sample_rate, sample_width, codec, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield start, sample_rate, sample_width, codec, payload
+
+
+def read_segments(path):
+    """
+    Yield (start, AudioData) for each segment in a spool file.
+
+    A record cut short by a crash ends the iteration instead of raising.
+
+    Raises:
+        ValueError: If the file is not a spool file
+    """
+    for start, sample_rate, sample_width, codec, payload in _records(path):
+        yield start, _decode(codec, payload, sample_rate, sample_width)
+
+
+def export_wav(spool_path, output_path, pad_gaps=True):
+    """
+    Write the segments of a spool file to one WAV file.
+
+    Args:
+        spool_path (str): Spool file
+        output_path (str): WAV file to write
+        pad_gaps (bool): Fill the pauses between segments with silence, so positions in the
+            WAV match time since the recording started
+
+    Returns:
+        int: Number of segments written
+    """
+    count = 0
+    written = 0
+    with wave.open(output_path, "wb") as out:
+        for start, audio in read_segments(spool_path):
+            if count == 0:
+                # Every segment is converted to the format of the first one
+                sample_rate, sample_width = audio.sample_rate, audio.sample_width
+                out.setnchannels(1)
+                out.setsampwidth(sample_width)
+                out.setframerate(sample_rate)
+            if pad_gaps:
+                gap = int(start * sample_rate) - written
+                if gap > 0:
+                    out.writeframes(b"\0" * gap * sample_width)
+                    written += gap
+            data = audio.get_raw_data(sample_rate, sample_width)
+            out.writeframes(data)
+            written += len(data) // sample_width
+            count += 1
+        if count == 0:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(16000)
+    return count
+
+
+def create_spool(directory=None, compress=None):
+    """Start a spool file for a new recording, named after the current time."""
+    directory = directory or AUDIO_SPOOL_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"lecture-{time.strftime('%Y%m%d-%H%M%S')}.spool")
+    return AudioSpool(path, AUDIO_SPOOL_FLAC if compress is None else compress)
+
+
+def find_spools(directory=None):
+    """Spool files in a directory, oldest first."""
+    return sorted(glob.glob(os.path.join(directory or AUDIO_SPOOL_DIR, "*.spool")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a recorded audio spool file as WAV")
+    parser.add_argument("spool", help="Spool file, e.g. one left in recordings/ by an interrupted recording")
+    parser.add_argument("output", help="WAV file to write")
+    parser.add_argument("--no-gaps", action="store_true", help="Join segments without the pauses between them")
+    args = parser.parse_args()
+
+    count = export_wav(args.spool, args.output, pad_gaps=not args.no_gaps)
+    print(f"Wrote {count} segments to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
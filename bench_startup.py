@@ -0,0 +1,100 @@
+"""
+Measure how long the API and the workers take to start.
+
+    python bench_startup.py                 # import times, API cold start, worker respawn
+    python bench_startup.py --runs 10 --port 8123
+
+Every measurement runs in a fresh Python process, as a restart or a respawned
+worker would. No OpenAI request is made, so a placeholder key is enough.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Modules on the startup path of api.py and worker.py, cheapest first
+MODULES = ("config", "metrics", "job_store", "prompts", "openai_integration", "fastapi", "api")
+
+# Imports api the way a worker process does and reports when it could claim a job
+WORKER_SNIPPET = "import api; api.job_store.count_by_status(); print('ready', flush=True)"
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env["SCHEDULER_ENABLED"] = "0"
+    return env
+
+
+def import_time(module):
+    """Seconds a fresh interpreter takes to import module, excluding interpreter startup."""
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], env=_env(), capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _port_free(port):
+    with socket.socket() as s:
+        return s.connect_ex(("127.0.0.1", port)) != 0
+
+
+def api_cold_start(port, timeout=60):
+    """Seconds from launching uvicorn until /healthz answers."""
+    if not _port_free(port):
+        raise SystemExit(f"Port {port} is in use")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"API did not answer /healthz within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def worker_respawn():
+    """Seconds from spawning a worker-like process until it has the job store open."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", WORKER_SNIPPET], env=_env(), stdout=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            if line.strip() == "ready":
+                return time.perf_counter() - started
+        raise RuntimeError("Worker exited before it was ready")
+    finally:
+        process.wait()
+
+
+def median_of(runs, measure, *args):
+    return statistics.median(measure(*args) for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API and worker startup")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement; the median is reported")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the API cold start")
+    args = parser.parse_args()
+
+    print(f"Import time (median of {args.runs} runs)")
+    for module in MODULES:
+        print(f"  {module:<20} {median_of(args.runs, import_time, module) * 1000:8.1f} ms")
+
+    print(f"API cold start until /healthz: {median_of(args.runs, api_cold_start, args.port) * 1000:.1f} ms")
+    print(f"Worker respawn until ready:    {median_of(args.runs, worker_respawn) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
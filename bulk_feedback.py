@@ -0,0 +1,150 @@
+"""
+Generate teaching feedback for a whole directory of lecture transcripts.
+
+    python bulk_feedback.py transcripts/ reports/ --context class.json --concurrency 8 --rpm 60
+
+The context file holds the classroom fields of the feedback form (grade, topic,
+country, ...). A `<transcript name>.json` file next to a transcript overrides
+them for that transcript only.
+
+Each report is written to `<output dir>/<transcript name>.feedback.md` as soon as
+it is ready. Transcripts that already have a report are skipped, so an interrupted
+run can simply be started again.
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from openai_integration import OpenAIIntegration
+from prompts import FormData, generate_feedback_prompt
+from feedback_pipeline import split_transcript, should_chunk, notes_as_transcript, summarize_chunks_async
+from rate_limiter import AdaptiveRateLimiter
+
+
+def report_path(output_dir, transcript_name):
+    return os.path.join(output_dir, f"{os.path.splitext(transcript_name)[0]}.feedback.md")
+
+
+def iter_transcripts(input_dir, pattern):
+    """Yield transcript file names lazily, in a stable order."""
+    with os.scandir(input_dir) as entries:
+        names = sorted(entry.name for entry in entries if entry.is_file())
+    for name in names:
+        if fnmatch.fnmatch(name, pattern):
+            yield name
+
+
+def load_form(input_dir, transcript_name, base_context):
+    """Combine the shared context, any per-transcript overrides and the transcript text."""
+    context = dict(base_context)
+    override_path = os.path.join(input_dir, f"{os.path.splitext(transcript_name)[0]}.json")
+    if os.path.exists(override_path):
+        with open(override_path, encoding="utf-8") as f:
+            context.update(json.load(f))
+
+    with open(os.path.join(input_dir, transcript_name), encoding="utf-8") as f:
+        context["lecture_transcript"] = f.read()
+    return FormData(**context)
+
+
+def write_report(path, text):
+    """Write the report atomically so a crash never leaves a half-written file behind."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+async def process_transcript(ai, args, base_context, limiter, name, stats):
+    path = report_path(args.output_dir, name)
+    try:
+        form_data = load_form(args.input_dir, name, base_context)
+        if not form_data.lecture_transcript.strip():
+            print(f"Skipping {name}: empty transcript")
+            stats["skipped"] += 1
+            return
+
+        started = time.monotonic()
+        if should_chunk(form_data.lecture_transcript):
+            # Long lectures: analyse segments in parallel, then review the notes; every
+            # segment is a request of its own and waits for the limiter
+            chunks = split_transcript(form_data.lecture_transcript)
+            notes = await summarize_chunks_async(ai, form_data.model_dump(), chunks, limiter=limiter)
+            form_data = form_data.model_copy(update={"lecture_transcript": notes_as_transcript(notes)})
+        await limiter.acquire(0)
+        feedback = await ai.get_response_async(generate_feedback_prompt(form_data))
+        if not feedback:
+            raise RuntimeError("Failed to generate response")
+
+        write_report(path, feedback)
+        stats["completed"] += 1
+        print(f"[{stats['completed']} done] {name} ({time.monotonic() - started:.1f}s)")
+    except Exception as e:
+        stats["failed"] += 1
+        print(f"Error processing {name}: {str(e)}")
+
+
+async def run(args, base_context):
+    ai = OpenAIIntegration()
+    # Only requests are limited here; the client's own limiter already paces tokens
+    limiter = AdaptiveRateLimiter(args.rpm, args.rpm)
+    stats = {"completed": 0, "skipped": 0, "failed": 0, "already_done": 0}
+
+    # A small queue keeps memory flat no matter how many transcripts there are
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    async def consume():
+        while True:
+            name = await queue.get()
+            try:
+                if name is None:
+                    return
+                await process_transcript(ai, args, base_context, limiter, name, stats)
+            finally:
+                queue.task_done()
+
+    consumers = [asyncio.create_task(consume()) for _ in range(args.concurrency)]
+    for name in iter_transcripts(args.input_dir, args.pattern):
+        if os.path.exists(report_path(args.output_dir, name)):
+            stats["already_done"] += 1
+            continue
+        await queue.put(name)
+    for _ in consumers:
+        await queue.put(None)
+    await asyncio.gather(*consumers)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate teaching feedback for a directory of transcripts")
+    parser.add_argument("input_dir", help="Directory containing lecture transcripts")
+    parser.add_argument("output_dir", help="Directory where feedback reports are written")
+    parser.add_argument("--context", required=True,
+                        help="JSON file with the classroom fields of the feedback form")
+    parser.add_argument("--pattern", default="*.txt", help="Glob pattern of transcript files (default: *.txt)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Transcripts processed at once (default: 4)")
+    parser.add_argument("--rpm", type=float, default=30, help="Maximum upstream requests per minute, counting each segment of a long transcript (default: 30)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open(args.context, encoding="utf-8") as f:
+        base_context = json.load(f)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    started = time.monotonic()
+    stats = asyncio.run(run(args, base_context))
+    print(
+        f"Finished in {time.monotonic() - started:.0f}s: {stats['completed']} generated, "
+        f"{stats['already_done']} already done, {stats['skipped']} skipped, {stats['failed']} failed"
+    )
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
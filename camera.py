@@ -0,0 +1,119 @@
+"""
+Camera capture on a background thread for the recorder's video preview.
+
+CameraThread reads frames as fast as the camera delivers them and keeps only the
+latest one, converted to RGB at the preview size. The GUI pulls it with latest()
+at its own pace instead of blocking on the camera. Frames are written into
+preallocated buffers that rotate between the capture thread and the reader
+(triple buffering), so no frame-sized arrays are allocated per frame and the
+frame returned by latest() is not overwritten until the next call.
+
+A frame_listener, if set, also receives every BGR frame as it is captured; the
+video recorder uses it to record at the camera's rate independently of the preview.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Size of the preview, and what the camera is asked to deliver
+PREVIEW_WIDTH = 640
+PREVIEW_HEIGHT = 480
+
+
+class CameraThread(threading.Thread):
+    """Reads a cv2.VideoCapture continuously, keeping only the newest frame."""
+
+    def __init__(self, capture, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT):
+        super().__init__(daemon=True, name="camera")
+        self.capture = capture
+        self.size = (width, height)
+        self.failed = False  # Set when the camera stops delivering frames
+        self.frame_interval = 1 / 30  # Smoothed seconds between frames
+        self.frame_id = 0
+        # Called as frame_listener(bgr_frame, captured_at) on the capture thread, e.g. VideoRecorder.add_frame
+        self.frame_listener = None
+
+        # Ask for the preview size up front so most cameras need no resize, and for a
+        # short driver queue so frames are not stale by the time they are read
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        # Front is held by the reader, ready is the newest frame, back is being written
+        self._front, self._ready, self._back = (np.empty((height, width, 3), np.uint8) for _ in range(3))
+        self._raw = None
+        self._scaled = np.empty((height, width, 3), np.uint8)
+        self._ready_id = 0
+        self._front_id = 0
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._running.set()
+        self._stopped = threading.Event()
+
+    def run(self):
+        failures = 0
+        last = time.monotonic()
+        while not self._stopped.is_set():
+            if not self._running.is_set():
+                self._running.wait()
+                # Do not count the pause as time between frames
+                last = time.monotonic()
+            if self._stopped.is_set():
+                break
+
+            ret, frame = self.capture.read(self._raw)
+            captured_at = time.time()
+            if not ret:
+                failures += 1
+                # A few dropped frames are normal; a run of them means the camera is gone
+                self.failed = failures >= 30
+                time.sleep(0.01)
+                continue
+            failures = 0
+            self.failed = False
+            self._raw = frame  # Reused by the next read() if the camera keeps its size
+
+            # Scale only if the camera did not honour the requested size
+            if (frame.shape[1], frame.shape[0]) != self.size:
+                frame = cv2.resize(frame, self.size, dst=self._scaled)
+            listener = self.frame_listener
+            if listener is not None:
+                listener(frame, captured_at)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._back)
+
+            now = time.monotonic()
+            self.frame_interval += 0.1 * ((now - last) - self.frame_interval)
+            last = now
+            with self._lock:
+                self._back, self._ready = self._ready, self._back
+                self.frame_id += 1
+                self._ready_id = self.frame_id
+
+    def latest(self):
+        """
+        The newest frame, if one arrived since the last call.
+
+        Returns:
+            numpy.ndarray or None: RGB frame of the preview size, valid until the next call
+        """
+        with self._lock:
+            if self._ready_id == self._front_id:
+                return None
+            self._front, self._ready = self._ready, self._front
+            self._front_id = self._ready_id
+            # The old front is now "ready" but holds an older frame than the new front
+            self._ready_id = self._front_id
+            return self._front
+
+    def pause(self):
+        """Stop reading frames, e.g. while the window is hidden."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()
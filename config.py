@@ -0,0 +1,74 @@
+"""
+Settings shared by the API, the workers and the Streamlit pages.
+
+This module only uses the standard library, so reading configuration never pulls
+in Streamlit or the OpenAI SDK. That keeps API and worker start-up fast.
+"""
+import os
+import sys
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Streamlit secrets files: the project file takes precedence over the global one
+SECRETS_PATHS = (
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+)
+
+
+def _streamlit_secret(name):
+    """Read st.secrets, but only inside a Streamlit app that has already imported Streamlit."""
+    if "streamlit" not in sys.modules:
+        return None
+    try:
+        import streamlit as st
+        return st.secrets[name]
+    except Exception:
+        return None
+
+
+def _secrets_file_value(name):
+    """Read a value from a Streamlit secrets file without importing Streamlit."""
+    if tomllib is None:
+        return None
+    for path in SECRETS_PATHS:
+        try:
+            with open(path, "rb") as f:
+                value = tomllib.load(f).get(name)
+        except (OSError, tomllib.TOMLDecodeError):
+            continue
+        if value:
+            return value
+    return None
+
+
+def find_openai_api_key():
+    """
+    Look up the OpenAI API key.
+
+    Inside a Streamlit app st.secrets is checked first, as before. Otherwise the
+    environment is read first, then the Streamlit secrets files.
+
+    Returns:
+        tuple: (api_key, source); both are None if no key is configured
+    """
+    value = _streamlit_secret("OPENAI_API_KEY")
+    if value:
+        return value, "Streamlit secrets"
+    value = os.getenv("OPENAI_API_KEY")
+    if value:
+        return value, "environment variables"
+    value = _secrets_file_value("OPENAI_API_KEY")
+    if value:
+        return value, "Streamlit secrets file"
+    return None, None
+
+
+def show_error(message):
+    """Show an error in the Streamlit UI when running inside a Streamlit app."""
+    if "streamlit" in sys.modules:
+        import streamlit as st
+        st.error(message)
@@ -0,0 +1,213 @@
+"""
+Parallel strategies for generating teaching feedback.
+
+Map-reduce for transcripts that are too long for one prompt: the transcript is
+split at segment boundaries, every chunk is analysed in parallel (map), and the
+per-chunk notes replace the transcript in the usual feedback prompt (reduce). The
+final answer keeps the same three-domain structure while latency stays roughly
+flat as lectures get longer.
+
+Section fan-out for the dashboard report: the overall feedback and each domain
+are requested at the same time and joined in report order, so the report takes
+as long as its slowest section rather than all of them in sequence.
+"""
+import asyncio
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from prompts import FEEDBACK_REPORT_SECTIONS, generate_chunk_notes_prompt, generate_feedback_report_prompt
+from schemas import schema_instructions
+
+# Transcripts longer than this are analysed in chunks when no mode is requested
+CHUNKED_FEEDBACK_MIN_CHARS = int(os.getenv("CHUNKED_FEEDBACK_MIN_CHARS", "20000"))
+
+# Target size of each transcript chunk and number of chunks analysed at once
+TRANSCRIPT_CHUNK_CHARS = int(os.getenv("TRANSCRIPT_CHUNK_CHARS", "8000"))
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+
+# Boundaries tried in order: paragraphs, lines, sentences, then any whitespace
+_BOUNDARIES = [
+    (r"\n\s*\n", "\n\n"),
+    (r"\n", "\n"),
+    (r"(?<=[.!?])\s+", " "),
+    (r"\s+", " "),
+]
+
+
+def _split(text, max_chars, level):
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(_BOUNDARIES):
+        # A single "word" longer than a chunk: cut it
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    pattern, joiner = _BOUNDARIES[level]
+    chunks = []
+    current = ""
+    for part in re.split(pattern, text):
+        if not part.strip():
+            continue
+        for piece in _split(part.strip(), max_chars, level + 1):
+            candidate = f"{current}{joiner}{piece}" if current else piece
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_transcript(text, max_chars=TRANSCRIPT_CHUNK_CHARS):
+    """
+    Split a transcript into chunks of at most max_chars, in order.
+
+    Chunks end at the coarsest boundary that fits: a blank line between
+    segments, then a line break, then the end of a sentence.
+    """
+    return _split(text.strip(), max_chars, 0) if text and text.strip() else []
+
+
+def should_chunk(transcript):
+    """Return True if the transcript is long enough to need map-reduce feedback."""
+    return bool(transcript) and len(transcript) > CHUNKED_FEEDBACK_MIN_CHARS
+
+
+def notes_as_transcript(notes):
+    """Combine per-chunk notes into text that takes the transcript's place in the feedback prompt."""
+    sections = "\n\n".join(f"SEGMENT {index} OF {len(notes)}:\n{note.strip()}" for index, note in enumerate(notes, start=1))
+    return (
+        f"[The lecture was too long to include verbatim. It was split into {len(notes)} consecutive segments "
+        f"and each segment was analysed separately. Treat the notes below, including their quoted evidence, "
+        f"as the transcript.]\n\n{sections}"
+    )
+
+
+async def summarize_chunks_async(ai, form, chunks, concurrency=CHUNK_CONCURRENCY, limiter=None):
+    """
+    Analyse transcript chunks concurrently.
+
+    Args:
+        ai (OpenAIIntegration): Client used for the upstream calls
+        form (dict): Classroom fields of the feedback form
+        chunks (list): Transcript chunks from split_transcript
+        concurrency (int): Maximum number of chunks analysed at once
+        limiter (AdaptiveRateLimiter, optional): One request is acquired from it before each upstream call
+
+    Returns:
+        list: Notes for each chunk, in transcript order
+
+    Raises:
+        RuntimeError: If any chunk could not be analysed
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(index, chunk):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire(0)
+            notes = await ai.get_response_async(generate_chunk_notes_prompt(form, chunk, index, len(chunks)))
+        if not notes:
+            raise RuntimeError(f"Failed to analyse transcript segment {index} of {len(chunks)}")
+        return notes
+
+    return list(await asyncio.gather(*(summarize(index, chunk) for index, chunk in enumerate(chunks, start=1))))
+
+
+def summarize_chunks(ai, form, chunks, concurrency=CHUNK_CONCURRENCY):
+    """
+    Blocking version of summarize_chunks_async for synchronous callers such as Streamlit pages.
+
+    Returns:
+        list: Notes for each chunk in transcript order, or None if any chunk failed
+    """
+    def summarize(args):
+        index, chunk = args
+        return ai.get_response(generate_chunk_notes_prompt(form, chunk, index, len(chunks)))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        notes = list(pool.map(summarize, enumerate(chunks, start=1)))
+    return notes if all(notes) else None
+
+
+def _section_text(key, text):
+    """Return a section response with its header, which parse_feedback needs, restored if missing."""
+    header = FEEDBACK_REPORT_SECTIONS[key][0]
+    text = text.strip()
+    return text if header in text else f"{header}\n{text}"
+
+
+def merge_report_sections(texts):
+    """Join per-section responses (in FEEDBACK_REPORT_SECTIONS order) into one report."""
+    return "\n\n".join(_section_text(key, text) for key, text in zip(FEEDBACK_REPORT_SECTIONS, texts))
+
+
+async def stream_report_sections_async(ai, form):
+    """
+    Request every report section at once and yield the report in order as sections finish.
+
+    Args:
+        ai (OpenAIIntegration): Client used for the upstream calls
+        form (dict): Classroom fields and lecture transcript
+
+    Raises:
+        RuntimeError: If any section could not be generated
+    """
+    tasks = [
+        asyncio.ensure_future(ai.get_response_async(generate_feedback_report_prompt(form, [key])))
+        for key in FEEDBACK_REPORT_SECTIONS
+    ]
+    try:
+        for position, (key, task) in enumerate(zip(FEEDBACK_REPORT_SECTIONS, tasks)):
+            text = await task
+            if not text:
+                raise RuntimeError(f"Failed to generate the {key} feedback section")
+            yield ("\n\n" if position else "") + _section_text(key, text)
+    finally:
+        # Stop outstanding requests if a section failed or the consumer went away
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_report_json_async(ai, form):
+    """
+    Section fan-out in JSON mode.
+
+    Returns:
+        str: The merged report as a FeedbackReport JSON object (validated by the caller)
+
+    Raises:
+        RuntimeError: If any section could not be generated
+    """
+    async def generate(key):
+        prompt = generate_feedback_report_prompt(form, [key]) + schema_instructions("feedback_report", [key])
+        text = await ai.get_response_async(prompt, json_mode=True)
+        if not text:
+            raise RuntimeError(f"Failed to generate the {key} feedback section")
+        try:
+            section = json.loads(text)
+        except ValueError:
+            raise RuntimeError(f"The {key} feedback section is not valid JSON")
+        # Accept the section either wrapped in its key or on its own
+        return section.get(key, section) if isinstance(section, dict) else section
+
+    sections = await asyncio.gather(*(generate(key) for key in FEEDBACK_REPORT_SECTIONS))
+    return json.dumps(dict(zip(FEEDBACK_REPORT_SECTIONS, sections)))
+
+
+def generate_report_sections(ai, form):
+    """
+    Blocking section fan-out for synchronous callers such as Streamlit pages.
+
+    Returns:
+        str: The full report, or None if any section failed
+    """
+    def generate(key):
+        return ai.get_response(generate_feedback_report_prompt(form, [key]))
+
+    with ThreadPoolExecutor(max_workers=len(FEEDBACK_REPORT_SECTIONS)) as pool:
+        texts = list(pool.map(generate, FEEDBACK_REPORT_SECTIONS))
+    return merge_report_sections(texts) if all(texts) else None
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Jobs in these states have not produced a result yet and are resumed after a restart.
+# Any other status ("completed", "error", "batch", ...) marks a record that may be evicted.
+PENDING_STATUSES = ("queued", "processing")
+
+
+def new_job_id(prefix):
+    """Return a unique job ID such as lecture_plan_3f2a...; never reused after eviction."""
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+
+class JobStore:
+    """
+    Base class for job stores used by the API.
+
+    A job is a dict with at least "id", "status", "created_at" and "updated_at";
+    any other fields (prompt, data, error, ...) are stored as given.
+
+    Args:
+        ttl_seconds (float): Jobs not updated for this long are evicted unless still pending
+        max_entries (int): Records that are not pending are evicted oldest-first above this size
+        evict_interval (float): Minimum number of seconds between automatic sweeps
+    """
+
+    def __init__(self, ttl_seconds=3600, max_entries=10000, evict_interval=30):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+
+    def create(self, prefix, status="queued", **fields):
+        """Store a new job and return its ID."""
+        now = time.time()
+        job = dict(fields, id=new_job_id(prefix), status=status, created_at=now, updated_at=now)
+        self._insert(job)
+        self._maybe_evict(now)
+        return job["id"]
+
+    def get(self, job_id):
+        """Return a copy of the job, or None if it does not exist."""
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        """Merge fields into the job. Returns False if the job no longer exists."""
+        raise NotImplementedError
+
+    def pop(self, job_id):
+        """Remove the job and return it, or None if it does not exist."""
+        raise NotImplementedError
+
+    def pending(self):
+        """Return all jobs that are still queued or processing, oldest first."""
+        raise NotImplementedError
+
+    def count_by_status(self):
+        """Return the number of records in each status, without loading them."""
+        raise NotImplementedError
+
+    def claim(self, worker_id, lease_seconds=600):
+        """
+        Atomically take the oldest runnable job and mark it as processing.
+
+        Queued jobs are runnable, as are processing jobs that have not been updated
+        within lease_seconds (their worker is assumed to have died).
+
+        Args:
+            worker_id (str): Identifier recorded on the claimed job
+            lease_seconds (float): How long a processing job may go without updates
+
+        Returns:
+            dict: The claimed job, or None if there is nothing to run
+        """
+        raise NotImplementedError
+
+    def renew(self, job_id, worker_id):
+        """
+        Extend the lease of a job the worker is still running, without changing it otherwise.
+
+        Returns:
+            bool: False if the job finished, disappeared or was reclaimed by another worker
+        """
+        raise NotImplementedError
+
+    def evict(self, now=None):
+        """Drop expired jobs that are not pending and trim the rest down to max_entries. Returns the number removed."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def _insert(self, job):
+        raise NotImplementedError
+
+    def _maybe_evict(self, now):
+        if now - self._last_evict >= self.evict_interval:
+            self._last_evict = now
+            self.evict(now)
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store, ordered by last update so expired jobs are swept from the front."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _insert(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.update(fields)
+            job["updated_at"] = time.time()
+            self._jobs.move_to_end(job_id)
+            return True
+
+    def pop(self, job_id):
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def pending(self):
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if job["status"] in PENDING_STATUSES]
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def count_by_status(self):
+        counts = {}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    def claim(self, worker_id, lease_seconds=600):
+        now = time.time()
+        with self._lock:
+            runnable = [
+                job for job in self._jobs.values()
+                if job["status"] == "queued"
+                or (job["status"] == "processing" and job["updated_at"] < now - lease_seconds)
+            ]
+            if not runnable:
+                return None
+            job = min(runnable, key=lambda job: job["created_at"])
+            job.update(status="processing", worker_id=worker_id, updated_at=now)
+            self._jobs.move_to_end(job["id"])
+            return dict(job)
+
+    def renew(self, job_id, worker_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "processing" or job.get("worker_id") != worker_id:
+                return False
+            job["updated_at"] = time.time()
+            self._jobs.move_to_end(job_id)
+            return True
+
+    def evict(self, now=None):
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            # Expired jobs are always at the front because updates move jobs to the end;
+            # pending ones among them are kept, since a worker still owns them
+            expired = []
+            for job_id, job in self._jobs.items():
+                if job["updated_at"] >= cutoff:
+                    break
+                if job["status"] not in PENDING_STATUSES:
+                    expired.append(job_id)
+            for job_id in expired:
+                del self._jobs[job_id]
+            removed += len(expired)
+
+            # Trim jobs that are not pending, oldest first, if the store is still too large
+            excess = len(self._jobs) - self.max_entries
+            if excess > 0:
+                finished = [job_id for job_id, job in self._jobs.items() if job["status"] not in PENDING_STATUSES]
+                for job_id in finished[:excess]:
+                    del self._jobs[job_id]
+                    removed += 1
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store persisted in a SQLite database in WAL mode.
+
+    Jobs survive restarts and the database can be shared by several processes
+    on the same machine.
+    """
+
+    def __init__(self, path="jobs.db", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                fields TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @staticmethod
+    def _to_row(job):
+        fields = {key: value for key, value in job.items() if key not in ("id", "status", "created_at", "updated_at")}
+        return job["id"], job["status"], job["created_at"], job["updated_at"], json.dumps(fields)
+
+    @staticmethod
+    def _from_row(row):
+        job_id, status, created_at, updated_at, fields = row
+        return dict(json.loads(fields), id=job_id, status=status, created_at=created_at, updated_at=updated_at)
+
+    def _insert(self, job):
+        with self._lock:
+            self._conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?)", self._to_row(job))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, created_at, updated_at, fields FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def _write(self, row, fields):
+        """Merge fields into the job read from row; must run inside a write transaction."""
+        job = self._from_row(row)
+        job.update(fields)
+        job["updated_at"] = time.time()
+        job_id, status, _, updated_at, encoded = self._to_row(job)
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, fields = ? WHERE id = ?",
+            (status, updated_at, encoded, job_id)
+        )
+        return job
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            # Read-modify-write under a write lock so other processes cannot interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, created_at, updated_at, fields FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                if row is not None:
+                    self._write(row, fields)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def pop(self, job_id):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, created_at, updated_at, fields FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._from_row(row) if row else None
+
+    def pending(self):
+        placeholders = ", ".join("?" for _ in PENDING_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, status, created_at, updated_at, fields FROM jobs "
+                f"WHERE status IN ({placeholders}) ORDER BY created_at",
+                PENDING_STATUSES
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def count_by_status(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def claim(self, worker_id, lease_seconds=600):
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock first, so two workers never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, created_at, updated_at, fields FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'processing' AND updated_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (time.time() - lease_seconds,)
+                ).fetchone()
+                job = self._write(row, {"status": "processing", "worker_id": worker_id}) if row else None
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def renew(self, job_id, worker_id):
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET updated_at = ? "
+                "WHERE id = ? AND status = 'processing' AND json_extract(fields, '$.worker_id') = ?",
+                (time.time(), job_id, worker_id)
+            ).rowcount == 1
+
+    def evict(self, now=None):
+        cutoff = (now or time.time()) - self.ttl_seconds
+        placeholders = ", ".join("?" for _ in PENDING_STATUSES)
+        with self._lock:
+            removed = self._conn.execute(
+                f"DELETE FROM jobs WHERE updated_at < ? AND status NOT IN ({placeholders})",
+                (cutoff, *PENDING_STATUSES)
+            ).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += self._conn.execute(
+                    f"DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status NOT IN ({placeholders}) "
+                    f"ORDER BY updated_at LIMIT ?)",
+                    (*PENDING_STATUSES, excess)
+                ).rowcount
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+async def run_leased(store, job, worker_id, lease_seconds, run):
+    """
+    Run a claimed job, renewing its lease until it finishes.
+
+    Waits for the rate limiter and retries produce no updates, so without renewal a
+    slow job would look abandoned and another worker would run it a second time.
+    """
+    task = asyncio.create_task(run(job))
+    while not task.done():
+        await asyncio.wait({task}, timeout=lease_seconds / 3)
+        if not task.done():
+            store.renew(job["id"], worker_id)
+    return task.result()
+
+
+def create_job_store():
+    """
+    Build the job store configured through environment variables.
+
+    JOB_STORE_BACKEND selects "memory" (default) or "sqlite"; JOB_STORE_PATH,
+    JOB_TTL_SECONDS and JOB_STORE_MAX_ENTRIES tune the chosen backend.
+    """
+    backend = os.getenv("JOB_STORE_BACKEND", "memory").lower()
+    options = {
+        "ttl_seconds": float(os.getenv("JOB_TTL_SECONDS", "3600")),
+        "max_entries": int(os.getenv("JOB_STORE_MAX_ENTRIES", "10000")),
+    }
+
+    if backend == "memory":
+        return InMemoryJobStore(**options)
+    if backend == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH", "jobs.db"), **options)
+    raise ValueError(f"Unknown JOB_STORE_BACKEND: {backend}")
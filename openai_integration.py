@@ -1,53 +1,371 @@
 import os
-import openai
-import streamlit as st
+import time
+import random
+import inspect
+import asyncio
+import threading
+import weakref
+from collections import deque
+from config import find_openai_api_key, show_error
+from rate_limiter import AdaptiveRateLimiter
+from metrics import Counter, Histogram
+
+# The OpenAI SDK (and httpx) are imported on first use rather than here: they are the
+# slowest part of starting the API, and processes that never call upstream skip them
+
+# One pooled client per process (and per event loop for the async client), shared by
+# every OpenAIIntegration instance so repeat calls reuse warm keep-alive connections
+_sync_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+def _http_settings():
+    """Connection pool and timeout settings for the upstream HTTP transport."""
+    import httpx
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+    )
+    # Generous read timeout for long completions, short connect timeout so a dead
+    # endpoint fails fast instead of pinning a worker
+    timeout = httpx.Timeout(
+        float(os.getenv("OPENAI_READ_TIMEOUT", "120")),
+        connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+        pool=float(os.getenv("OPENAI_POOL_TIMEOUT", "10"))
+    )
+    return limits, timeout
+
+def retryable_errors():
+    """Upstream errors worth retrying: rate limits, timeouts, dropped connections and 5xx."""
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+
+def _is_rate_limit(error):
+    import openai
+    return isinstance(error, openai.RateLimitError)
+
+# Retry/hedge counters and recent latencies for all instances in this process
+_call_stats = {"calls": 0, "retries": 0, "failures": 0, "hedges_fired": 0, "hedges_won": 0}
+_latencies = {"completion": deque(maxlen=200), "first_token": deque(maxlen=200)}
+_stats_lock = threading.Lock()
+
+# Paces upstream calls from this process to stay inside the account's RPM/TPM quota.
+# With several processes sharing a key, set OPENAI_RPM/OPENAI_TPM to each one's share;
+# the x-ratelimit-* headers pull every process back to the account-wide remainder.
+rate_limiter = AdaptiveRateLimiter(
+    requests_per_minute=float(os.getenv("OPENAI_RPM", "3500")),
+    tokens_per_minute=float(os.getenv("OPENAI_TPM", "60000"))
+)
+
+# Exported on /metrics
+UPSTREAM_LATENCY = Histogram(
+    "upstream_latency_seconds",
+    "Upstream call latency including retries and hedging, to the full completion or the first streamed token",
+    ["kind"]
+)
+UPSTREAM_TOKENS = Counter(
+    "upstream_tokens_total",
+    "Tokens used upstream; source is usage for reported counts and estimate for streams",
+    ["type", "source"]
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed upstream attempts by error type", ["error"])
+
+def _count(name):
+    with _stats_lock:
+        _call_stats[name] += 1
+
+def _record_latency(kind, seconds):
+    with _stats_lock:
+        _latencies[kind].append(seconds)
+    UPSTREAM_LATENCY.observe(seconds, kind=kind)
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def get_call_stats():
+    """Return retry/hedge counters, recent latency percentiles and rate limiter state for tuning."""
+    with _stats_lock:
+        stats = dict(_call_stats)
+        for kind, samples in _latencies.items():
+            if samples:
+                stats[f"{kind}_p50_seconds"] = _percentile(samples, 0.5)
+                stats[f"{kind}_p95_seconds"] = _percentile(samples, 0.95)
+    stats["rate_limiter"] = rate_limiter.get_stats()
+    return stats
+
+def get_shared_client(api_key):
+    """Return the process-wide synchronous OpenAI client for api_key."""
+    with _clients_lock:
+        client = _sync_clients.get(api_key)
+        if client is None:
+            import httpx
+            from openai import OpenAI
+            limits, timeout = _http_settings()
+            client = OpenAI(
+                api_key=api_key,
+                timeout=timeout,
+                max_retries=0,
+                http_client=httpx.Client(limits=limits, timeout=timeout)
+            )
+            _sync_clients[api_key] = client
+        return client
+
+def get_shared_async_client(api_key):
+    """
+    Return the async OpenAI client for api_key on the running event loop.
+    
+    Async connections belong to the loop that opened them, so each loop gets its
+    own pool; the pool is dropped together with its loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            limits, timeout = _http_settings()
+            client = AsyncOpenAI(
+                api_key=api_key,
+                timeout=timeout,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+            )
+            clients[api_key] = client
+        return client
 
 class OpenAIIntegration:
     def __init__(self):
-        # Try to get API key from Streamlit secrets first
-        try:
-            api_key = st.secrets["OPENAI_API_KEY"]
-            print("Found API key in Streamlit secrets")
-        except Exception as e:
-            print(f"Error accessing Streamlit secrets: {str(e)}")
-            # Fallback to environment variables
-            api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                print("Found API key in environment variables")
-            else:
-                print("API key not found in environment variables")
-                st.error("OPENAI_API_KEY not found in Streamlit secrets or environment variables")
-                raise ValueError("OPENAI_API_KEY not found in Streamlit secrets or environment variables")
+        # Streamlit secrets inside Streamlit apps, otherwise the environment (see config.py)
+        api_key, source = find_openai_api_key()
+        if api_key:
+            print(f"Found API key in {source}")
+        else:
+            print("API key not found in Streamlit secrets or environment variables")
+            show_error("OPENAI_API_KEY not found in Streamlit secrets or environment variables")
+            raise ValueError("OPENAI_API_KEY not found in Streamlit secrets or environment variables")
         
-        openai.api_key = api_key
+        self.api_key = api_key
         print("Successfully set OpenAI API key")
         
         # Default model to use
         self.model = "gpt-3.5-turbo"
+        
+        # Fixed sampling settings so identical prompts give (near) identical answers,
+        # which is what makes cached responses valid
+        self.temperature = float(os.getenv("OPENAI_TEMPERATURE", "0"))
+        self.seed = int(os.getenv("OPENAI_SEED", "1234"))
+        
+        # Retry policy: exponential backoff with full jitter between attempts
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+        # 429s mean "wait", not "broken": the limiter queues callers, so allow more of them
+        self.max_rate_limit_retries = int(os.getenv("OPENAI_MAX_RATE_LIMIT_RETRIES", "10"))
+        self.backoff_base = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+        self.backoff_cap = float(os.getenv("OPENAI_BACKOFF_CAP", "20"))
+        
+        # Hedging: race a duplicate request once the first is slower than the recent p95
+        self.hedge = os.getenv("OPENAI_HEDGE", "0") == "1"
+        self.hedge_min_samples = 20
+        self.hedge_default_delay = float(os.getenv("OPENAI_HEDGE_DELAY", "10"))
+        
+        # Completion length assumed when reserving tokens-per-minute quota
+        self.expected_completion_tokens = int(os.getenv("OPENAI_EXPECTED_COMPLETION_TOKENS", "1000"))
+    
+    @property
+    def client(self):
+        """Pooled synchronous client shared by all instances in this process."""
+        return get_shared_client(self.api_key)
+    
+    @property
+    def async_client(self):
+        """Pooled async client for the running event loop (e.g. the FastAPI service)."""
+        return get_shared_async_client(self.api_key)
+    
+    def generation_params(self):
+        """Return the sampling parameters sent with every request."""
+        return {"temperature": self.temperature, "seed": self.seed}
+    
+    def _request_kwargs(self, prompt, model=None, json_mode=False):
+        """Build the chat completion arguments for a prompt."""
+        kwargs = {
+            # Use specified model or default
+            "model": model if model else self.model,
+            "messages": [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            **self.generation_params()
+        }
+        if json_mode:
+            # JSON mode guarantees syntactically valid JSON; the prompt describes its shape
+            kwargs["response_format"] = {"type": "json_object"}
+            kwargs["messages"][0]["content"] = "You are a helpful assistant that replies with a single JSON object."
+        return kwargs
+    
+    def _estimate_tokens(self, kwargs):
+        """Rough token count of a request: ~4 characters per prompt token plus the expected reply."""
+        prompt_chars = sum(len(message["content"]) for message in kwargs["messages"])
+        return prompt_chars // 4 + self.expected_completion_tokens
+    
+    def _after_response(self, raw):
+        """Feed rate-limit headers and actual usage back into the limiter, and parse the body."""
+        rate_limiter.update_from_headers(raw.headers)
+        return raw.parse()
+    
+    def _reconcile_usage(self, response, estimated):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            rate_limiter.reconcile(estimated, usage.total_tokens)
+            UPSTREAM_TOKENS.inc(usage.prompt_tokens, type="prompt", source="usage")
+            UPSTREAM_TOKENS.inc(usage.completion_tokens, type="completion", source="usage")
+    
+    def _create(self, kwargs):
+        """One synchronous upstream call, paced by the shared rate limiter."""
+        estimated = self._estimate_tokens(kwargs)
+        rate_limiter.acquire_blocking(estimated)
+        response = self._after_response(self.client.chat.completions.with_raw_response.create(**kwargs))
+        self._reconcile_usage(response, estimated)
+        return response
+    
+    async def _create_async(self, kwargs):
+        """One async upstream call, paced by the shared rate limiter."""
+        estimated = self._estimate_tokens(kwargs)
+        await rate_limiter.acquire(estimated)
+        raw = await self.async_client.chat.completions.with_raw_response.create(**kwargs)
+        response = self._after_response(raw)
+        if inspect.isawaitable(response):
+            response = await response
+        if not kwargs.get("stream"):
+            self._reconcile_usage(response, estimated)
+        return response
     
-    def get_response(self, prompt, model=None):
+    def _retry_delay(self, error, attempt):
+        """Full-jitter backoff, never shorter than a Retry-After sent by the server."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = None
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+                delay = max(delay, retry_after)
+            except (TypeError, ValueError):
+                pass
+        if _is_rate_limit(error):
+            # Hold back every caller in this process, not just the one that hit the limit
+            rate_limiter.on_rate_limited(retry_after, response.headers if response is not None else None)
+        return delay
+    
+    def _with_retries(self, call):
+        """Run call(), retrying retryable upstream errors."""
+        _count("calls")
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except retryable_errors() as e:
+                UPSTREAM_ERRORS.inc(error=type(e).__name__)
+                budget = self.max_rate_limit_retries if _is_rate_limit(e) else self.max_retries
+                if attempt >= budget:
+                    _count("failures")
+                    raise
+                delay = self._retry_delay(e, attempt)
+                _count("retries")
+                attempt += 1
+                print(f"Retrying OpenAI request in {delay:.1f}s after error: {str(e)}")
+                time.sleep(delay)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(error=type(e).__name__)
+                _count("failures")
+                raise
+    
+    async def _with_retries_async(self, call):
+        """Await call(), retrying retryable upstream errors without blocking the event loop."""
+        _count("calls")
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except retryable_errors() as e:
+                UPSTREAM_ERRORS.inc(error=type(e).__name__)
+                budget = self.max_rate_limit_retries if _is_rate_limit(e) else self.max_retries
+                if attempt >= budget:
+                    _count("failures")
+                    raise
+                delay = self._retry_delay(e, attempt)
+                _count("retries")
+                attempt += 1
+                print(f"Retrying OpenAI request in {delay:.1f}s after error: {str(e)}")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(error=type(e).__name__)
+                _count("failures")
+                raise
+    
+    def _hedge_delay(self, kind):
+        """Seconds to wait before hedging: the recent p95 latency once enough samples exist."""
+        with _stats_lock:
+            samples = list(_latencies[kind])
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return _percentile(samples, 0.95)
+    
+    async def _hedged(self, start, kind):
+        """
+        Await start(); if hedging is on and it is still running after the hedge
+        delay, start a duplicate and keep whichever succeeds first.
+        """
+        started = time.monotonic()
+        first = asyncio.ensure_future(start())
+        pending = {first}
+        try:
+            if self.hedge:
+                done, _ = await asyncio.wait(pending, timeout=self._hedge_delay(kind))
+                if not done:
+                    _count("hedges_fired")
+                    pending.add(asyncio.ensure_future(start()))
+            
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            _count("hedges_won")
+                        _record_latency(kind, time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the slower duplicate (or both, if we were cancelled ourselves)
+            for task in pending:
+                task.cancel()
+    
+    def get_response(self, prompt, model=None, json_mode=False):
         """
         Get a response from OpenAI's model based on the provided prompt.
         
+        Retryable errors are retried with jittered exponential backoff.
+        
         Args:
             prompt (str): The input prompt to send to the model
             model (str, optional): The model to use. Defaults to self.model.
+            json_mode (bool, optional): Constrain the reply to a JSON object.
             
         Returns:
             str: The model's response
         """
         try:
-            # Use specified model or default
-            model_to_use = model if model else self.model
-            
             # Make API call
-            response = openai.ChatCompletion.create(
-                model=model_to_use,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            started = time.monotonic()
+            kwargs = self._request_kwargs(prompt, model, json_mode)
+            response = self._with_retries(lambda: self._create(kwargs))
+            _record_latency("completion", time.monotonic() - started)
             
             # Extract and return the response text
             return response.choices[0].message.content
@@ -55,8 +373,110 @@ class OpenAIIntegration:
         except Exception as e:
             error_msg = f"Error getting response from OpenAI: {str(e)}"
             print(error_msg)
-            st.error(error_msg)
+            show_error(error_msg)
+            return None
+    
+    async def get_response_async(self, prompt, model=None, json_mode=False):
+        """
+        Awaitable version of get_response that does not block the event loop.
+        
+        Retryable errors are retried with jittered exponential backoff, and with
+        OPENAI_HEDGE=1 a slow request is raced against a duplicate.
+        
+        Args:
+            prompt (str): The input prompt to send to the model
+            model (str, optional): The model to use. Defaults to self.model.
+            json_mode (bool, optional): Constrain the reply to a JSON object.
+            
+        Returns:
+            str: The model's response, or None if the request failed
+        """
+        try:
+            kwargs = self._request_kwargs(prompt, model, json_mode)
+            
+            # Make API call without holding up other coroutines
+            response = await self._with_retries_async(
+                lambda: self._hedged(lambda: self._create_async(kwargs), "completion")
+            )
+            
+            # Extract and return the response text
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            print(f"Error getting response from OpenAI: {str(e)}")
             return None
+    
+    async def warm_up_async(self):
+        """
+        Open a pooled connection to the API ahead of the first real request.
+        
+        Listing models costs no tokens; it only pays the TCP and TLS handshakes.
+        
+        Returns:
+            float: Seconds the round trip took
+        """
+        started = time.monotonic()
+        await self.async_client.models.list()
+        return time.monotonic() - started
+    
+    async def _open_stream(self, kwargs):
+        """Start a streamed completion and wait for its first chunk."""
+        stream = await self._create_async(dict(kwargs, stream=True))
+        try:
+            chunks = stream.__aiter__()
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            return stream, chunks, first
+        except BaseException:
+            # Lost the hedge race or failed: release the connection
+            await stream.close()
+            raise
+    
+    async def stream_response_async(self, prompt, model=None, json_mode=False):
+        """
+        Stream a response from OpenAI's model as it is generated.
+        
+        Errors before the first token are retried (and hedged, if enabled) like
+        get_response_async; once text has been yielded a failure ends the stream.
+        
+        Args:
+            prompt (str): The input prompt to send to the model
+            model (str, optional): The model to use. Defaults to self.model.
+            json_mode (bool, optional): Constrain the reply to a JSON object.
+            
+        Yields:
+            str: Pieces of the response text in the order they arrive
+            
+        Raises:
+            Exception: Errors from the upstream call are passed on to the caller
+        """
+        kwargs = self._request_kwargs(prompt, model, json_mode)
+        stream, chunks, first = await self._with_retries_async(
+            lambda: self._hedged(lambda: self._open_stream(kwargs), "first_token")
+        )
+        
+        # Streams carry no usage; count one token per content chunk and ~4 prompt characters per token
+        streamed = 0
+        try:
+            if first is None:
+                return
+            if first.choices and first.choices[0].delta.content:
+                streamed += 1
+                yield first.choices[0].delta.content
+            async for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    streamed += 1
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+            estimated = self._estimate_tokens(kwargs)
+            prompt_tokens = estimated - self.expected_completion_tokens
+            # Give back the part of the reservation a short reply did not use
+            rate_limiter.reconcile(estimated, prompt_tokens + streamed)
+            UPSTREAM_TOKENS.inc(prompt_tokens, type="prompt", source="estimate")
+            UPSTREAM_TOKENS.inc(streamed, type="completion", source="estimate")
 
 # Example usage
 if __name__ == "__main__":
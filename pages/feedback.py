@@ -1,5 +1,9 @@
 import streamlit as st
 from openai_integration import OpenAIIntegration
+from feedback_pipeline import (
+    split_transcript, should_chunk, notes_as_transcript, summarize_chunks, generate_report_sections
+)
+from prompts import generate_feedback_report_prompt
 from dotenv import load_dotenv
 import io
 import json
@@ -8,8 +12,13 @@ import re
 # Load environment variables
 load_dotenv()
 
+@st.cache_resource
+def get_openai_integration():
+    """One OpenAIIntegration per server process, shared by every session and rerun."""
+    return OpenAIIntegration()
+
 # Initialize OpenAI integration
-ai = OpenAIIntegration()
+ai = get_openai_integration()
 
 # Initialize session state for feedback
 if 'feedback' not in st.session_state:
@@ -161,6 +170,8 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Memoized by the text, so reruns of the same result skip parsing
+@st.cache_data(max_entries=100)
 def parse_feedback(feedback_text):
     """Parse the feedback text into structured data."""
     domains = {
@@ -269,122 +280,18 @@ def display_feedback_dashboard(feedback_text):
 def generate_feedback(form_data):
     """Generate feedback based on form data."""
     
-    # Create dynamic prompt based on selected domain
-    prompt = f"""
-    As an expert in teaching and pedagogy, analyze the following lecture transcript and provide detailed feedback 
-    for a {form_data['grade']} grade class at {form_data['location']} in {form_data['country']}. The class has 
-    {form_data['number_of_students']} students with {form_data['percentage_of_girls']} girls and {form_data['percentage_of_boys']} boys. 
-    The attendance is {form_data['attendance_percentage']}, and the grade level competence is {form_data['grade_level_competence']}. 
-    The teacher has been teaching this grade for {form_data['teaching_tenure_years']} and faces challenges such as 
-    {form_data['classroom_challenges']}.
-
-    Lecture Transcript:
-    {form_data['lecture_transcript']}
-
-    Please structure your response EXACTLY as follows:
-
-    Overall Feedback:
-    Strengths:
-    - [List 2-3 key strengths observed]
-    - [Include specific examples from transcript]
-
-    Areas for Improvement:
-    - [List 2-3 areas needing attention]
-    - [Include specific examples from transcript]
-
-    Avoid/Rethink:
-    - [List 1-2 practices to reconsider]
-    - [Include specific examples from transcript]
-
-    DOMAIN 1: PLANNING AND PREPARATION
-    Knowledge of Content and Pedagogy:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Lesson Design and Coherence:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Knowledge of Students and Differentiation:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Use of Resources and Materials:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Assessment Integration:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    DOMAIN 2: CLASSROOM ENVIRONMENT
-    Respectful Interactions and Relationships:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    High Expectations and Intellectual Engagement:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Classroom Procedures and Time Management:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Student Behavior Management:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Physical Space Organization:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    DOMAIN 3: INSTRUCTION
-    Communication of Purpose and Directions:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Quality of Explanations and Scaffolding:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Discussion Techniques and Questioning:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Student Engagement and Participation:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Responsive Teaching and Assessment Use:
-    - [Observation with evidence]
-    - [Suggestion for improvement]
-    - [Specific example from transcript]
-
-    Important:
-    1. Start each section with the exact header shown above
-    2. Use bullet points (starting with -) for all items
-    3. Keep each bullet point concise and clear
-    4. Maintain this exact structure for proper parsing
-    5. Provide specific evidence from the transcript for each observation
-    6. Make suggestions actionable and immediately implementable
-    7. Focus on concrete examples and specific moments from the transcript
-    """
+    # Long lectures are analysed segment by segment in parallel, then reviewed from the notes
+    if should_chunk(form_data['lecture_transcript']):
+        notes = summarize_chunks(ai, form_data, split_transcript(form_data['lecture_transcript']))
+        if notes is None:
+            return None
+        form_data = dict(form_data, lecture_transcript=notes_as_transcript(notes))
+    
+    # One request per report section at once: latency of the slowest section instead of all of them
+    if form_data.get('parallel_sections'):
+        return generate_report_sections(ai, form_data)
     
-    return ai.get_response(prompt)
+    return ai.get_response(generate_feedback_report_prompt(form_data))
 
 def read_uploaded_file(uploaded_file):
     """Read content from uploaded file."""
@@ -459,6 +366,11 @@ def main():
             domains,
             help="Select the specific aspect of teaching you want feedback on"
         )
+        form_data['parallel_sections'] = st.checkbox(
+            "⚡ Generate each domain in parallel",
+            value=True,
+            help="Faster: the overall feedback and each domain are written by separate, simultaneous requests"
+        )
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Lecture Transcript Section
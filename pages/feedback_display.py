@@ -1,6 +1,5 @@
 import streamlit as st
-import json
-import re
+from stream_parser import parse_feedback_report
 
 # Custom CSS for better styling
 st.markdown("""
@@ -101,160 +100,78 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Memoized by the text, so reruns of the same result skip parsing
+@st.cache_data(max_entries=100)
 def parse_feedback(feedback_text):
     """Parse the feedback text into structured data."""
-    sections = {
-        "overall": {
-            "strengths": [],
-            "improvements": [],
-            "avoid": []
-        },
-        "planning": {},
-        "environment": {},
-        "instruction": {}
-    }
-    
-    current_section = None
-    current_subsection = None
-    
-    # Split the feedback into lines
-    lines = feedback_text.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Check for main sections
-        if "Overall Feedback:" in line:
-            current_section = "overall"
-            continue
-        elif "DOMAIN 1: PLANNING AND PREPARATION" in line:
-            current_section = "planning"
-            continue
-        elif "DOMAIN 2: CLASSROOM ENVIRONMENT" in line:
-            current_section = "environment"
-            continue
-        elif "DOMAIN 3: INSTRUCTION" in line:
-            current_section = "instruction"
-            continue
-            
-        # Check for overall feedback subsections
-        if current_section == "overall":
-            if "Strengths:" in line:
-                current_subsection = "strengths"
-                continue
-            elif "Areas for Improvement:" in line:
-                current_subsection = "improvements"
-                continue
-            elif "Avoid/Rethink:" in line:
-                current_subsection = "avoid"
-                continue
-                
-        # Check for domain subsections
-        if current_section in ["planning", "environment", "instruction"]:
-            if line.endswith(":"):
-                current_subsection = line[:-1].strip()
-                if current_subsection not in sections[current_section]:
-                    sections[current_section][current_subsection] = []
-                continue
-                
-        # Add content to current section
-        if line.startswith("-"):
-            content = line[1:].strip()
-            if current_section == "overall" and current_subsection:
-                sections["overall"][current_subsection].append(content)
-            elif current_section in ["planning", "environment", "instruction"] and current_subsection:
-                if current_subsection not in sections[current_section]:
-                    sections[current_section][current_subsection] = []
-                sections[current_section][current_subsection].append(content)
-    
-    return sections
+    return parse_feedback_report(feedback_text)
 
-def display_feedback_dashboard(feedback_text):
-    """Display the feedback in a dashboard format."""
+# st.fragment reruns only the dashboard on interaction; older Streamlit releases rerun the page
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# Dashboard domains in report order, with their headers
+DOMAIN_HEADERS = {
+    "planning": "📚 DOMAIN 1: PLANNING AND PREPARATION",
+    "environment": "🏫 DOMAIN 2: CLASSROOM ENVIRONMENT",
+    "instruction": "👨‍🏫 DOMAIN 3: INSTRUCTION",
+}
+
+def metric_cards_html(metrics):
+    """One row of metric cards as a single HTML block, instead of a column per card."""
+    cards = "".join(
+        f'<div class="metric-card" style="flex: 1;"><div class="metric-value">{value}</div>'
+        f'<div class="metric-label">{label}</div></div>'
+        for label, value in metrics
+    )
+    return f'<div style="display: flex; gap: 1rem;">{cards}</div>'
+
+def bullet_list(items):
+    return "\n".join(f"- {item}" for item in items)
+
+@st.cache_data(max_entries=100)
+def render_feedback_dashboard(feedback_text):
+    """
+    Build the dashboard for a feedback report.
+    
+    Returns:
+        tuple: (metrics_html, report_markdown), each shown with a single st.markdown call
+    """
     sections = parse_feedback(feedback_text)
     
-    # Display metrics
-    st.markdown("### 📊 Feedback Overview")
-    col1, col2, col3 = st.columns(3)
-    
     total_points = sum(len(items) for domain in ["planning", "environment", "instruction"] 
                       for items in sections[domain].values())
+    metrics_html = metric_cards_html([
+        ("Total Feedback Points", total_points),
+        ("Domains Covered", 3),
+        ("Points per Domain", total_points//3 if total_points > 0 else 0),
+    ])
+    
+    # Overall Feedback
+    blocks = ["### 📝 Overall Feedback"]
+    for key, title in [("strengths", "Strengths"), ("improvements", "Areas for Improvement"), ("avoid", "Avoid/Rethink")]:
+        if sections["overall"][key]:
+            blocks.append(f"#### {title}")
+            blocks.append(bullet_list(sections["overall"][key]))
+    
+    # Domains, skipping empty subsections
+    for domain, header in DOMAIN_HEADERS.items():
+        if sections[domain]:
+            blocks.append(f"### {header}")
+            for subcategory, items in sections[domain].items():
+                if items:
+                    blocks.append(f"#### {subcategory}")
+                    blocks.append(bullet_list(items))
+    
+    return metrics_html, "\n\n".join(blocks)
+
+@fragment
+def display_feedback_dashboard(feedback_text):
+    """Display the feedback in a dashboard format."""
+    metrics_html, report_markdown = render_feedback_dashboard(feedback_text)
     
-    with col1:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{total_points}</div>
-                <div class="metric-label">Total Feedback Points</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">3</div>
-                <div class="metric-label">Domains Covered</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{total_points//3 if total_points > 0 else 0}</div>
-                <div class="metric-label">Points per Domain</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Display Overall Feedback
-    st.markdown("### 📝 Overall Feedback")
-    
-    # Strengths
-    if sections["overall"]["strengths"]:
-        st.markdown("#### Strengths")
-        for strength in sections["overall"]["strengths"]:
-            st.markdown(f"- {strength}")
-    
-    # Areas for Improvement
-    if sections["overall"]["improvements"]:
-        st.markdown("#### Areas for Improvement")
-        for improvement in sections["overall"]["improvements"]:
-            st.markdown(f"- {improvement}")
-    
-    # Avoid/Rethink
-    if sections["overall"]["avoid"]:
-        st.markdown("#### Avoid/Rethink")
-        for avoid in sections["overall"]["avoid"]:
-            st.markdown(f"- {avoid}")
-    
-    # Display Domain 1: Planning and Preparation
-    if sections["planning"]:
-        st.markdown("### 📚 DOMAIN 1: PLANNING AND PREPARATION")
-        for subcategory, items in sections["planning"].items():
-            if items:  # Only display if there are items
-                st.markdown(f"#### {subcategory}")
-                for item in items:
-                    st.markdown(f"- {item}")
-    
-    # Display Domain 2: Classroom Environment
-    if sections["environment"]:
-        st.markdown("### 🏫 DOMAIN 2: CLASSROOM ENVIRONMENT")
-        for subcategory, items in sections["environment"].items():
-            if items:  # Only display if there are items
-                st.markdown(f"#### {subcategory}")
-                for item in items:
-                    st.markdown(f"- {item}")
-    
-    # Display Domain 3: Instruction
-    if sections["instruction"]:
-        st.markdown("### 👨‍🏫 DOMAIN 3: INSTRUCTION")
-        for subcategory, items in sections["instruction"].items():
-            if items:  # Only display if there are items
-                st.markdown(f"#### {subcategory}")
-                for item in items:
-                    st.markdown(f"- {item}")
+    st.markdown("### 📊 Feedback Overview")
+    st.markdown(metrics_html, unsafe_allow_html=True)
+    st.markdown(report_markdown)
 
 def main():
     st.markdown("""
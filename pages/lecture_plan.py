@@ -5,8 +5,13 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+@st.cache_resource
+def get_openai_integration():
+    """One OpenAIIntegration per server process, shared by every session and rerun."""
+    return OpenAIIntegration()
+
 # Initialize OpenAI integration
-ai = OpenAIIntegration()
+ai = get_openai_integration()
 
 # Initialize session state for lecture plan
 if 'lecture_plan' not in st.session_state:
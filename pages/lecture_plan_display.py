@@ -1,6 +1,5 @@
 import streamlit as st
-import json
-import re
+from stream_parser import parse_lecture_plan as parse_lecture_plan_text
 
 # Custom CSS for better styling
 st.markdown("""
@@ -115,58 +114,68 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Memoized by the text, so reruns of the same result skip parsing
+@st.cache_data(max_entries=100)
 def parse_lecture_plan(plan_text):
     """Parse the lecture plan text into structured data."""
-    sections = {
-        "Overview": [],
-        "Learning Objectives": [],
-        "Materials": [],
-        "Timeline": [],
-        "Assessment": []
-    }
-    
-    current_section = None
-    
-    # Split the plan into lines
-    lines = plan_text.split('\n')
+    return parse_lecture_plan_text(plan_text)
+
+# st.fragment reruns only the dashboard on interaction; older Streamlit releases rerun the page
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# Plan sections in display order, with their title and item style
+PLAN_SECTIONS = [
+    ("Overview", "📝 Overview", "overview"),
+    ("Learning Objectives", "🎯 Learning Objectives", "objective"),
+    ("Materials", "📚 Materials", "material"),
+    ("Timeline", "⏱️ Timeline", None),
+    ("Assessment", "📊 Assessment", "assessment"),
+]
+
+def metric_cards_html(metrics):
+    """One row of metric cards as a single HTML block, instead of a column per card."""
+    cards = "".join(
+        f'<div class="metric-card" style="flex: 1;"><div class="metric-value">{value}</div>'
+        f'<div class="metric-label">{label}</div></div>'
+        for label, value in metrics
+    )
+    return f'<div style="display: flex; gap: 1rem;">{cards}</div>'
+
+@st.cache_data(max_entries=100)
+def render_lecture_plan_dashboard(plan_text):
+    """
+    Build the dashboard for a lecture plan as one HTML block.
     
-    for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Check for section headers
-        if line.startswith("Overview:"):
-            current_section = "Overview"
-            continue
-        elif line.startswith("Learning Objectives:"):
-            current_section = "Learning Objectives"
-            continue
-        elif line.startswith("Materials:"):
-            current_section = "Materials"
-            continue
-        elif line.startswith("Timeline:"):
-            current_section = "Timeline"
-            continue
-        elif line.startswith("Assessment:"):
-            current_section = "Assessment"
-            continue
-            
-        # Add content to current section
-        if current_section:
-            if line.startswith("- "):
-                sections[current_section].append(line[2:])
-            else:
-                sections[current_section].append(line)
+    The HTML has no blank lines or indentation, so Markdown passes it through unchanged.
+    """
+    sections = parse_lecture_plan(plan_text)
     
-    return sections
+    parts = [
+        '<div class="section-title">📊 Plan Overview</div>',
+        metric_cards_html([
+            ("Learning Objectives", len(sections['Learning Objectives'])),
+            ("Timeline Items", len(sections['Timeline'])),
+            ("Assessment Points", len(sections['Assessment'])),
+        ]),
+    ]
+    for section, title, style in PLAN_SECTIONS:
+        parts.append(f'<div class="section-title">{title}</div>')
+        if style is None:
+            # Timeline items sit on a vertical line rather than in cards
+            items = "".join(
+                f'<div class="timeline-item"><span class="plan-text">{item}</span></div>' for item in sections[section]
+            )
+            parts.append(f'<div class="timeline">{items}</div>')
+        else:
+            parts.extend(
+                f'<div class="plan-item"><div class="{style}"><span class="plan-text">{item}</span></div></div>'
+                for item in sections[section]
+            )
+    return "".join(parts)
 
+@fragment
 def display_lecture_plan_dashboard(plan_text):
     """Display the lecture plan in a dashboard format."""
-    sections = parse_lecture_plan(plan_text)
-    
     # Display header
     st.markdown("""
         <div style='text-align: center;'>
@@ -175,88 +184,7 @@ def display_lecture_plan_dashboard(plan_text):
         </div>
     """, unsafe_allow_html=True)
     
-    # Display metrics
-    st.markdown('<div class="section-title">📊 Plan Overview</div>', unsafe_allow_html=True)
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{len(sections['Learning Objectives'])}</div>
-                <div class="metric-label">Learning Objectives</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{len(sections['Timeline'])}</div>
-                <div class="metric-label">Timeline Items</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-value">{len(sections['Assessment'])}</div>
-                <div class="metric-label">Assessment Points</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Display Overview
-    st.markdown('<div class="section-title">📝 Overview</div>', unsafe_allow_html=True)
-    for item in sections['Overview']:
-        st.markdown(f"""
-            <div class="plan-item">
-                <div class="overview">
-                    <span class="plan-text">{item}</span>
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Display Learning Objectives
-    st.markdown('<div class="section-title">🎯 Learning Objectives</div>', unsafe_allow_html=True)
-    for objective in sections['Learning Objectives']:
-        st.markdown(f"""
-            <div class="plan-item">
-                <div class="objective">
-                    <span class="plan-text">{objective}</span>
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Display Materials
-    st.markdown('<div class="section-title">📚 Materials</div>', unsafe_allow_html=True)
-    for material in sections['Materials']:
-        st.markdown(f"""
-            <div class="plan-item">
-                <div class="material">
-                    <span class="plan-text">{material}</span>
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Display Timeline
-    st.markdown('<div class="section-title">⏱️ Timeline</div>', unsafe_allow_html=True)
-    st.markdown('<div class="timeline">', unsafe_allow_html=True)
-    for item in sections['Timeline']:
-        st.markdown(f"""
-            <div class="timeline-item">
-                <span class="plan-text">{item}</span>
-            </div>
-        """, unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Display Assessment
-    st.markdown('<div class="section-title">📊 Assessment</div>', unsafe_allow_html=True)
-    for assessment in sections['Assessment']:
-        st.markdown(f"""
-            <div class="plan-item">
-                <div class="assessment">
-                    <span class="plan-text">{assessment}</span>
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
+    st.markdown(render_lecture_plan_dashboard(plan_text), unsafe_allow_html=True)
 
 def main():
     # Check if lecture plan exists in session state
@@ -0,0 +1,225 @@
+from pydantic import BaseModel
+from typing import Optional
+
+# Bump whenever the prompt templates below change so stale cached responses are not served
+PROMPT_TEMPLATE_VERSION = "1"
+
+class FormData(BaseModel):
+    grade: str
+    topic: str
+    country: str
+    location: str
+    number_of_students: str
+    teaching_tenure_years: str
+    percentage_of_girls: str
+    percentage_of_boys: str
+    attendance_percentage: str
+    grade_level_competence: str
+    classroom_challenges: str
+    lecture_transcript: Optional[str] = None
+    feedback_mode: Optional[str] = None  # "single", "chunked" or "per_domain"; long transcripts default to "chunked"
+    output_format: Optional[str] = None  # "text" (default) or "json" for a validated object in /status "result"
+
+def generate_lecture_plan_prompt(form_data: FormData) -> str:
+    """Generate the prompt for lecture plan generation."""
+    # Extract subject from topic
+    subject = form_data.topic.split(' - ')[0] if ' - ' in form_data.topic else form_data.topic
+    
+    return f"""
+    Create a detailed lecture plan for teaching {form_data.topic} to grade {form_data.grade} students.
+    Consider the following context:
+    - Class size: {form_data.number_of_students} students
+    - Grade level competence: {form_data.grade_level_competence}
+    - Location: {form_data.location}
+    - Classroom challenges: {form_data.classroom_challenges}
+    
+    Please provide a structured lecture plan that includes:
+    
+    1. SUBTOPICS BREAKDOWN
+    - List 4-6 key subtopics that should be covered
+    - For each subtopic, provide:
+      * A brief summary of the content
+      * Estimated time allocation (in minutes)
+      * Key learning objectives
+    
+    2. ENGAGEMENT STRATEGIES
+    - For each subtopic, suggest:
+      * An interactive activity or demonstration
+      * A real-world example or application
+      * A way to check for understanding
+    
+    3. DIFFERENTIATION STRATEGIES
+    - How to support struggling students
+    - How to challenge advanced students
+    - How to maintain engagement for all ability levels
+    
+    4. TIMING AND PACING
+    - Total lecture duration
+    - Time allocation for each subtopic
+    - Suggested breaks or transitions
+    
+    Format the response in a clear, structured way that's easy to follow.
+    Consider the cultural context of {form_data.location} and the specific challenges mentioned.
+    """
+
+def generate_feedback_prompt(form_data: FormData) -> str:
+    """Generate the prompt for feedback generation."""
+    if not form_data.lecture_transcript:
+        # Imported here so the Streamlit pages and CLI tools do not load FastAPI
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail="Lecture transcript is required for feedback generation")
+        
+    # Extract subject from topic
+    subject = form_data.topic.split(' - ')[0] if ' - ' in form_data.topic else form_data.topic
+    
+    return f"""
+    We are teaching grade {form_data.grade} the topic {form_data.topic} in {form_data.country}. 
+    My class is based out of {form_data.location}. There are {form_data.number_of_students} in my class, 
+    {form_data.percentage_of_girls} of girls and {form_data.percentage_of_boys} of boys.
+    The attendance is expected to be {form_data.attendance_percentage}, and the grade level competence 
+    of my students is {form_data.grade_level_competence}. I have been teaching this grade for 
+    {form_data.teaching_tenure_years}. The challenges I face are usually {form_data.classroom_challenges}. 
+    
+    Below is the transcript of my recent lecture. Please provide specific, actionable feedback based on the actual content of this lecture.
+    For each point below, provide:
+    1. A specific observation from the lecture
+    2. A concrete suggestion for improvement
+    3. An example of how to implement the suggestion
+
+    LECTURE TRANSCRIPT:
+    {form_data.lecture_transcript}
+    
+    Please provide feedback for EACH of the following points, specifically tailored for teaching {subject} at the {form_data.grade} grade level:
+
+    DOMAIN 1: PLANNING AND PREPARATION
+    1. Lecture Sequence: How well does the lecture sequence build understanding of {subject} concepts?
+    2. Mixed Ability Levels: Are the examples and explanations appropriate for the mixed ability levels in {form_data.grade} grade?
+    3. Key Concepts: How effectively are key {subject} concepts introduced and connected?
+    4. Misconceptions: What specific misconceptions might {form_data.grade} grade students have about {subject}?
+    5. Lesson Structure: How could the lesson be better structured for different learning levels in {form_data.grade} grade?
+
+    DOMAIN 2: CLASSROOM ENVIRONMENT
+    1. Student Engagement: How can the lecture be made more engaging for {form_data.grade} grade students with varying abilities?
+    2. Attention Maintenance: What specific strategies could be used to maintain student attention during {subject} concepts?
+    3. Content Relevance: How can the {subject} content be made more relevant to {form_data.grade} grade students' lives?
+    4. Interactive Learning: What specific activities could be added to make the {subject} learning more interactive?
+    5. Learning Styles: How can the lecture better accommodate different learning styles for {form_data.grade} grade students?
+
+    DOMAIN 3: INSTRUCTION
+    1. Problem-Solving Steps: How effectively are the steps for {subject} concepts explained?
+    2. Visual Aids: What specific visual aids or examples could enhance understanding of {subject}?
+    3. Concept Explanation: How could the explanation of key {subject} concepts be improved?
+    4. Practice Opportunities: What specific practice opportunities could be added for {form_data.grade} grade level?
+    5. Differentiated Instruction: How could the lecture better address the needs of students at different grade levels?
+
+    For each point above, provide specific examples and concrete suggestions that can be implemented immediately in the classroom.
+    Consider the cultural context of {form_data.location} and the specific challenges mentioned: {form_data.classroom_challenges}.
+    """
+
+def generate_chunk_notes_prompt(form: dict, chunk: str, index: int, total: int) -> str:
+    """Generate the prompt that analyses one segment of a long lecture transcript."""
+    topic = f" on {form['topic']}" if form.get('topic') else ""
+    
+    return f"""
+    A grade {form['grade']} lecture{topic} at {form['location']} was too long to review in one pass,
+    so its transcript has been split into {total} consecutive segments. This is segment {index} of {total}.
+    
+    Take detailed notes on this segment for a teaching coach who will later write feedback on the whole lecture.
+    For each of the following domains, list specific observations and quote short pieces of evidence from the segment:
+    
+    PLANNING AND PREPARATION: sequencing, how key concepts are introduced and connected, likely misconceptions, lesson structure
+    CLASSROOM ENVIRONMENT: student engagement, attention, relevance to students' lives, interaction, learning styles
+    INSTRUCTION: clarity of explanations and problem-solving steps, visual aids and examples, practice opportunities, differentiation
+    
+    Start with one line describing what the segment covers and where it sits in the lesson.
+    Only record what happens in this segment; do not write recommendations yet.
+    
+    TRANSCRIPT SEGMENT {index} OF {total}:
+    {chunk}
+    """
+
+def _domain_section(header, subsections):
+    blocks = "\n\n".join(
+        f"""    {subsection}:
+    - [Observation with evidence]
+    - [Suggestion for improvement]
+    - [Specific example from transcript]"""
+        for subsection in subsections
+    )
+    return f"    {header}\n{blocks}"
+
+# Sections of the feedback report shown on the Streamlit dashboard, in report order: key -> (header, template)
+FEEDBACK_REPORT_SECTIONS = {
+    "overall": ("Overall Feedback:", """    Overall Feedback:
+    Strengths:
+    - [List 2-3 key strengths observed]
+    - [Include specific examples from transcript]
+
+    Areas for Improvement:
+    - [List 2-3 areas needing attention]
+    - [Include specific examples from transcript]
+
+    Avoid/Rethink:
+    - [List 1-2 practices to reconsider]
+    - [Include specific examples from transcript]"""),
+    "planning": ("DOMAIN 1: PLANNING AND PREPARATION", _domain_section("DOMAIN 1: PLANNING AND PREPARATION", [
+        "Knowledge of Content and Pedagogy",
+        "Lesson Design and Coherence",
+        "Knowledge of Students and Differentiation",
+        "Use of Resources and Materials",
+        "Assessment Integration",
+    ])),
+    "environment": ("DOMAIN 2: CLASSROOM ENVIRONMENT", _domain_section("DOMAIN 2: CLASSROOM ENVIRONMENT", [
+        "Respectful Interactions and Relationships",
+        "High Expectations and Intellectual Engagement",
+        "Classroom Procedures and Time Management",
+        "Student Behavior Management",
+        "Physical Space Organization",
+    ])),
+    "instruction": ("DOMAIN 3: INSTRUCTION", _domain_section("DOMAIN 3: INSTRUCTION", [
+        "Communication of Purpose and Directions",
+        "Quality of Explanations and Scaffolding",
+        "Discussion Techniques and Questioning",
+        "Student Engagement and Participation",
+        "Responsive Teaching and Assessment Use",
+    ])),
+}
+
+def generate_feedback_report_prompt(form: dict, sections=None) -> str:
+    """
+    Generate the prompt for the feedback report shown on the Streamlit dashboard.
+    
+    Args:
+        form (dict): Classroom fields and lecture transcript
+        sections (list, optional): Keys of FEEDBACK_REPORT_SECTIONS to write; all of them by default
+    """
+    sections = list(sections or FEEDBACK_REPORT_SECTIONS)
+    template = "\n\n".join(FEEDBACK_REPORT_SECTIONS[key][1] for key in sections)
+    scope = ""
+    if len(sections) < len(FEEDBACK_REPORT_SECTIONS):
+        scope = "The other sections of the report are written separately; write ONLY the section shown below.\n\n    "
+    
+    return f"""
+    As an expert in teaching and pedagogy, analyze the following lecture transcript and provide detailed feedback 
+    for a {form['grade']} grade class at {form['location']} in {form['country']}. The class has 
+    {form['number_of_students']} students with {form['percentage_of_girls']} girls and {form['percentage_of_boys']} boys. 
+    The attendance is {form['attendance_percentage']}, and the grade level competence is {form['grade_level_competence']}. 
+    The teacher has been teaching this grade for {form['teaching_tenure_years']} and faces challenges such as 
+    {form['classroom_challenges']}.
+
+    Lecture Transcript:
+    {form['lecture_transcript']}
+
+    {scope}Please structure your response EXACTLY as follows:
+
+{template}
+
+    Important:
+    1. Start each section with the exact header shown above
+    2. Use bullet points (starting with -) for all items
+    3. Keep each bullet point concise and clear
+    4. Maintain this exact structure for proper parsing
+    5. Provide specific evidence from the transcript for each observation
+    6. Make suggestions actionable and immediately implementable
+    7. Focus on concrete examples and specific moments from the transcript
+    """
@@ -1,10 +1,15 @@
+import argparse
 import speech_recognition as sr
+from speech_backends import BACKENDS, DEFAULT_BACKEND, create_backend
 
-def quick_test():
+def quick_test(backend_name=None):
     print("Quick Microphone Test")
     print("=" * 50)
     
     try:
+        backend = create_backend(backend_name)
+        print(f"Using {backend.label} speech recognition")
+        
         # Just try to access the microphone
         with sr.Microphone() as source:
             print("✓ Microphone accessed successfully")
@@ -19,7 +24,7 @@ def quick_test():
             audio = r.listen(source, timeout=2, phrase_time_limit=2)
             
             print("Processing...")
-            text = r.recognize_google(audio)
+            text = backend.recognize(r, audio)
             
             print("\nYou said:", text)
             return True
@@ -29,11 +34,16 @@ def quick_test():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the microphone and speech recognition work")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help="Speech recognition backend (sphinx works offline)")
+    args = parser.parse_args()
+    
     print("This is a quick test to check if your microphone is working.")
     print("It will only record for 2 seconds maximum.")
     input("\nPress Enter to start...")
     
-    if quick_test():
+    if quick_test(args.backend):
         print("\nTest completed!")
     else:
         print("\nTest failed. Please check if your microphone is properly connected and has necessary permissions.") 
\ No newline at end of file
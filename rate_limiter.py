@@ -0,0 +1,163 @@
+import asyncio
+import re
+import threading
+import time
+
+
+def parse_reset_duration(value):
+    """
+    Parse an OpenAI rate-limit reset value such as "1s", "6m0s" or "250ms" into seconds.
+
+    Returns None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts or "".join(number + unit for number, unit in parts) != value.strip():
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """
+    Token bucket that allows reservations beyond its balance.
+
+    A reservation always succeeds and returns how long the caller must wait for the
+    balance to cover it, so concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.clock = clock
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = clock()
+
+    @property
+    def rate(self):
+        return self.capacity / 60.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount (capped at capacity) and return the seconds until the balance is non-negative."""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate) if self.rate > 0 else 0.0
+
+    def set_limit(self, per_minute, now):
+        self._refill(now)
+        self.tokens = min(self.tokens, float(per_minute))
+        self.capacity = float(per_minute)
+
+    def clamp(self, remaining, now):
+        """Never believe we have more left than the server reports."""
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limiter for upstream requests-per-minute and tokens-per-minute quotas.
+
+    Callers reserve one request and an estimated number of tokens before each call
+    and wait until both buckets cover them, so bursts queue instead of turning into
+    429 errors. Limits and remaining quota are re-synchronised from the upstream
+    x-ratelimit-* response headers, and a 429 pauses all callers for Retry-After.
+
+    Args:
+        requests_per_minute (float): Starting RPM quota
+        tokens_per_minute (float): Starting TPM quota
+        clock (callable, optional): Monotonic clock, replaceable in tests
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"waits": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+    def reserve(self, tokens):
+        """Reserve one request and `tokens` tokens; returns how many seconds to wait first."""
+        with self._lock:
+            now = self.clock()
+            delay = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.paused_until - now
+            )
+            if delay > 0:
+                self.stats["waits"] += 1
+                self.stats["wait_seconds"] += delay
+            return delay
+
+    async def acquire(self, tokens):
+        """Wait (without blocking the event loop) until the request may be sent."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self, tokens):
+        """Blocking version of acquire for synchronous callers."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reconcile(self, estimated, actual):
+        """Correct the token bucket once the real usage of a request is known."""
+        with self._lock:
+            self.tokens.tokens += estimated - actual
+
+    def update_from_headers(self, headers):
+        """Adopt the limits and remaining quota reported by the upstream."""
+        with self._lock:
+            now = self.clock()
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                try:
+                    limit = headers.get(f"x-ratelimit-limit-{kind}")
+                    if limit:
+                        bucket.set_limit(float(limit), now)
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    if remaining:
+                        bucket.clamp(float(remaining), now)
+                except ValueError:
+                    continue
+
+    def on_rate_limited(self, retry_after=None, headers=None):
+        """
+        Pause every caller after a 429.
+
+        Args:
+            retry_after (float, optional): Seconds the server asked us to wait
+            headers (Mapping, optional): Headers of the 429 response
+        """
+        delay = retry_after
+        if delay is None and headers is not None:
+            resets = [
+                parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                for kind in ("requests", "tokens")
+            ]
+            delay = max([reset for reset in resets if reset is not None], default=None)
+        with self._lock:
+            self.stats["rate_limited"] += 1
+            self.paused_until = max(self.paused_until, self.clock() + (delay if delay is not None else 1.0))
+        if headers is not None:
+            self.update_from_headers(headers)
+
+    def get_stats(self):
+        """Return wait counters and the current bucket balances."""
+        with self._lock:
+            now = self.clock()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return dict(
+                self.stats,
+                requests_available=self.requests.tokens,
+                requests_per_minute=self.requests.capacity,
+                tokens_available=self.tokens.tokens,
+                tokens_per_minute=self.tokens.capacity,
+            )
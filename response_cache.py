@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(prompt, model, params=None, version=""):
+    """
+    Hash everything that determines a completion into a stable cache key.
+
+    Args:
+        prompt (str): The full prompt sent to the model
+        model (str): Model name
+        params (dict, optional): Generation parameters such as temperature and seed
+        version (str, optional): Version tag of the prompt template
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    canonical = json.dumps(
+        {"version": version, "model": model, "params": params or {}, "prompt": prompt},
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated responses.
+
+    The memory tier is a small LRU. The disk tier is a SQLite database evicted with
+    GreedyDual-Size: entries that were expensive to generate and are small survive
+    longer than cheap or bulky ones, and every hit refreshes an entry's priority.
+
+    Args:
+        path (str, optional): SQLite file for the disk tier; None keeps the cache in memory only
+        memory_entries (int): Number of responses kept in the memory tier
+        disk_max_bytes (int): Size budget of the disk tier
+    """
+
+    def __init__(self, path=None, memory_entries=256, disk_max_bytes=256 * 1024 * 1024):
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+
+        self._conn = None
+        self._inflation = 0.0
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    cost REAL NOT NULL,
+                    priority REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_priority ON responses (priority)")
+            # Resume the GreedyDual-Size clock from the lowest surviving priority
+            row = self._conn.execute("SELECT MIN(priority) FROM responses").fetchone()
+            self._inflation = row[0] or 0.0
+
+    def _priority(self, cost, size):
+        return self._inflation + cost / max(size, 1)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, size, cost FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, size, cost = row
+                    self._conn.execute(
+                        "UPDATE responses SET priority = ? WHERE key = ?", (self._priority(cost, size), key)
+                    )
+                    self._remember(key, value)
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, value, cost=1.0):
+        """
+        Store a response.
+
+        Args:
+            key (str): Key from make_cache_key
+            value (str): The generated response
+            cost (float): How expensive the response was to produce, e.g. seconds upstream
+        """
+        with self._lock:
+            self._remember(key, value)
+            self._counters["puts"] += 1
+            if self._conn is None:
+                return
+
+            size = len(value.encode("utf-8"))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, size, cost, self._priority(cost, size), time.time())
+            )
+            self._evict_disk()
+
+    def _evict_disk(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.disk_max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size, priority FROM responses ORDER BY priority LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            key, size, priority = row
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            # Age every remaining entry relative to the one just evicted
+            self._inflation = priority
+            self._counters["evictions"] += 1
+            total -= size
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = 0
+            stats["disk_bytes"] = 0
+            if self._conn is not None:
+                stats["disk_entries"], stats["disk_bytes"] = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def create_response_cache():
+    """
+    Build the response cache configured through environment variables.
+
+    RESPONSE_CACHE_PATH sets the disk tier file (empty disables it);
+    RESPONSE_CACHE_MEMORY_ENTRIES and RESPONSE_CACHE_DISK_MB size the tiers.
+    """
+    return ResponseCache(
+        path=os.getenv("RESPONSE_CACHE_PATH", "response_cache.db") or None,
+        memory_entries=int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "256")),
+        disk_max_bytes=int(float(os.getenv("RESPONSE_CACHE_DISK_MB", "256")) * 1024 * 1024)
+    )
@@ -0,0 +1,272 @@
+"""
+Off-peak pre-generation of registered lecture plans.
+
+Schools register upcoming lectures through the API. During the off-peak window the
+scheduler generates those plans at a controlled rate and stores them, so the
+morning request is answered from storage instead of competing for upstream quota.
+
+The API runs the scheduler in-process when SCHEDULER_ENABLED=1 (the default); it
+can also run on its own with `python scheduler.py`. The rate is enforced through the
+shared store, so it holds however many API or scheduler processes are running.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+
+def in_off_peak_window(hour, start_hour, end_hour):
+    """Return True if hour falls in [start_hour, end_hour), wrapping past midnight."""
+    if start_hour <= end_hour:
+        return start_hour <= hour < end_hour
+    return hour >= start_hour or hour < end_hour
+
+
+class ScheduledPlanStore:
+    """
+    SQLite store of registered lectures and their pre-generated plans.
+
+    Statuses move from "scheduled" to "generating" to "completed" (or "error"
+    once max_attempts generations have failed). Registrations are pruned once
+    their lecture date has passed.
+    """
+
+    def __init__(self, path="scheduled_plans.db", max_attempts=3, lease_seconds=600):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_plans (
+                id TEXT PRIMARY KEY,
+                lecture_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                form TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                data TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS scheduled_plans_due ON scheduled_plans (status, lecture_date)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scheduled_plans_key ON scheduled_plans (cache_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scheduled_plans_date ON scheduled_plans (lecture_date)")
+        # Time of the last claim by any process, so the generation rate is shared
+        self._conn.execute("CREATE TABLE IF NOT EXISTS scheduler_state (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    _COLUMNS = ("id", "lecture_date", "status", "form", "prompt", "cache_key",
+                "data", "error", "attempts", "created_at", "updated_at")
+
+    def _to_dict(self, row):
+        record = dict(zip(self._COLUMNS, row))
+        record["form"] = json.loads(record["form"])
+        return record
+
+    def register(self, lecture_date, form, prompt, cache_key):
+        """Register a lecture and return its schedule ID."""
+        schedule_id = f"scheduled_plan_{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO scheduled_plans (id, lecture_date, status, form, prompt, cache_key, created_at, updated_at) "
+                "VALUES (?, ?, 'scheduled', ?, ?, ?, ?, ?)",
+                (schedule_id, lecture_date.isoformat(), json.dumps(form), prompt, cache_key, now, now)
+            )
+        return schedule_id
+
+    def get(self, schedule_id):
+        """Return the registration, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM scheduled_plans WHERE id = ?", (schedule_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def _last_claim(self):
+        row = self._conn.execute("SELECT value FROM scheduler_state WHERE name = 'last_claim'").fetchone()
+        return row[0] if row else 0.0
+
+    def claim_due(self, today, lookahead_days, min_interval=0.0):
+        """
+        Atomically take the registration with the earliest lecture date in
+        [today, today + lookahead_days] that still needs a plan.
+
+        Returns None without claiming if any process using this database claimed
+        one less than min_interval seconds ago.
+        """
+        horizon = today + timedelta(days=lookahead_days)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if time.time() < self._last_claim() + min_interval:
+                    self._conn.execute("COMMIT")
+                    return None
+                row = self._conn.execute(
+                    f"SELECT {', '.join(self._COLUMNS)} FROM scheduled_plans "
+                    "WHERE (status = 'scheduled' OR (status = 'generating' AND updated_at < ?)) "
+                    "AND lecture_date BETWEEN ? AND ? ORDER BY lecture_date, created_at LIMIT 1",
+                    (time.time() - self.lease_seconds, today.isoformat(), horizon.isoformat())
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE scheduled_plans SET status = 'generating', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?",
+                        (time.time(), row[0])
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO scheduler_state (name, value) VALUES ('last_claim', ?)", (time.time(),)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(row) if row else None
+
+    def seconds_until_claim(self, min_interval):
+        """Seconds until claim_due may claim again at one claim per min_interval."""
+        with self._lock:
+            return max(0.0, self._last_claim() + min_interval - time.time())
+
+    def prune(self, today):
+        """Delete registrations whose lecture date has passed. Returns the number removed."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM scheduled_plans WHERE lecture_date < ?", (today.isoformat(),)
+            ).rowcount
+
+    def complete(self, schedule_id, data):
+        """Store the generated plan."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_plans SET status = 'completed', data = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (data, time.time(), schedule_id)
+            )
+
+    def fail(self, schedule_id, error):
+        """Record a failed attempt; the registration is retried until max_attempts is reached."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_plans SET status = CASE WHEN attempts >= ? THEN 'error' ELSE 'scheduled' END, "
+                "error = ?, updated_at = ? WHERE id = ?",
+                (self.max_attempts, error, time.time(), schedule_id)
+            )
+
+    def find_generated(self, cache_key):
+        """Return a pre-generated plan for the cache key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM scheduled_plans WHERE cache_key = ? AND status = 'completed' "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (cache_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+class OffPeakScheduler:
+    """
+    Generates registered lecture plans during the off-peak window.
+
+    Args:
+        store (ScheduledPlanStore): Where registrations and plans are kept
+        generate (callable): Coroutine function taking a prompt and returning the text or None
+        on_generated (callable, optional): Called with (record, text, seconds) after each plan
+        start_hour (int): Hour the off-peak window opens (local time)
+        end_hour (int): Hour the off-peak window closes (local time)
+        rate_per_minute (float): Maximum number of plans generated per minute
+        lookahead_days (int): Only lectures within this many days are generated
+        check_interval (float): Seconds to wait when there is nothing to do
+    """
+
+    def __init__(self, store, generate, on_generated=None, start_hour=22, end_hour=6,
+                 rate_per_minute=6, lookahead_days=2, check_interval=60):
+        self.store = store
+        self.generate = generate
+        self.on_generated = on_generated
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.rate_per_minute = rate_per_minute
+        self.lookahead_days = lookahead_days
+        self.check_interval = check_interval
+
+    async def run_once(self, today=None, min_interval=0.0):
+        """
+        Generate the next due plan. Returns True if a registration was processed.
+
+        Nothing is claimed if any process sharing the store claimed a plan less than
+        min_interval seconds ago.
+        """
+        record = self.store.claim_due(today or date.today(), self.lookahead_days, min_interval)
+        if record is None:
+            return False
+
+        started = time.monotonic()
+        try:
+            text = await self.generate(record["prompt"])
+        except Exception as e:
+            text = None
+            print(f"Error pre-generating {record['id']}: {str(e)}")
+
+        if not text:
+            self.store.fail(record["id"], "Failed to generate response")
+            return True
+
+        self.store.complete(record["id"], text)
+        if self.on_generated:
+            self.on_generated(record, text, time.monotonic() - started)
+        print(f"Pre-generated lecture plan {record['id']} for {record['lecture_date']}")
+        return True
+
+    async def run(self):
+        """Loop forever, generating at most rate_per_minute plans while off-peak."""
+        interval = 60 / self.rate_per_minute
+        pruned_on = None
+        while True:
+            now = datetime.now()
+            if pruned_on != now.date():
+                removed = self.store.prune(now.date())
+                pruned_on = now.date()
+                if removed:
+                    print(f"Pruned {removed} scheduled lecture plan(s) for past lectures")
+            if not in_off_peak_window(now.hour, self.start_hour, self.end_hour):
+                await asyncio.sleep(self.check_interval)
+                continue
+
+            if await self.run_once(now.date(), interval):
+                continue
+            # Space out generations across every process sharing the store
+            wait = self.store.seconds_until_claim(interval)
+            await asyncio.sleep(wait if wait > 0 else self.check_interval)
+
+
+def create_scheduler(store, generate, on_generated=None):
+    """
+    Build the scheduler configured through environment variables.
+
+    OFF_PEAK_START_HOUR, OFF_PEAK_END_HOUR, SCHEDULER_RATE_PER_MINUTE and
+    SCHEDULER_LOOKAHEAD_DAYS tune when and how fast plans are generated.
+    """
+    return OffPeakScheduler(
+        store,
+        generate,
+        on_generated=on_generated,
+        start_hour=int(os.getenv("OFF_PEAK_START_HOUR", "22")),
+        end_hour=int(os.getenv("OFF_PEAK_END_HOUR", "6")),
+        rate_per_minute=float(os.getenv("SCHEDULER_RATE_PER_MINUTE", "6")),
+        lookahead_days=int(os.getenv("SCHEDULER_LOOKAHEAD_DAYS", "2"))
+    )
+
+
+if __name__ == "__main__":
+    # Run only the scheduler, e.g. on a machine separate from the API processes
+    import api
+    asyncio.run(api.plan_scheduler.run())
@@ -0,0 +1,145 @@
+"""
+JSON shapes of generated results.
+
+The models mirror the sections the API prompts ask for, and the structures the
+Streamlit dashboards build from text, so a client that asks for `output_format: "json"` receives the parsed object directly.
+Replies are requested in JSON mode with the schema in the prompt, validated once
+on the server, and repaired with one short follow-up call if validation fails.
+"""
+import hashlib
+import json
+from typing import Dict, List
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+class Subtopic(BaseModel):
+    title: str = Field(description="Name of the subtopic")
+    summary: str = Field(description="Brief summary of the key concepts")
+    minutes: int = Field(description="Time allocated to the subtopic, in minutes")
+    learning_objectives: List[str] = Field(description="Specific learning objectives for the subtopic")
+
+
+class EngagementStrategy(BaseModel):
+    subtopic: str = Field(description="Title of the subtopic the strategy is for")
+    activity: str = Field(description="An interactive activity or discussion prompt")
+    example: str = Field(description="A real-world example or application")
+    check: str = Field(description="A quick check for understanding")
+
+
+class DifferentiationStrategies(BaseModel):
+    struggling_students: List[str] = Field(description="Ways to support struggling students")
+    advanced_students: List[str] = Field(description="Ways to challenge advanced students")
+    all_levels: List[str] = Field(description="Ways to engage all ability levels")
+
+
+class TimingAndPacing(BaseModel):
+    total_minutes: int = Field(description="Total duration of the class, in minutes")
+    allocation: List[str] = Field(description="Time allocated to each subtopic, in order")
+    breaks_and_transitions: List[str] = Field(description="Suggested breaks and transitions between subtopics")
+
+
+class LecturePlan(BaseModel):
+    """Sections asked for by prompts.generate_lecture_plan_prompt, in the same order."""
+    subtopics: List[Subtopic] = Field(description="SUBTOPICS BREAKDOWN: 4-6 subtopics in teaching order")
+    engagement_strategies: List[EngagementStrategy] = Field(description="ENGAGEMENT STRATEGIES: one per subtopic")
+    differentiation_strategies: DifferentiationStrategies = Field(description="DIFFERENTIATION STRATEGIES")
+    timing_and_pacing: TimingAndPacing = Field(description="TIMING AND PACING")
+
+
+class FeedbackItem(BaseModel):
+    title: str = Field(description="The point being assessed, e.g. 'Lecture Sequence'")
+    observation: str = Field(description="A specific observation from the lecture")
+    suggestion: str = Field(description="A concrete suggestion for improvement")
+    example: str = Field(description="An example of how to implement the suggestion")
+
+
+class TeachingFeedback(BaseModel):
+    """Numbered-point feedback from /generate-feedback, as parsed by pages/feedback.py."""
+    planning_and_preparation: List[FeedbackItem] = Field(description="DOMAIN 1 points, in the order asked")
+    classroom_environment: List[FeedbackItem] = Field(description="DOMAIN 2 points, in the order asked")
+    instruction: List[FeedbackItem] = Field(description="DOMAIN 3 points, in the order asked")
+
+
+class OverallFeedback(BaseModel):
+    strengths: List[str] = Field(description="Key strengths observed, with examples from the transcript")
+    improvements: List[str] = Field(description="Areas for improvement, with examples from the transcript")
+    avoid: List[str] = Field(description="Practices to avoid or rethink, with examples from the transcript")
+
+
+class FeedbackReport(BaseModel):
+    """Dashboard report, as parsed by pages/feedback_display.py; domains map each subsection to its bullets."""
+    overall: OverallFeedback
+    planning: Dict[str, List[str]] = Field(description="DOMAIN 1: PLANNING AND PREPARATION subsections and their bullets")
+    environment: Dict[str, List[str]] = Field(description="DOMAIN 2: CLASSROOM ENVIRONMENT subsections and their bullets")
+    instruction: Dict[str, List[str]] = Field(description="DOMAIN 3: INSTRUCTION subsections and their bullets")
+
+
+# Schemas jobs may ask for, by the name stored with the job
+SCHEMAS = {
+    "lecture_plan": LecturePlan,
+    "feedback": TeachingFeedback,
+    "feedback_report": FeedbackReport,
+}
+
+# Output formats accepted in FormData.output_format
+OUTPUT_FORMATS = ("text", "json")
+
+
+def schema_fingerprint(name):
+    """Short hash of a schema's definition, so cached replies are not reused after it changes."""
+    schema = json.dumps(SCHEMAS[name].model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+def schema_instructions(name, fields=None):
+    """
+    Instructions appended to a prompt so the reply is a JSON object of the named schema.
+
+    Args:
+        name (str): Key of SCHEMAS
+        fields (list, optional): Only ask for these top-level fields
+    """
+    schema = SCHEMAS[name].model_json_schema()
+    if fields is not None:
+        schema["properties"] = {key: schema["properties"][key] for key in fields}
+        schema["required"] = list(fields)
+    return (
+        "\n    Respond with a single JSON object, and nothing else, that matches this JSON Schema. "
+        "Put all of the content requested above into the matching fields:\n"
+        f"    {json.dumps(schema)}\n"
+    )
+
+
+def validate_result(name, text):
+    """
+    Parse and validate a JSON reply.
+
+    Returns:
+        dict: The validated object, with defaults filled in
+
+    Raises:
+        ValueError: If the text is not valid JSON of the named schema
+    """
+    try:
+        return SCHEMAS[name].model_validate_json(text).model_dump()
+    except ValidationError as e:
+        raise ValueError(f"Reply does not match the {name} schema: {e}") from e
+
+
+def repair_prompt(name, text, error):
+    """Prompt asking the model to fix a reply that failed validation, without rewriting its content."""
+    return f"""
+    The JSON below was meant to match this JSON Schema but failed validation.
+
+    SCHEMA:
+    {json.dumps(SCHEMAS[name].model_json_schema())}
+
+    VALIDATION ERROR:
+    {error}
+
+    JSON:
+    {text}
+
+    Return the corrected JSON object only. Keep all of the existing content; change only what is needed to match the schema.
+    """
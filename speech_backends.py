@@ -0,0 +1,149 @@
+"""
+Speech recognition backends for speech_to_text.py and quick_test.py.
+
+Every backend turns one sr.AudioData segment into text and signals failures the
+way speech_recognition does: sr.UnknownValueError when nothing intelligible was
+said and sr.RequestError when the engine itself could not be used.
+
+    backend = create_backend("sphinx")
+    text = backend.recognize(recognizer, audio)
+
+"google" sends each segment to Google's free web API. "sphinx" runs CMU
+PocketSphinx on the local CPU (pip install pocketsphinx), so it keeps working
+without a network connection and its throughput depends on local cores.
+"""
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import speech_recognition as sr
+
+# Backend used when none is chosen
+DEFAULT_BACKEND = os.getenv("SPEECH_BACKEND", "google")
+
+# Language of the lectures, e.g. en-US
+SPEECH_LANGUAGE = os.getenv("SPEECH_LANGUAGE", "en-US")
+
+# Segments recognized at once; 0 picks one per core for local engines and 4 for online ones
+SPEECH_WORKERS = int(os.getenv("SPEECH_WORKERS", "0"))
+
+
+class SpeechBackend:
+    """Base class: recognize() one segment of audio."""
+
+    name = ""
+    label = ""
+    # True when recognition runs on this machine and needs no network
+    local = False
+    # Package to install when is_available() is False
+    requirement = None
+
+    def __init__(self, language=None):
+        self.language = language or SPEECH_LANGUAGE
+
+    @classmethod
+    def is_available(cls):
+        """Whether the packages the backend needs are installed."""
+        return True
+
+    def recognize(self, recognizer, audio):
+        """
+        Transcribe one segment.
+
+        Args:
+            recognizer (sr.Recognizer): Recognizer the segment was captured with
+            audio (sr.AudioData): The segment
+
+        Returns:
+            str: The recognized text
+
+        Raises:
+            sr.UnknownValueError: If no speech could be recognized
+            sr.RequestError: If the engine is unreachable or not installed
+        """
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    """Google Web Speech API: accurate, but one network round trip per segment."""
+
+    name = "google"
+    label = "Google (online)"
+
+    def recognize(self, recognizer, audio):
+        return recognizer.recognize_google(audio, language=self.language)
+
+
+class SphinxBackend(SpeechBackend):
+    """CMU PocketSphinx: offline and CPU-only."""
+
+    name = "sphinx"
+    label = "PocketSphinx (offline)"
+    local = True
+    requirement = "pocketsphinx"
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.requirement) is not None
+
+    def recognize(self, recognizer, audio):
+        text = recognizer.recognize_sphinx(audio, language=self.language)
+        if not text.strip():
+            raise sr.UnknownValueError()
+        return text
+
+
+# Backends by name, in the order they are offered
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, SphinxBackend)}
+
+
+def available_backends():
+    """Names of the backends whose packages are installed."""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def create_backend(name=None, language=None):
+    """
+    Create a backend by name.
+
+    Args:
+        name (str, optional): Key of BACKENDS; defaults to SPEECH_BACKEND
+        language (str, optional): Language of the speech; defaults to SPEECH_LANGUAGE
+
+    Raises:
+        ValueError: If the name is unknown
+        sr.RequestError: If the backend's packages are not installed
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown speech backend: {name} (choose from {', '.join(BACKENDS)})")
+    backend = BACKENDS[name]
+    if not backend.is_available():
+        raise sr.RequestError(f"The {name} speech backend is not installed (pip install {backend.requirement})")
+    return backend(language)
+
+
+def worker_count(backend):
+    """How many segments to recognize at once with this backend."""
+    if SPEECH_WORKERS > 0:
+        return SPEECH_WORKERS
+    return (os.cpu_count() or 1) if backend.local else 4
+
+
+def create_executor(backend, workers):
+    """
+    Pool that runs transcribe() for a backend.
+
+    Local engines are CPU-bound and get worker processes so they use every core;
+    online engines wait on the network and get threads. Processes are spawned, not
+    forked, because the recorder forks from a multi-threaded Qt application.
+    """
+    if backend.local:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speech")
+
+
+def transcribe(backend, audio):
+    """Recognize one segment; runs in a pool worker, so it uses a recognizer of its own."""
+    return backend.recognize(sr.Recognizer(), audio)
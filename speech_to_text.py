@@ -4,15 +4,31 @@ import cv2
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QPushButton, QTextEdit, QLabel, QMessageBox, QHBoxLayout,
-                           QFrame)
-from PyQt5.QtCore import Qt, QTimer
+                           QFrame, QComboBox, QProgressBar, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap, QFont
 import threading
+import os
 import sys
 import queue
 import time
+from audio_buffer import create_spool, find_spools
+from camera import CameraThread, PREVIEW_WIDTH, PREVIEW_HEIGHT
+from video_recorder import VideoRecorder, VIDEO_EXTENSION
+from speech_backends import (BACKENDS, DEFAULT_BACKEND, available_backends, create_backend,
+                             create_executor, transcribe, worker_count)
+
+# Longest segment handed to the recognizer; bounds how far transcription lags behind speech
+MAX_SEGMENT_SECONDS = 30
 
 class SpeechToTextApp(QMainWindow):
+    # Emitted from the capture and recognition threads; Qt delivers them on the GUI thread
+    segment_captured = pyqtSignal()
+    segment_recognized = pyqtSignal(int, str)
+    status_changed = pyqtSignal(str)
+    microphone_failed = pyqtSignal(str)
+    recognition_finished = pyqtSignal()
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Speech to Text with Video Recording")
@@ -21,11 +37,23 @@ class SpeechToTextApp(QMainWindow):
         # Initialize variables
         self.is_recording = False
         self.video_capture = None
+        self.camera_thread = None  # Reads the camera off the GUI thread
         self.recognizer = sr.Recognizer()
-        self.audio_data = []
+        self.backend = None  # Speech backend of the current recording
+        self.audio_spool = None  # Captured audio of the current recording, on disk
+        self.video_recorder = None  # Encodes the camera to a file while recording video
+        self.recorded_video_path = None  # Video file of the last recording, if it recorded video
+        self.audio_export = None  # Thread writing the audio that goes with a recorded video
+        self.recognition_thread = None  # Captures audio from the microphone while recording
         self.recording_start_time = 0
         self.generated_text = ""  # Store the generated text
         self.text_history = []    # Store history of all generated texts
+        self.segment_queue = queue.Queue()  # Spool indexes of captured segments waiting for recognition
+        self.session_text = []    # Text recognized so far in the current recording
+        self.pending_results = {}  # Recognized segments waiting for an earlier one, by index
+        self.next_segment = 0      # Index of the next segment to show
+        self.segments_captured = 0
+        self.segments_done = 0
         
         # Create central widget and layout
         central_widget = QWidget()
@@ -41,7 +69,7 @@ class SpeechToTextApp(QMainWindow):
         video_layout = QVBoxLayout(video_frame)
         
         self.video_label = QLabel()
-        self.video_label.setMinimumSize(640, 480)
+        self.video_label.setMinimumSize(PREVIEW_WIDTH, PREVIEW_HEIGHT)
         self.video_label.setAlignment(Qt.AlignCenter)
         video_layout.addWidget(self.video_label)
         main_layout.addWidget(video_frame)
@@ -121,6 +149,19 @@ class SpeechToTextApp(QMainWindow):
         self.clear_button.clicked.connect(self.clear_text)
         button_layout.addWidget(self.clear_button)
         
+        # Speech recognition backend, chosen per recording
+        self.backend_selector = QComboBox()
+        self.backend_selector.setFixedWidth(200)
+        for name in available_backends():
+            self.backend_selector.addItem(BACKENDS[name].label, name)
+        default_index = self.backend_selector.findData(DEFAULT_BACKEND)
+        if default_index >= 0:
+            self.backend_selector.setCurrentIndex(default_index)
+        button_layout.addWidget(self.backend_selector)
+        
+        self.record_video_checkbox = QCheckBox("Record video")
+        button_layout.addWidget(self.record_video_checkbox)
+        
         main_layout.addLayout(button_layout)
         
         # Status label
@@ -129,13 +170,33 @@ class SpeechToTextApp(QMainWindow):
         self.status_label.setStyleSheet("color: #666; font-size: 12px;")
         main_layout.addWidget(self.status_label)
         
+        # Segments recognized out of segments captured
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("Transcribed %v of %m segments")
+        self.progress_bar.setMaximum(0)
+        self.progress_bar.hide()
+        main_layout.addWidget(self.progress_bar)
+        
+        # Updates from background threads
+        self.segment_captured.connect(self.count_segment)
+        self.segment_recognized.connect(self.add_segment_text)
+        self.status_changed.connect(self.status_label.setText)
+        self.microphone_failed.connect(self.show_microphone_error)
+        self.recognition_finished.connect(self.finish_recognition)
+        
+        # Spool files are deleted on a clean exit, so any left over are from a crash
+        interrupted = find_spools()
+        if interrupted:
+            self.status_label.setText(f"Found {len(interrupted)} interrupted recording(s) in {os.path.dirname(interrupted[0])}; "
+                                      "export them with audio_buffer.py")
+        
         # Initialize video capture
         self.initialize_camera()
         
-        # Start video preview
+        # Start video preview; the interval follows the camera's frame rate
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_video)
-        self.timer.start(30)  # Update every 30ms
+        self.timer.start(30)
         
         # Timer for recording duration
         self.duration_timer = QTimer()
@@ -149,32 +210,46 @@ class SpeechToTextApp(QMainWindow):
                 QMessageBox.warning(self, "Camera Error", 
                                   "Could not access the camera. Please check camera permissions in System Preferences > Security & Privacy > Privacy > Camera")
                 self.video_capture = None
+            else:
+                self.camera_thread = CameraThread(self.video_capture)
+                self.camera_thread.start()
         except Exception as e:
             QMessageBox.warning(self, "Camera Error", 
                               f"Error initializing camera: {str(e)}")
             self.video_capture = None
         
     def update_video(self):
-        if self.video_capture is not None and self.video_capture.isOpened():
-            ret, frame = self.video_capture.read()
-            if ret:
-                # Convert frame to RGB
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Resize frame to fit the window
-                frame = cv2.resize(frame, (640, 480))
-                
-                # Convert to QImage
-                h, w, ch = frame.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                
-                # Update video label
-                self.video_label.setPixmap(QPixmap.fromImage(qt_image))
-            else:
-                self.status_label.setText("Error: Could not read from camera")
-        else:
+        if self.camera_thread is None:
             self.status_label.setText("Camera not available")
+            return
+        if self.camera_thread.failed:
+            self.status_label.setText("Error: Could not read from camera")
+            return
+        
+        frame = self.camera_thread.latest()
+        if frame is not None:
+            # The QImage wraps the capture thread's buffer without copying it
+            h, w, ch = frame.shape
+            qt_image = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888)
+            self.video_label.setPixmap(QPixmap.fromImage(qt_image))
+        
+        # Poll about as often as the camera delivers frames, between 15 and 100 ms
+        interval = min(max(int(self.camera_thread.frame_interval * 1000), 15), 100)
+        if abs(interval - self.timer.interval()) > 5:
+            self.timer.setInterval(interval)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.camera_thread is not None:
+            self.camera_thread.resume()
+        self.timer.start()
+    
+    def hideEvent(self, event):
+        # Nothing to preview while hidden or minimized, but keep the camera running for a recording
+        super().hideEvent(event)
+        self.timer.stop()
+        if self.camera_thread is not None and self.video_recorder is None:
+            self.camera_thread.pause()
     
     def toggle_recording(self):
         if not self.is_recording:
@@ -183,27 +258,86 @@ class SpeechToTextApp(QMainWindow):
             self.stop_recording()
     
     def start_recording(self):
+        try:
+            self.backend = create_backend(self.backend_selector.currentData())
+        except (ValueError, sr.RequestError) as e:
+            QMessageBox.warning(self, "Speech Recognition Error", str(e))
+            return
+        
+        # Clear previous recording data; audio is spooled to disk as it is captured
+        self.release_audio()
+        try:
+            self.audio_spool = create_spool()
+        except OSError as e:
+            QMessageBox.warning(self, "Recording Error", f"Could not create audio file: {str(e)}")
+            return
+        
+        self.backend_selector.setEnabled(False)
         self.is_recording = True
         self.record_button.setText("Stop Recording")
         self.status_label.setText("Recording...")
         self.recording_indicator.setText("● RECORDING")
         self.recording_start_time = time.time()
         self.duration_timer.start()
-        self.audio_data = []  # Clear previous recording data
+        self.session_text = []
+        self.pending_results = {}
+        self.next_segment = 0
+        self.segments_captured = 0
+        self.segments_done = 0
+        self.segment_queue = queue.Queue()
+        self.progress_bar.setMaximum(0)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        
+        self.recorded_video_path = None
+        if self.record_video_checkbox.isChecked():
+            self.start_video_recording()
         
-        # Start speech recognition in a separate thread
-        self.recognition_thread = threading.Thread(target=self.record_speech)
+        # Recognize segments on a worker pool while the next ones are being captured
+        self.recognizer_thread = threading.Thread(
+            target=self.recognize_segments, args=(self.segment_queue, self.audio_spool, self.backend), daemon=True
+        )
+        self.recognizer_thread.start()
+        
+        # Start speech capture in a separate thread
+        self.recognition_thread = threading.Thread(target=self.record_speech, args=(self.segment_queue,))
         self.recognition_thread.start()
     
     def stop_recording(self):
+        if not self.is_recording:
+            return
         self.is_recording = False
         self.record_button.setText("Start Recording")
-        self.status_label.setText("Processing audio...")
+        self.status_label.setText("Finishing transcription...")
         self.recording_indicator.setText("")
         self.duration_timer.stop()
+        self.stop_video_recording()
         
-        # Process all recorded audio
-        self.process_recorded_audio()
+        # Most segments are already transcribed; wait for the last ones before recording again
+        self.record_button.setEnabled(False)
+    
+    def start_video_recording(self):
+        """Record the camera next to the audio spool, on the same clock as the audio segments."""
+        if self.camera_thread is None:
+            self.status_label.setText("Recording without video: camera not available")
+            return
+        path = os.path.splitext(self.audio_spool.path)[0] + VIDEO_EXTENSION
+        self.video_recorder = VideoRecorder(path, self.camera_thread.size)
+        self.video_recorder.start(self.recording_start_time)
+        self.camera_thread.frame_listener = self.video_recorder.add_frame
+        self.camera_thread.resume()
+        self.record_video_checkbox.setEnabled(False)
+    
+    def stop_video_recording(self):
+        if self.video_recorder is None:
+            return
+        self.camera_thread.frame_listener = None
+        self.video_recorder.stop()
+        self.recorded_video_path = self.video_recorder.path
+        self.video_recorder = None
+        self.record_video_checkbox.setEnabled(True)
+        if self.isMinimized() or not self.isVisible():
+            self.camera_thread.pause()
     
     def update_duration(self):
         if self.is_recording:
@@ -212,56 +346,129 @@ class SpeechToTextApp(QMainWindow):
             seconds = duration % 60
             self.duration_label.setText(f"{minutes:02d}:{seconds:02d}")
     
-    def record_speech(self):
+    def record_speech(self, segments):
+        """Capture thread: hand each segment to the recognizer as soon as listen() returns."""
         try:
             with sr.Microphone() as source:
                 self.recognizer.adjust_for_ambient_noise(source)
                 
                 while self.is_recording:
                     try:
-                        audio = self.recognizer.listen(source, timeout=5)
-                        self.audio_data.append(audio)
+                        audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=MAX_SEGMENT_SECONDS)
+                        # Offset of the segment from the start of the recording
+                        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+                        index = self.audio_spool.append(audio, time.time() - self.recording_start_time - duration)
+                        self.segment_captured.emit()
+                        # Only the index is queued: waiting segments stay on disk, not in memory
+                        segments.put(index)
                     except sr.WaitTimeoutError:
                         continue
                     except sr.UnknownValueError:
                         continue
                     except sr.RequestError as e:
-                        self.status_label.setText(f"Error: {str(e)}")
+                        self.status_changed.emit(f"Error: {str(e)}")
                         break
                     except Exception as e:
-                        self.status_label.setText(f"Error: {str(e)}")
+                        self.status_changed.emit(f"Error: {str(e)}")
                         break
         except Exception as e:
-            QMessageBox.warning(self, "Microphone Error", 
-                              f"Error accessing microphone: {str(e)}")
-            self.stop_recording()
+            self.microphone_failed.emit(f"Error accessing microphone: {str(e)}")
+        finally:
+            # No more segments: the recognizer finishes the queue and stops
+            segments.put(None)
     
-    def process_recorded_audio(self):
+    def recognize_segments(self, segments, spool, backend):
+        """Dispatch thread: recognize up to worker_count(backend) segments at once, in capture order."""
+        workers = worker_count(backend)
+        # Bounds the segments read back into memory for the pool; the rest wait on disk
+        slots = threading.BoundedSemaphore(workers * 2)
+        
+        def segment_done(index, future):
+            text = ""
+            try:
+                text = future.result()
+            except sr.UnknownValueError:
+                pass
+            except sr.RequestError as e:
+                # Keep going: a dropped request should not lose the rest of the lecture
+                self.status_changed.emit(f"Error: {str(e)}")
+            except Exception as e:
+                self.status_changed.emit(f"Error processing audio: {str(e)}")
+            slots.release()
+            self.segment_recognized.emit(index, text)
+        
+        executor = None
         try:
-            self.status_label.setText("Converting speech to text...")
-            current_text = ""  # Temporary variable to store current session's text
-            
-            for audio in self.audio_data:
+            executor = create_executor(backend, workers)
+            while True:
+                index = segments.get()
+                if index is None:
+                    break
+                slots.acquire()
                 try:
-                    text = self.recognizer.recognize_google(audio)
-                    current_text += text + " "  # Add space between segments
-                    self.update_text(text)
-                except sr.UnknownValueError:
+                    audio = spool.segment(index)
+                except (OSError, ValueError, IndexError) as e:
+                    # The spool was released, e.g. when the window closed mid-recording
+                    slots.release()
+                    self.status_changed.emit(f"Error reading audio: {str(e)}")
+                    self.segment_recognized.emit(index, "")
                     continue
-                except sr.RequestError as e:
-                    self.status_label.setText(f"Error: {str(e)}")
-                    break
-            
-            # Store the generated text
-            if current_text.strip():  # Only store if there's actual text
-                self.generated_text = current_text.strip()
-                self.text_history.append(self.generated_text)
-            
-            self.status_label.setText("Ready")
+                future = executor.submit(transcribe, backend, audio)
+                future.add_done_callback(lambda future, index=index: segment_done(index, future))
         except Exception as e:
-            self.status_label.setText(f"Error processing audio: {str(e)}")
+            self.status_changed.emit(f"Error processing audio: {str(e)}")
+        finally:
+            if executor is not None:
+                # Waits for the segments still being recognized
+                executor.shutdown(wait=True)
+            self.recognition_finished.emit()
+    
+    def finish_recognition(self):
+        """Store the transcript of the recording once its last segment is recognized."""
+        if self.session_text:  # Only store if there's actual text
+            self.generated_text = " ".join(self.session_text)
+            self.text_history.append(self.generated_text)
+        
+        if self.is_recording:
+            # Capture stopped on an error; keep the error in the status bar
+            self.is_recording = False
+            self.record_button.setText("Start Recording")
+            self.recording_indicator.setText("")
+            self.duration_timer.stop()
+            self.stop_video_recording()
+        elif self.recorded_video_path:
+            # Audio with pauses kept as silence, so it lines up with the video for muxing
+            audio_path = os.path.splitext(self.recorded_video_path)[0] + ".wav"
+            self.audio_export = threading.Thread(target=self.audio_spool.export_wav, args=(audio_path,))
+            self.audio_export.start()
+            self.status_label.setText(f"Saved video to {self.recorded_video_path} and audio to {audio_path}")
+        else:
+            self.status_label.setText("Ready")
+        self.record_button.setEnabled(True)
+        self.backend_selector.setEnabled(True)
+        self.progress_bar.hide()
+    
+    def show_microphone_error(self, message):
+        QMessageBox.warning(self, "Microphone Error", message)
+    
+    def count_segment(self):
+        self.segments_captured += 1
+        self.progress_bar.setMaximum(self.segments_captured)
+    
+    def add_segment_text(self, index, text):
+        """Show recognized text in capture order, holding results that arrive early."""
+        self.pending_results[index] = text
+        while self.next_segment in self.pending_results:
+            text = self.pending_results.pop(self.next_segment)
+            self.next_segment += 1
+            if text:
+                self.update_text(text)
+        
+        self.segments_done += 1
+        self.progress_bar.setValue(self.segments_done)
     
     def update_text(self, text):
+        self.session_text.append(text)
         self.text_display.append(text)
     
     def get_generated_text(self):
@@ -272,14 +479,45 @@ class SpeechToTextApp(QMainWindow):
         """Return the history of all generated texts"""
         return self.text_history
     
+    def release_audio(self):
+        """Delete the captured audio of the last recording."""
+        if self.audio_export is not None:
+            self.audio_export.join()
+            self.audio_export = None
+        if self.audio_spool is not None:
+            self.audio_spool.clear()
+            self.audio_spool = None
+    
     def clear_text(self):
-        """Clear both the display and stored text"""
+        """Clear both the display and stored text, and the recorded audio"""
+        if not self.is_recording and self.record_button.isEnabled():
+            self.release_audio()
         self.text_display.clear()
         self.generated_text = ""
         self.text_history = []
         self.status_label.setText("Text cleared")
     
     def closeEvent(self, event):
+        self.is_recording = False
+        # Wait for the capture thread's last segment so nothing is appended to a closed spool
+        if self.recognition_thread is not None:
+            self.recognition_thread.join()
+        # Let the encoder finish the file before the process exits and kills it
+        self.stop_video_recording()
+        if self.recorded_video_path and self.audio_export is None and self.audio_spool is not None:
+            # Closed while recording video: write its audio as finish_recognition would
+            audio_path = os.path.splitext(self.recorded_video_path)[0] + ".wav"
+            try:
+                self.audio_spool.export_wav(audio_path)
+            except Exception as e:
+                # Keep the spool file so the audio can still be exported with audio_buffer.py
+                print(f"Error exporting audio to {audio_path}: {str(e)}")
+                self.audio_spool.close()
+                self.audio_spool = None
+        self.release_audio()
+        if self.camera_thread is not None:
+            self.camera_thread.stop()
+            self.camera_thread.join(timeout=1)
         if self.video_capture is not None:
             self.video_capture.release()
         event.accept()
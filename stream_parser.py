@@ -0,0 +1,200 @@
+"""
+Incremental parsers for generated feedback reports and lecture plans.
+
+Text is pushed in as it streams from the model. Every completed line updates the
+same structure the dashboards build (see parse_feedback_report and
+parse_lecture_plan) and produces events, so a page can render Strengths or Domain 1
+while later sections are still being generated:
+
+    parser = FeedbackReportStreamParser()
+    for chunk in stream:
+        for event in parser.feed(chunk):
+            ...
+    events = parser.close()
+
+Events are dicts with an "event" key:
+    {"event": "section", "section": ...}                       a section started
+    {"event": "subsection", "section": ..., "subsection": ...}  a domain subsection started
+    {"event": "item", "section": ..., "subsection": ..., "text": ...}
+    {"event": "section_done", "section": ...}                  no more items will follow for this section
+"""
+
+DOMAIN_SECTIONS = ("planning", "environment", "instruction")
+
+
+class _LineStreamParser:
+    """Buffers streamed text and hands complete, stripped lines to _line()."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._events = []
+        self._section = None
+
+    def feed(self, text):
+        """Add streamed text. Returns the events for every line it completed."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._line(line.strip())
+        return self._drain()
+
+    def close(self):
+        """End of stream: parse the last line, which has no newline, and finish the open section."""
+        if self._buffer:
+            self._line(self._buffer.strip())
+            self._buffer = ""
+        self._enter(None)
+        return self._drain()
+
+    def _drain(self):
+        events, self._events = self._events, []
+        return events
+
+    def _enter(self, section):
+        if self._section is not None:
+            self._events.append({"event": "section_done", "section": self._section})
+        self._section = section
+        if section is not None:
+            self._events.append({"event": "section", "section": section})
+
+    def _line(self, line):
+        raise NotImplementedError
+
+
+class FeedbackReportStreamParser(_LineStreamParser):
+    """
+    Parses the dashboard feedback report ("Overall Feedback:" then three DOMAIN
+    sections of "Subsection:" headers and "-" bullets).
+
+    `sections` has the structure of pages/feedback_display.parse_feedback at all times.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sections = {
+            "overall": {
+                "strengths": [],
+                "improvements": [],
+                "avoid": []
+            },
+            "planning": {},
+            "environment": {},
+            "instruction": {}
+        }
+        self._subsection = None
+
+    def _line(self, line):
+        # Skip empty lines
+        if not line:
+            return
+
+        # Check for main sections
+        if "Overall Feedback:" in line:
+            self._enter("overall")
+            return
+        elif "DOMAIN 1: PLANNING AND PREPARATION" in line:
+            self._enter("planning")
+            return
+        elif "DOMAIN 2: CLASSROOM ENVIRONMENT" in line:
+            self._enter("environment")
+            return
+        elif "DOMAIN 3: INSTRUCTION" in line:
+            self._enter("instruction")
+            return
+
+        # Check for overall feedback subsections
+        if self._section == "overall":
+            if "Strengths:" in line:
+                self._subsection = "strengths"
+                return
+            elif "Areas for Improvement:" in line:
+                self._subsection = "improvements"
+                return
+            elif "Avoid/Rethink:" in line:
+                self._subsection = "avoid"
+                return
+
+        # Check for domain subsections
+        if self._section in DOMAIN_SECTIONS:
+            if line.endswith(":"):
+                self._subsection = line[:-1].strip()
+                self._start_subsection()
+                return
+
+        # Add content to current section
+        if line.startswith("-") and self._subsection:
+            content = line[1:].strip()
+            if self._section == "overall":
+                if self._subsection not in self.sections["overall"]:
+                    # A domain subsection is still current after a repeated "Overall Feedback:" header
+                    return
+                self.sections["overall"][self._subsection].append(content)
+            elif self._section in DOMAIN_SECTIONS:
+                self._start_subsection()
+                self.sections[self._section][self._subsection].append(content)
+            else:
+                return
+            self._events.append({
+                "event": "item", "section": self._section, "subsection": self._subsection, "text": content
+            })
+
+    def _start_subsection(self):
+        if self._subsection not in self.sections[self._section]:
+            self.sections[self._section][self._subsection] = []
+            self._events.append({"event": "subsection", "section": self._section, "subsection": self._subsection})
+
+
+# Lecture plan headers and the sections they start, in report order
+LECTURE_PLAN_HEADERS = {
+    "Overview:": "Overview",
+    "Learning Objectives:": "Learning Objectives",
+    "Materials:": "Materials",
+    "Timeline:": "Timeline",
+    "Assessment:": "Assessment",
+}
+
+
+class LecturePlanStreamParser(_LineStreamParser):
+    """
+    Parses a lecture plan of "Overview:", "Learning Objectives:", "Materials:",
+    "Timeline:" and "Assessment:" sections.
+
+    `sections` has the structure of pages/lecture_plan_display.parse_lecture_plan at all times.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sections = {section: [] for section in LECTURE_PLAN_HEADERS.values()}
+
+    def _line(self, line):
+        # Skip empty lines
+        if not line:
+            return
+
+        # Check for section headers
+        for header, section in LECTURE_PLAN_HEADERS.items():
+            if line.startswith(header):
+                self._enter(section)
+                return
+
+        # Add content to current section
+        if self._section:
+            content = line[2:] if line.startswith("- ") else line
+            self.sections[self._section].append(content)
+            self._events.append({"event": "item", "section": self._section, "subsection": None, "text": content})
+
+
+def parse_feedback_report(feedback_text):
+    """Parse a complete feedback report into structured data."""
+    parser = FeedbackReportStreamParser()
+    parser.feed(feedback_text)
+    parser.close()
+    return parser.sections
+
+
+def parse_lecture_plan(plan_text):
+    """Parse a complete lecture plan into structured data."""
+    parser = LecturePlanStreamParser()
+    parser.feed(plan_text)
+    parser.close()
+    return parser.sections
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("RESPONSE_CACHE_PATH", "")
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+
+from fastapi.testclient import TestClient
+
+import api
+from job_store import InMemoryJobStore
+from response_cache import ResponseCache
+
+client = TestClient(api.app)
+
+form = {
+    "grade": "8th",
+    "topic": "Fractions",
+    "country": "United States",
+    "location": "Springfield Middle School",
+    "number_of_students": "30",
+    "teaching_tenure_years": "3 years",
+    "percentage_of_girls": "50%",
+    "percentage_of_boys": "50%",
+    "attendance_percentage": "90%",
+    "grade_level_competence": "mixed",
+    "classroom_challenges": "large class"
+}
+
+PLAN = {
+    "subtopics": [{"title": "Like denominators", "summary": "Add numerators", "minutes": 15,
+                   "learning_objectives": ["Add fractions with like denominators"]}],
+    "engagement_strategies": [{"subtopic": "Like denominators", "activity": "Fraction strips",
+                               "example": "Sharing a pizza", "check": "Exit ticket"}],
+    "differentiation_strategies": {"struggling_students": ["Visuals"], "advanced_students": ["Unlike denominators"],
+                                   "all_levels": ["Pairs"]},
+    "timing_and_pacing": {"total_minutes": 50, "allocation": ["15 min"], "breaks_and_transitions": ["Stretch"]},
+}
+
+
+class FakeAI:
+    """Stands in for OpenAIIntegration: streams a plan for the prompt's topic and fails for topic "Broken"."""
+
+    model = "fake-model"
+
+    def generation_params(self):
+        return {}
+
+    async def stream_response_async(self, prompt, model=None, json_mode=False):
+        if "Broken" in prompt:
+            raise RuntimeError("upstream unavailable")
+        if json_mode:
+            yield json.dumps(PLAN)
+            return
+        for piece in ("Plan ", "for ", "the ", "lesson"):
+            yield piece
+
+    async def get_response_async(self, prompt, model=None, json_mode=False):
+        return "".join([piece async for piece in self.stream_response_async(prompt, model, json_mode)])
+
+
+@pytest.fixture(autouse=True)
+def stub_upstream(monkeypatch):
+    """Fresh job store and cache per test, an offline upstream, and jobs left queued until run_queued()"""
+    ai = FakeAI()
+    monkeypatch.setattr(api, "get_ai", lambda: ai)
+    monkeypatch.setattr(api, "job_store", InMemoryJobStore())
+    monkeypatch.setattr(api, "response_cache", ResponseCache(path=None))
+    monkeypatch.setattr(api, "JOB_EXECUTION", "worker")
+
+def run_queued(request_ids):
+    """Run the given queued jobs the way a worker would"""
+    for request_id in request_ids:
+        asyncio.run(api.run_job(api.job_store.get(request_id)))
+
+def submit_batch(*topics):
+    response = client.post("/generate-lecture-plans/batch", json={"forms": [dict(form, topic=t) for t in topics]})
+    assert response.status_code == 200
+    batch_id = response.json()["batch_id"]
+    return batch_id, api.job_store.get(batch_id)["item_ids"]
+
+def stream_events(path, body):
+    """POST to a streaming endpoint and return its (event, data) pairs in order"""
+    response = client.post(path, json=body)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_batch_reports_partial_completion():
+    """Items are reported one by one while the rest of the batch is still running"""
+    batch_id, item_ids = submit_batch("Fractions", "Decimals", "Percentages")
+
+    status = client.get(f"/batch/{batch_id}").json()
+    assert (status["status"], status["total"], status["processing"]) == ("processing", 3, 3)
+
+    run_queued(item_ids[:1])
+    status = client.get(f"/batch/{batch_id}").json()
+    assert (status["status"], status["completed"], status["processing"]) == ("processing", 1, 2)
+    assert status["items"][0] == {"request_id": item_ids[0], "status": "completed",
+                                  "data": "Plan for the lesson", "result": None}
+
+    run_queued(item_ids[1:])
+    status = client.get(f"/batch/{batch_id}").json()
+    assert (status["status"], status["completed"]) == ("completed", 3)
+
+def test_batch_item_errors_are_reported_per_item():
+    """A failed item is an error entry; the other items still complete"""
+    batch_id, item_ids = submit_batch("Fractions", "Broken")
+    run_queued(item_ids)
+
+    status = client.get(f"/batch/{batch_id}").json()
+    assert (status["status"], status["completed"], status["error"]) == ("completed", 1, 1)
+    assert status["items"][1] == {"request_id": item_ids[1], "status": "error", "error": "upstream unavailable"}
+
+def test_status_leaves_batch_items_for_the_batch():
+    """Polling an item with /status does not make /batch report it as expired"""
+    batch_id, item_ids = submit_batch("Fractions", "Broken")
+    run_queued(item_ids)
+
+    for _ in range(2):
+        assert client.get(f"/status/{item_ids[0]}").json()["data"] == "Plan for the lesson"
+        assert client.get(f"/status/{item_ids[1]}").status_code == 500
+    status = client.get(f"/batch/{batch_id}").json()
+    assert (status["completed"], status["error"], status["expired"]) == (1, 1, 0)
+
+    # The batch ID itself is not a request, and single requests are still removed once read
+    assert client.get(f"/status/{batch_id}").status_code == 404
+    request_id = client.post("/generate-lecture-plan", json=form).json()["request_id"]
+    run_queued([request_id])
+    assert client.get(f"/status/{request_id}").json()["status"] == "success"
+    assert client.get(f"/status/{request_id}").status_code == 404
+
+def test_batch_validation():
+    """Empty and oversized batches are rejected, unknown batch IDs are not found"""
+    assert client.post("/generate-lecture-plans/batch", json={"forms": []}).status_code == 400
+    too_many = {"forms": [form] * (api.BATCH_MAX_ITEMS + 1)}
+    assert client.post("/generate-lecture-plans/batch", json=too_many).status_code == 400
+    assert client.get("/batch/batch_missing").status_code == 404
+
+def test_stream_sends_deltas_then_done():
+    """Text arrives as delta events and a repeated request is served from cache"""
+    events = stream_events("/generate-lecture-plan/stream", form)
+    assert [event for event, _ in events] == ["delta"] * 4 + ["done"]
+    assert "".join(data["text"] for _, data in events[:-1]) == "Plan for the lesson"
+    assert events[-1][1] == {}
+
+    cached = stream_events("/generate-lecture-plan/stream", form)
+    assert cached == [("delta", {"text": "Plan for the lesson"}), ("done", {"cached": True, "result": None})]
+
+def test_stream_json_result_and_errors():
+    """JSON mode validates the reply into done's result; upstream failures end in an error event"""
+    events = stream_events("/generate-lecture-plan/stream", dict(form, output_format="json"))
+    assert events[-1] == ("done", {"result": PLAN})
+
+    events = stream_events("/generate-lecture-plan/stream", dict(form, topic="Broken"))
+    assert events == [("error", {"error": "upstream unavailable"})]
+
+def test_stale_cached_json_is_regenerated(monkeypatch):
+    """A cached reply that no longer matches its schema is a miss, and schema changes change the key"""
+    body = dict(form, output_format="json")
+    prompt = api.generate_lecture_plan_prompt(api.FormData(**body))
+    key = api.cache_key_for(prompt, schema="lecture_plan")
+    api.response_cache.put(key, json.dumps({"overview": ["old shape"]}))
+
+    response = client.post("/generate-lecture-plan", json=body).json()
+    assert response["status"] == "processing"
+    run_queued([response["request_id"]])
+    assert client.get(f"/status/{response['request_id']}").json()["result"] == PLAN
+
+    api.response_cache.put(key, json.dumps({"overview": ["old shape"]}))
+    assert stream_events("/generate-lecture-plan/stream", body)[-1] == ("done", {"result": PLAN})
+
+    monkeypatch.setattr(api, "schema_fingerprint", lambda name: "changed")
+    assert api.cache_key_for(prompt, schema="lecture_plan") != key
+
+def test_startup_resumes_only_abandoned_jobs(monkeypatch):
+    """Inline processes sharing a store resume queued and expired jobs, not ones a live process is running"""
+    monkeypatch.setattr(api, "JOB_EXECUTION", "inline")
+    monkeypatch.setattr(api, "JOB_LEASE_SECONDS", 60)
+    prompt = api.generate_lecture_plan_prompt(api.FormData(**form))
+    queued = api.job_store.create("lecture_plan", prompt=prompt)
+    running = api.job_store.create("lecture_plan", status="processing", worker_id="live-process", prompt=prompt)
+
+    async def resume():
+        await api.resume_pending_jobs()
+        await asyncio.gather(*list(api.resumed_jobs))
+
+    asyncio.run(resume())
+    assert api.job_store.get(queued)["status"] == "completed"
+    assert api.job_store.get(running)["status"] == "processing"
+
+def test_inline_jobs_are_owned_by_their_process(monkeypatch):
+    """A job submitted inline is claimed by the submitting process, so no other process resumes it"""
+    monkeypatch.setattr(api, "JOB_EXECUTION", "inline")
+    request_id, cached = api.create_job("lecture_plan", "prompt")
+    job = api.job_store.get(request_id)
+    assert (cached, job["status"], job["worker_id"]) == (False, "processing", api.PROCESS_ID)
+    assert api.job_store.claim("other-process", lease_seconds=60) is None
@@ -0,0 +1,75 @@
+import os
+import wave
+
+import pytest
+
+sr = pytest.importorskip("speech_recognition")
+
+from audio_buffer import AudioSpool, read_segments, export_wav
+
+
+def segment(value, frames=100):
+    return sr.AudioData(bytes([value, 0]) * frames, 1000, 2)
+
+def test_segments_are_written_to_disk(tmp_path):
+    """Every segment is on disk while only the recent window stays in memory"""
+    spool = AudioSpool(str(tmp_path / "a.spool"), window=2)
+    for index in range(5):
+        assert spool.append(segment(index), start=index) == index
+
+    assert len(spool) == 5
+    assert [start for start, _ in spool.recent()] == [3, 4]
+    assert [(start, audio.get_raw_data()) for start, audio in spool.segments()] == \
+        [(index, segment(index).get_raw_data()) for index in range(5)]
+
+def test_segments_are_read_back_by_index(tmp_path):
+    """Segments that left the memory window are read from disk, also after reopening the spool"""
+    path = str(tmp_path / "a.spool")
+    spool = AudioSpool(path, window=1)
+    for index in range(3):
+        spool.append(segment(index), start=index)
+
+    assert spool.segment(2).get_raw_data() == segment(2).get_raw_data()
+    assert spool.segment(0).get_raw_data() == segment(0).get_raw_data()
+    spool.close()
+    reopened = AudioSpool(path)
+    reopened.append(segment(3), start=3)
+    assert [reopened.segment(index).get_raw_data() for index in (1, 3)] == \
+        [segment(1).get_raw_data(), segment(3).get_raw_data()]
+    with pytest.raises(IndexError):
+        reopened.segment(4)
+
+def test_crash_leaves_recoverable_audio(tmp_path):
+    """A record cut short by a crash is dropped and appending continues after the last complete one"""
+    path = str(tmp_path / "a.spool")
+    spool = AudioSpool(path)
+    spool.append(segment(1))
+    spool.append(segment(2), start=0.5)
+    spool.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    assert len(list(read_segments(path))) == 1
+    spool = AudioSpool(path)
+    assert len(spool) == 1
+    spool.append(segment(3), start=1)
+    assert [start for start, _ in read_segments(path)] == [0, 1]
+
+def test_export_wav_pads_pauses(tmp_path):
+    """Exported audio keeps segments at their offset from the start of the recording"""
+    spool = AudioSpool(str(tmp_path / "a.spool"))
+    spool.append(segment(1), start=0)
+    spool.append(segment(2), start=0.5)
+    output = str(tmp_path / "out.wav")
+
+    assert export_wav(spool.path, output) == 2
+    with wave.open(output) as f:
+        assert f.getnframes() == 600  # 100 frames, 400 of silence, 100 frames
+
+def test_clear_deletes_the_file(tmp_path):
+    """Clearing frees the disk space"""
+    spool = AudioSpool(str(tmp_path / "a.spool"))
+    spool.append(segment(1))
+    spool.clear()
+    assert not os.path.exists(spool.path)
+    assert len(spool) == 0
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import bulk_feedback
+from bulk_feedback import report_path, run, write_report
+
+CONTEXT = {
+    "grade": "8th", "topic": "Fractions", "country": "United States", "location": "Springfield",
+    "number_of_students": "30", "teaching_tenure_years": "3 years", "percentage_of_girls": "50%",
+    "percentage_of_boys": "50%", "attendance_percentage": "90%", "grade_level_competence": "mixed",
+    "classroom_challenges": "large class"
+}
+
+
+class FakeAI:
+    """Answers every prompt; fails for transcripts containing "FAIL" while `failing` is set"""
+
+    failing = True
+    calls = 0
+
+    async def get_response_async(self, prompt):
+        FakeAI.calls += 1
+        if FakeAI.failing and "FAIL" in prompt:
+            return None
+        return "notes" if "SEGMENT" in prompt else "feedback report"
+
+
+class CountingLimiter:
+    """Records one acquire per upstream request"""
+
+    acquired = 0
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        pass
+
+    async def acquire(self, tokens):
+        CountingLimiter.acquired += 1
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    FakeAI.failing, FakeAI.calls, CountingLimiter.acquired = True, 0, 0
+    monkeypatch.setattr(bulk_feedback, "OpenAIIntegration", FakeAI)
+    monkeypatch.setattr(bulk_feedback, "AdaptiveRateLimiter", CountingLimiter)
+    input_dir, output_dir = tmp_path / "transcripts", tmp_path / "reports"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    return input_dir, output_dir
+
+def run_bulk(input_dir, output_dir):
+    args = SimpleNamespace(input_dir=str(input_dir), output_dir=str(output_dir), pattern="*.txt", concurrency=2, rpm=0)
+    return asyncio.run(run(args, CONTEXT))
+
+def test_existing_reports_and_empty_transcripts_are_skipped(dirs):
+    """Transcripts with a report are not sent again, empty ones are skipped, the rest are written"""
+    input_dir, output_dir = dirs
+    (input_dir / "done.txt").write_text("Already reviewed.")
+    (input_dir / "new.txt").write_text("Today we add fractions.")
+    (input_dir / "empty.txt").write_text("  \n")
+    (input_dir / "notes.md").write_text("Not a transcript.")
+    with open(report_path(str(output_dir), "done.txt"), "w") as f:
+        f.write("old report")
+
+    stats = run_bulk(input_dir, output_dir)
+    assert stats == {"completed": 1, "skipped": 1, "failed": 0, "already_done": 1}
+    assert FakeAI.calls == 1
+    with open(report_path(str(output_dir), "new.txt")) as f:
+        assert f.read() == "feedback report"
+    with open(report_path(str(output_dir), "done.txt")) as f:
+        assert f.read() == "old report"
+
+def test_interrupted_run_resumes_where_it_stopped(dirs):
+    """A failed transcript leaves no partial report and is the only one generated by the next run"""
+    input_dir, output_dir = dirs
+    (input_dir / "good.txt").write_text("Today we add fractions.")
+    (input_dir / "bad.txt").write_text("FAIL")
+
+    stats = run_bulk(input_dir, output_dir)
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+    assert sorted(os.listdir(output_dir)) == ["good.feedback.md"]
+
+    FakeAI.failing, FakeAI.calls = False, 0
+    stats = run_bulk(input_dir, output_dir)
+    assert stats == {"completed": 1, "skipped": 0, "failed": 0, "already_done": 1}
+    assert FakeAI.calls == 1
+    assert sorted(os.listdir(output_dir)) == ["bad.feedback.md", "good.feedback.md"]
+
+def test_every_upstream_request_is_paced(dirs, monkeypatch):
+    """A chunked transcript acquires the limiter once per segment and once for the report"""
+    input_dir, output_dir = dirs
+    monkeypatch.setattr(bulk_feedback, "should_chunk", lambda transcript: True)
+    monkeypatch.setattr(bulk_feedback, "split_transcript", lambda transcript: ["part 1", "part 2", "part 3"])
+    (input_dir / "long.txt").write_text("A long lecture.")
+
+    assert run_bulk(input_dir, output_dir)["completed"] == 1
+    assert FakeAI.calls == 4
+    assert CountingLimiter.acquired == 4
+
+def test_write_report_replaces_in_one_step(tmp_path):
+    """Reports are written through a temporary file that is renamed over the target"""
+    path = str(tmp_path / "a.feedback.md")
+    write_report(path, "first")
+    write_report(path, "second")
+    with open(path) as f:
+        assert f.read() == "second"
+    assert os.listdir(tmp_path) == ["a.feedback.md"]
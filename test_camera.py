@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from camera import CameraThread
+
+
+class FakeCapture:
+    """Delivers numbered BGR frames of a fixed size, ignoring requested properties"""
+
+    def __init__(self, width, height):
+        self.shape = (height, width, 3)
+        self.count = 0
+        self.requested = {}
+
+    def set(self, prop, value):
+        self.requested[prop] = value
+
+    def read(self, image=None):
+        time.sleep(0.001)
+        self.count += 1
+        if image is None:
+            image = np.empty(self.shape, np.uint8)
+        image[:] = (self.count % 200, 0, 255)
+        return True, image
+
+def wait_for_frame(camera):
+    for _ in range(500):
+        frame = camera.latest()
+        if frame is not None:
+            return frame
+        time.sleep(0.002)
+    raise AssertionError("No frame arrived")
+
+@pytest.mark.parametrize("size", [(640, 480), (1280, 720)])
+def test_latest_frame_is_rgb_at_preview_size(size):
+    """Frames come out RGB at the preview size whatever the camera delivers"""
+    capture = FakeCapture(*size)
+    camera = CameraThread(capture, 640, 480)
+    camera.start()
+    try:
+        frame = wait_for_frame(camera)
+        assert frame.shape == (480, 640, 3)
+        assert frame[0, 0, 0] == 255 and frame[0, 0, 1] == 0  # Red channel first
+        assert capture.requested[cv2.CAP_PROP_FRAME_WIDTH] == 640
+    finally:
+        camera.stop()
+        camera.join(1)
+
+def test_buffers_are_reused_and_pause_stops_reading():
+    """Only preallocated buffers are handed out, and a paused camera is not read"""
+    capture = FakeCapture(640, 480)
+    camera = CameraThread(capture)
+    buffers = {id(camera._front), id(camera._ready), id(camera._back)}
+    camera.start()
+    try:
+        for _ in range(5):
+            assert id(wait_for_frame(camera)) in buffers
+        camera.pause()
+        time.sleep(0.05)
+        count = capture.count
+        time.sleep(0.05)
+        assert capture.count == count
+        camera.resume()
+        wait_for_frame(camera)
+    finally:
+        camera.stop()
+        camera.join(1)
@@ -0,0 +1,27 @@
+import pytest
+
+import config
+
+
+@pytest.fixture
+def secrets_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    path = tmp_path / "secrets.toml"
+    monkeypatch.setattr(config, "SECRETS_PATHS", (str(tmp_path / "missing.toml"), str(path)))
+    return path
+
+def test_environment_key_is_found(secrets_file, monkeypatch):
+    """The environment is read before the secrets files"""
+    secrets_file.write_text('OPENAI_API_KEY = "sk-file"\n')
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-env")
+    assert config.find_openai_api_key() == ("sk-env", "environment variables")
+
+def test_secrets_file_is_read_without_streamlit(secrets_file):
+    """Without an environment key the Streamlit secrets file is parsed directly"""
+    secrets_file.write_text('OPENAI_API_KEY = "sk-file"\n')
+    assert config.find_openai_api_key() == ("sk-file", "Streamlit secrets file")
+
+def test_missing_key(secrets_file):
+    """No key anywhere, including an unreadable secrets file, gives (None, None)"""
+    secrets_file.write_text("not = [valid toml")
+    assert config.find_openai_api_key() == (None, None)
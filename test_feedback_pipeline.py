@@ -0,0 +1,131 @@
+import asyncio
+import re
+import time
+
+from feedback_pipeline import (
+    notes_as_transcript, split_transcript, stream_report_sections_async, summarize_chunks_async
+)
+from prompts import FEEDBACK_REPORT_SECTIONS, generate_feedback_report_prompt
+
+FORM = {"grade": "8th", "topic": "Fractions", "location": "Springfield Middle School"}
+REPORT_FORM = dict(
+    FORM, country="United States", number_of_students="30", percentage_of_girls="50%",
+    percentage_of_boys="50%", attendance_percentage="90%", grade_level_competence="mixed",
+    teaching_tenure_years="3 years", classroom_challenges="large class", lecture_transcript="Today we add fractions."
+)
+
+
+class FakeAI:
+    """Answers chunk prompts with their segment number, later segments first; fails for prompts containing `fail_on`"""
+
+    def __init__(self, delay=0.05, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.peak = 0
+
+    async def get_response_async(self, prompt):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        index = int(re.search(r"SEGMENT (\d+) OF", prompt).group(1))
+        await asyncio.sleep(self.delay / index)
+        self.in_flight -= 1
+        if self.fail_on and self.fail_on in prompt:
+            return None
+        return f"notes {index}"
+
+def test_split_prefers_segment_boundaries():
+    """Chunks end at blank lines before lines and sentences, and keep every word in order"""
+    paragraphs = [f"Paragraph {i}. " + "word " * 30 for i in range(6)]
+    text = "\n\n".join(paragraphs)
+    chunks = split_transcript(text, max_chars=400)
+
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    assert all(chunk.startswith("Paragraph") for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+def test_split_falls_back_to_sentences_and_words():
+    """A single oversized line is split at sentence ends, then at spaces"""
+    text = "This is a sentence. " * 50 + "x" * 250
+    chunks = split_transcript(text, max_chars=100)
+
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert chunks[0].endswith(".")
+    assert "".join("".join(chunks).split()) == "".join(text.split())
+    assert split_transcript("short", max_chars=100) == ["short"]
+    assert split_transcript("   ") == []
+
+def test_chunks_are_summarized_in_parallel_and_in_order():
+    """The map step runs up to `concurrency` chunks at once and keeps transcript order"""
+    ai = FakeAI(delay=0.05)
+    started = time.monotonic()
+    notes = asyncio.run(summarize_chunks_async(ai, FORM, [f"chunk {i}" for i in range(8)], concurrency=4))
+
+    assert ai.peak == 4
+    assert time.monotonic() - started < 0.35
+    assert notes == [f"notes {i}" for i in range(1, 9)]
+
+def test_limiter_paces_every_chunk():
+    """Each chunk's upstream call waits for the limiter, not just the transcript as a whole"""
+    class CountingLimiter:
+        calls = 0
+
+        async def acquire(self, tokens):
+            self.calls += 1
+
+    limiter = CountingLimiter()
+    asyncio.run(summarize_chunks_async(FakeAI(delay=0), FORM, ["a", "b", "c"], limiter=limiter))
+    assert limiter.calls == 3
+
+def test_failed_chunk_fails_the_job():
+    """Feedback is not written from partial notes"""
+    ai = FakeAI(delay=0, fail_on="SEGMENT 2 OF 3")
+    try:
+        asyncio.run(summarize_chunks_async(ai, FORM, ["a", "b", "c"]))
+    except RuntimeError as e:
+        assert "segment 2 of 3" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
+
+def test_notes_replace_the_transcript():
+    """Reduce input labels each segment's notes"""
+    text = notes_as_transcript(["first notes", "second notes"])
+    assert "2 consecutive segments" in text
+    assert text.index("SEGMENT 1 OF 2:\nfirst notes") < text.index("SEGMENT 2 OF 2:\nsecond notes")
+
+class SectionAI:
+    """Answers section prompts after per-section delays; the overall section omits its header"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    async def get_response_async(self, prompt):
+        key = next(key for key, (header, _) in FEEDBACK_REPORT_SECTIONS.items() if header in prompt.split("EXACTLY")[1])
+        await asyncio.sleep(self.delays[key])
+        if key == "overall":
+            return "Strengths:\n- Clear goals"
+        header = FEEDBACK_REPORT_SECTIONS[key][0]
+        return f"{header}\nLesson Design and Coherence:\n- {key} point"
+
+def test_sections_are_requested_concurrently_and_merged_in_order():
+    """The report takes as long as its slowest section and keeps report order"""
+    ai = SectionAI({"overall": 0.2, "planning": 0.1, "environment": 0.2, "instruction": 0.05})
+
+    async def collect():
+        return "".join([chunk async for chunk in stream_report_sections_async(ai, REPORT_FORM)])
+
+    started = time.monotonic()
+    report = asyncio.run(collect())
+    assert time.monotonic() - started < 0.35
+
+    headers = [header for header, _ in FEEDBACK_REPORT_SECTIONS.values()]
+    assert [report.index(header) for header in headers] == sorted(report.index(header) for header in headers)
+    assert report.startswith("Overall Feedback:\nStrengths:")
+
+def test_section_prompt_only_asks_for_its_section():
+    """A section prompt shares the context but contains only its own template"""
+    prompt = generate_feedback_report_prompt(REPORT_FORM, ["environment"])
+    assert "DOMAIN 2: CLASSROOM ENVIRONMENT" in prompt
+    assert "DOMAIN 1:" not in prompt and "DOMAIN 3:" not in prompt and "Avoid/Rethink" not in prompt
+    assert REPORT_FORM["lecture_transcript"] in prompt
+    assert "written separately" not in generate_feedback_report_prompt(REPORT_FORM)
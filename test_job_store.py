@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+from job_store import InMemoryJobStore, SQLiteJobStore, run_leased
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore(ttl_seconds=60, max_entries=3)
+    return SQLiteJobStore(str(tmp_path / "jobs.db"), ttl_seconds=60, max_entries=3)
+
+def test_ids_are_unique_after_pop(store):
+    """Popping a job must not allow its ID to be handed out again"""
+    first = store.create("lecture_plan", prompt="a")
+    store.pop(first)
+    second = store.create("lecture_plan", prompt="b")
+    assert first != second
+    assert second.startswith("lecture_plan_")
+
+def test_update_and_pop(store):
+    """Fields are merged on update and the job disappears once popped"""
+    job_id = store.create("feedback", prompt="p")
+    assert store.get(job_id)["status"] == "queued"
+
+    assert store.update(job_id, status="completed", data="result")
+    job = store.get(job_id)
+    assert job["status"] == "completed"
+    assert job["data"] == "result"
+    assert job["prompt"] == "p"
+
+    assert store.pop(job_id)["data"] == "result"
+    assert store.get(job_id) is None
+    assert not store.update(job_id, status="error")
+
+def test_ttl_eviction(store):
+    """Finished jobs that have not been updated within the TTL are evicted"""
+    job_id = store.create("feedback", prompt="p")
+    store.update(job_id, status="completed", data="done")
+    assert store.evict(now=time.time() + 120) == 1
+    assert store.get(job_id) is None
+
+def test_ttl_eviction_keeps_pending_jobs(store):
+    """Queued and processing jobs outlive the TTL, including ones older than expired results"""
+    queued = store.create("feedback", prompt="q")
+    processing = store.create("feedback", prompt="p")
+    store.update(processing, status="processing")
+    finished = store.create("feedback", prompt="f")
+    store.update(finished, status="error", error="failed")
+
+    assert store.evict(now=time.time() + 120) == 1
+    assert store.get(queued)["status"] == "queued"
+    assert store.get(processing)["status"] == "processing"
+    assert store.get(finished) is None
+
+def test_size_eviction_keeps_pending_jobs(store):
+    """Only finished jobs are trimmed when the store grows past max_entries"""
+    pending = [store.create("lecture_plan", prompt=str(i)) for i in range(2)]
+    finished = [store.create("lecture_plan", prompt=str(i)) for i in range(3)]
+    for job_id in finished:
+        store.update(job_id, status="completed", data="done")
+
+    assert store.evict() == 2
+    assert len(store) == 3
+    assert all(store.get(job_id) for job_id in pending)
+    assert store.get(finished[-1]) is not None
+
+def test_sqlite_jobs_survive_restart(tmp_path):
+    """Queued jobs are reported as pending by a fresh store on the same database"""
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    queued = store.create("lecture_plan", prompt="resume me")
+    done = store.create("feedback", prompt="finished")
+    store.update(done, status="completed", data="ok")
+    store.close()
+
+    restarted = SQLiteJobStore(path)
+    pending = restarted.pending()
+    assert [job["id"] for job in pending] == [queued]
+    assert pending[0]["prompt"] == "resume me"
+
+def test_claim_takes_each_job_once(store):
+    """Workers claim queued jobs oldest first and never get the same job twice"""
+    first = store.create("lecture_plan", prompt="1")
+    second = store.create("lecture_plan", prompt="2")
+
+    claimed = store.claim("worker-a")
+    assert claimed["id"] == first
+    assert claimed["status"] == "processing"
+    assert claimed["worker_id"] == "worker-a"
+    assert store.claim("worker-b")["id"] == second
+    assert store.claim("worker-b") is None
+
+def test_claim_reclaims_expired_lease(store):
+    """A processing job whose worker stopped updating it can be claimed again"""
+    job_id = store.create("feedback", prompt="p")
+    store.claim("worker-a")
+    assert store.claim("worker-b", lease_seconds=600) is None
+    assert store.claim("worker-b", lease_seconds=-1)["id"] == job_id
+
+def test_count_by_status(store):
+    """Counts reflect every record's current status"""
+    first = store.create("feedback", prompt="a")
+    store.create("feedback", prompt="b")
+    store.update(first, status="processing")
+    assert store.count_by_status() == {"queued": 1, "processing": 1}
+
+def test_renew_extends_only_the_owners_lease(store):
+    """A renewed job is not reclaimed; renewal by another worker or after completion is refused"""
+    job_id = store.create("feedback", prompt="p")
+    store.claim("worker-1")
+    time.sleep(0.1)
+    assert not store.renew(job_id, "worker-2")
+    assert store.renew(job_id, "worker-1")
+    assert store.claim("worker-2", lease_seconds=0.05) is None
+
+    store.update(job_id, status="completed", data="done")
+    assert not store.renew(job_id, "worker-1")
+
+def test_long_job_keeps_its_lease(store):
+    """A job that outlasts its lease is renewed while it runs, so no other worker can claim it"""
+    job_id = store.create("lecture_plan", prompt="p")
+    job = store.claim("worker-1")
+    claimed_by_others = []
+
+    async def run(job):
+        for _ in range(5):
+            await asyncio.sleep(0.05)
+            claimed_by_others.append(store.claim("worker-2", lease_seconds=0.1))
+        store.update(job["id"], status="completed", data="plan")
+        return "done"
+
+    assert asyncio.run(run_leased(store, job, "worker-1", 0.1, run)) == "done"
+    assert claimed_by_others == [None] * 5
+    assert store.get(job_id)["status"] == "completed"
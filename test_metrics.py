@@ -0,0 +1,65 @@
+import urllib.request
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Registry, start_http_server
+
+
+def test_counter_and_gauge_render_with_labels():
+    """Labelled series render with escaped label values"""
+    registry = Registry()
+    errors = Counter("errors_total", "Errors", ["path"], registry=registry)
+    in_flight = Gauge("in_flight", "In flight", ["kind"], registry=registry)
+    errors.inc(path="/status/{request_id}")
+    errors.inc(2, path='say "hi"')
+    with in_flight.track_inprogress(kind="feedback"):
+        assert in_flight.value(kind="feedback") == 1
+    assert in_flight.value(kind="feedback") == 0
+
+    text = registry.render()
+    assert "# TYPE errors_total counter" in text
+    assert 'errors_total{path="/status/{request_id}"} 1' in text
+    assert 'errors_total{path="say \\"hi\\""} 2' in text
+    assert 'in_flight{kind="feedback"} 0' in text
+
+def test_histogram_buckets_are_cumulative():
+    """Each bucket counts observations at or below its bound, +Inf counts all"""
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency", ["kind"], buckets=(0.1, 1), registry=registry)
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.observe(value, kind="upstream")
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{kind="upstream",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{kind="upstream",le="1"} 3' in text
+    assert 'latency_seconds_bucket{kind="upstream",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{kind="upstream"} 6.05' in text
+    assert 'latency_seconds_count{kind="upstream"} 4' in text
+
+def test_labels_must_match():
+    """Missing or unknown labels are rejected instead of creating stray series"""
+    counter = Counter("tokens_total", "Tokens", ["type"], registry=Registry())
+    with pytest.raises(ValueError):
+        counter.inc(kind="prompt")
+    with pytest.raises(ValueError):
+        counter.inc(-1, type="prompt")
+
+def test_gauge_function_is_read_at_scrape_time():
+    """A callback gauge reports the current value on every render"""
+    registry = Registry()
+    queued = Gauge("queued", "Queued", registry=registry)
+    depth = [3]
+    queued.set_function(lambda: depth[0])
+    assert "queued 3" in registry.render()
+    depth[0] = 5
+    assert "queued 5" in registry.render()
+
+def test_http_server_serves_metrics():
+    """Worker processes expose the default registry over HTTP"""
+    Counter("test_http_server_total", "Test counter").inc()
+    server = start_http_server(0, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert "test_http_server_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
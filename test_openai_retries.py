@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import openai_integration
+from openai_integration import OpenAIIntegration, get_call_stats
+from rate_limiter import AdaptiveRateLimiter
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+class FakeCompletions:
+    """Replays a script of results; exceptions are raised, (delay, text) pairs are returned after delay"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    @property
+    def with_raw_response(self):
+        return self
+
+    async def create(self, **kwargs):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        delay, text = step
+        await asyncio.sleep(delay)
+        return SimpleNamespace(headers={}, parse=lambda: completion(text))
+
+class FakeStream:
+    """Streamed reply: one chunk per piece of text"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def close(self):
+        pass
+
+class FakeStreamCompletions:
+    @property
+    def with_raw_response(self):
+        return self
+
+    async def create(self, **kwargs):
+        return SimpleNamespace(headers={}, parse=lambda: FakeStream(["Par", "is"]))
+
+@pytest.fixture
+def ai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    ai = OpenAIIntegration()
+    ai.backoff_base = 0.001
+    return ai
+
+def use_fake(monkeypatch, completions):
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(openai_integration, "get_shared_async_client", lambda api_key: fake_client)
+
+def test_retryable_errors_are_retried(ai, monkeypatch):
+    """A rate limit followed by a success yields the response and counts one retry"""
+    completions = FakeCompletions([rate_limit_error(), (0, "Paris")])
+    use_fake(monkeypatch, completions)
+    retries = get_call_stats()["retries"]
+
+    assert asyncio.run(ai.get_response_async("capital of France?")) == "Paris"
+    assert completions.calls == 2
+    assert get_call_stats()["retries"] == retries + 1
+
+def test_gives_up_after_max_retries(ai, monkeypatch):
+    """Persistent retryable errors end in None once the retry budget is spent"""
+    ai.max_retries = 2
+    ai.max_rate_limit_retries = 4
+    completions = FakeCompletions([openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))])
+    use_fake(monkeypatch, completions)
+    assert asyncio.run(ai.get_response_async("prompt")) is None
+    assert completions.calls == 3
+
+    completions = FakeCompletions([rate_limit_error()])
+    use_fake(monkeypatch, completions)
+    assert asyncio.run(ai.get_response_async("prompt")) is None
+    assert completions.calls == 5
+
+def test_non_retryable_errors_fail_fast(ai, monkeypatch):
+    """Errors that retrying cannot fix are not retried"""
+    completions = FakeCompletions([ValueError("bad request")])
+    use_fake(monkeypatch, completions)
+
+    assert asyncio.run(ai.get_response_async("prompt")) is None
+    assert completions.calls == 1
+
+def test_hedge_wins_over_slow_request(ai, monkeypatch):
+    """With hedging on, a duplicate fired after the hedge delay can finish first"""
+    ai.hedge = True
+    ai.hedge_default_delay = 0.05
+    completions = FakeCompletions([(5, "slow"), (0, "fast")])
+    use_fake(monkeypatch, completions)
+    before = get_call_stats()
+
+    assert asyncio.run(ai.get_response_async("prompt")) == "fast"
+    after = get_call_stats()
+    assert after["hedges_fired"] == before["hedges_fired"] + 1
+    assert after["hedges_won"] == before["hedges_won"] + 1
+
+def test_streamed_reply_returns_unused_tokens(ai, monkeypatch):
+    """A short streamed reply gives back the completion tokens reserved but not used"""
+    limiter = AdaptiveRateLimiter(requests_per_minute=100, tokens_per_minute=100000, clock=lambda: 0.0)
+    monkeypatch.setattr(openai_integration, "rate_limiter", limiter)
+    use_fake(monkeypatch, FakeStreamCompletions())
+
+    async def collect():
+        return [piece async for piece in ai.stream_response_async("capital of France?")]
+
+    assert asyncio.run(collect()) == ["Par", "is"]
+    prompt_tokens = ai._estimate_tokens(ai._request_kwargs("capital of France?")) - ai.expected_completion_tokens
+    assert limiter.tokens.tokens == 100000 - prompt_tokens - 2
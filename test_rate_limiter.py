@@ -0,0 +1,63 @@
+from rate_limiter import AdaptiveRateLimiter, parse_reset_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_parse_reset_duration():
+    """Reset headers use Go-style durations"""
+    assert parse_reset_duration("1s") == 1
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("250ms") == 0.25
+    assert parse_reset_duration("1m30.5s") == 90.5
+    assert parse_reset_duration("soon") is None
+    assert parse_reset_duration(None) is None
+
+def test_requests_queue_once_rpm_is_spent():
+    """Requests past the per-minute budget wait instead of being sent"""
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(requests_per_minute=2, tokens_per_minute=10000, clock=clock)
+    assert limiter.reserve(10) == 0
+    assert limiter.reserve(10) == 0
+    # One request refills every 30 seconds at 2 RPM
+    assert limiter.reserve(10) == 30
+    assert limiter.reserve(10) == 60
+    clock.now += 60
+    assert limiter.reserve(10) == 30
+
+def test_token_budget_limits_large_prompts():
+    """The TPM bucket delays requests whose estimated tokens exceed what is left"""
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(requests_per_minute=1000, tokens_per_minute=6000, clock=clock)
+    assert limiter.reserve(5000) == 0
+    # 4000 token deficit at 100 tokens per second
+    assert limiter.reserve(5000) == 40
+
+def test_reconcile_refunds_overestimates():
+    """Tokens reserved but not used become available again"""
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(requests_per_minute=1000, tokens_per_minute=6000, clock=clock)
+    limiter.reserve(6000)
+    limiter.reconcile(estimated=6000, actual=1000)
+    assert limiter.reserve(5000) == 0
+
+def test_headers_and_429_adapt_the_limits():
+    """Upstream headers lower the limits and a 429 pauses everyone until the reset"""
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(requests_per_minute=1000, tokens_per_minute=100000, clock=clock)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "100000",
+        "x-ratelimit-remaining-tokens": "90000",
+    })
+    assert limiter.get_stats()["requests_per_minute"] == 60
+    assert limiter.reserve(10) == 1
+
+    limiter.on_rate_limited(headers={"x-ratelimit-reset-requests": "20s", "x-ratelimit-reset-tokens": "2s"})
+    assert limiter.reserve(10) == 20
+    assert limiter.get_stats()["rate_limited"] == 1
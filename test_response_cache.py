@@ -0,0 +1,45 @@
+from response_cache import ResponseCache, make_cache_key
+
+
+def test_key_is_canonical():
+    """Parameter order does not matter, but prompt, model, params and version do"""
+    key = make_cache_key("prompt", "gpt-3.5-turbo", {"temperature": 0, "seed": 1}, "1")
+    assert key == make_cache_key("prompt", "gpt-3.5-turbo", {"seed": 1, "temperature": 0}, "1")
+    assert key != make_cache_key("prompt!", "gpt-3.5-turbo", {"temperature": 0, "seed": 1}, "1")
+    assert key != make_cache_key("prompt", "gpt-4", {"temperature": 0, "seed": 1}, "1")
+    assert key != make_cache_key("prompt", "gpt-3.5-turbo", {"temperature": 1, "seed": 1}, "1")
+    assert key != make_cache_key("prompt", "gpt-3.5-turbo", {"temperature": 0, "seed": 1}, "2")
+
+def test_memory_lru_falls_back_to_disk(tmp_path):
+    """Entries pushed out of the memory tier are still served from disk"""
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_entries=1)
+    cache.put("a", "plan a")
+    cache.put("b", "plan b")
+
+    assert cache.get("a") == "plan a"
+    assert cache.get("a") == "plan a"
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["disk_entries"] == 2
+
+def test_cost_aware_eviction(tmp_path):
+    """When the disk tier is full the cheapest entry per byte is evicted first"""
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_entries=0, disk_max_bytes=25)
+    cache.put("expensive", "x" * 10, cost=30.0)
+    cache.put("cheap", "y" * 10, cost=0.1)
+    cache.put("new", "z" * 10, cost=5.0)
+
+    assert cache.get("cheap") is None
+    assert cache.get("expensive") == "x" * 10
+    assert cache.get("new") == "z" * 10
+    assert cache.stats()["evictions"] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    """A new cache on the same file sees earlier responses"""
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path).put("key", "feedback")
+    assert ResponseCache(path).get("key") == "feedback"
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import date, timedelta
+
+from scheduler import OffPeakScheduler, ScheduledPlanStore, in_off_peak_window
+
+
+def test_off_peak_window_wraps_midnight():
+    """A 22:00-06:00 window covers late evening and early morning only"""
+    assert in_off_peak_window(23, 22, 6)
+    assert in_off_peak_window(2, 22, 6)
+    assert not in_off_peak_window(6, 22, 6)
+    assert not in_off_peak_window(9, 22, 6)
+    assert in_off_peak_window(3, 1, 5)
+    assert not in_off_peak_window(5, 1, 5)
+
+def test_due_plans_are_generated_in_lecture_date_order(tmp_path):
+    """Only lectures inside the lookahead are generated, earliest first"""
+    store = ScheduledPlanStore(str(tmp_path / "plans.db"))
+    today = date(2024, 5, 6)
+    later = store.register(today + timedelta(days=1), {"topic": "b"}, "prompt b", "key-b")
+    sooner = store.register(today, {"topic": "a"}, "prompt a", "key-a")
+    far = store.register(today + timedelta(days=10), {"topic": "c"}, "prompt c", "key-c")
+
+    generated = []
+
+    async def generate(prompt):
+        return f"plan for {prompt}"
+
+    scheduler = OffPeakScheduler(
+        store, generate, on_generated=lambda record, text, seconds: generated.append(record["id"]),
+        lookahead_days=2
+    )
+    while asyncio.run(scheduler.run_once(today)):
+        pass
+
+    assert generated == [sooner, later]
+    assert store.get(sooner)["data"] == "plan for prompt a"
+    assert store.get(far)["status"] == "scheduled"
+    assert store.find_generated("key-b") == "plan for prompt b"
+    assert store.find_generated("key-c") is None
+
+def test_failed_generation_is_retried_then_marked_error(tmp_path):
+    """A registration is retried until max_attempts failures"""
+    store = ScheduledPlanStore(str(tmp_path / "plans.db"), max_attempts=2)
+    today = date(2024, 5, 6)
+    schedule_id = store.register(today, {}, "prompt", "key")
+
+    async def generate(prompt):
+        return None
+
+    scheduler = OffPeakScheduler(store, generate)
+    assert asyncio.run(scheduler.run_once(today))
+    assert store.get(schedule_id)["status"] == "scheduled"
+    assert asyncio.run(scheduler.run_once(today))
+    assert store.get(schedule_id)["status"] == "error"
+    assert not asyncio.run(scheduler.run_once(today))
+
+def test_rate_is_shared_between_processes(tmp_path):
+    """A claim by one process holds back claims through any other store on the same database"""
+    path = str(tmp_path / "plans.db")
+    first, second = ScheduledPlanStore(path), ScheduledPlanStore(path)
+    today = date(2024, 5, 6)
+    for topic in ("a", "b"):
+        first.register(today, {}, f"prompt {topic}", f"key-{topic}")
+
+    assert first.claim_due(today, 2, min_interval=60) is not None
+    assert second.claim_due(today, 2, min_interval=60) is None
+    assert 59 < second.seconds_until_claim(60) <= 60
+    assert second.claim_due(today, 2) is not None
+
+def test_past_lectures_are_pruned(tmp_path):
+    """Registrations are deleted once their lecture date has passed"""
+    store = ScheduledPlanStore(str(tmp_path / "plans.db"))
+    today = date(2024, 5, 6)
+    past = store.register(today - timedelta(days=1), {}, "prompt", "key")
+    current = store.register(today, {}, "prompt", "key")
+
+    assert store.prune(today) == 1
+    assert store.get(past) is None
+    assert store.get(current) is not None
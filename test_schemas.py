@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from schemas import SCHEMAS, repair_prompt, schema_fingerprint, schema_instructions, validate_result
+
+PLAN = {
+    "subtopics": [{
+        "title": "Like denominators",
+        "summary": "Fractions with the same denominator add numerator to numerator",
+        "minutes": 15,
+        "learning_objectives": ["Add fractions with like denominators"],
+    }],
+    "engagement_strategies": [{
+        "subtopic": "Like denominators",
+        "activity": "Fraction strips in pairs",
+        "example": "Sharing a pizza",
+        "check": "Thumbs up on 1/4 + 2/4",
+    }],
+    "differentiation_strategies": {
+        "struggling_students": ["Visual fraction bars"],
+        "advanced_students": ["Unlike denominators"],
+        "all_levels": ["Think-pair-share"],
+    },
+    "timing_and_pacing": {
+        "total_minutes": 50,
+        "allocation": ["Like denominators: 15 min"],
+        "breaks_and_transitions": ["2-minute stretch after the warm-up"],
+    },
+}
+
+
+def test_valid_reply_is_returned_as_dict():
+    """A reply matching the schema is parsed once into plain data"""
+    assert validate_result("lecture_plan", json.dumps(PLAN)) == PLAN
+
+def test_invalid_replies_raise_value_error():
+    """Missing fields, wrong types and broken JSON are all reported the same way"""
+    missing = {key: value for key, value in PLAN.items() if key != "timing_and_pacing"}
+    with pytest.raises(ValueError, match="timing_and_pacing"):
+        validate_result("lecture_plan", json.dumps(missing))
+    with pytest.raises(ValueError):
+        validate_result("lecture_plan", json.dumps(dict(PLAN, subtopics="not a list")))
+    with pytest.raises(ValueError):
+        validate_result("lecture_plan", '{"subtopics": [')
+
+def test_report_matches_dashboard_structure():
+    """The report schema has the keys pages/feedback_display.parse_feedback produces"""
+    report = {
+        "overall": {"strengths": ["Clear goals"], "improvements": [], "avoid": []},
+        "planning": {"Lesson Design and Coherence": ["Good sequence"]},
+        "environment": {},
+        "instruction": {},
+    }
+    assert validate_result("feedback_report", json.dumps(report)) == report
+
+def test_instructions_can_be_limited_to_fields():
+    """Section prompts only describe the fields they must return"""
+    schema = json.loads(schema_instructions("feedback_report", ["planning"]).split("\n")[2])
+    assert list(schema["properties"]) == ["planning"]
+    assert schema["required"] == ["planning"]
+    full = json.loads(schema_instructions("feedback").split("\n")[2])
+    assert set(full["properties"]) == {"planning_and_preparation", "classroom_environment", "instruction"}
+
+def test_repair_prompt_carries_error_and_reply():
+    """The repair call sees what was wrong and the reply to fix"""
+    prompt = repair_prompt("lecture_plan", '{"subtopics": []}', "timing_and_pacing: Field required")
+    assert "timing_and_pacing: Field required" in prompt
+    assert '{"subtopics": []}' in prompt
+    assert set(SCHEMAS) == {"lecture_plan", "feedback", "feedback_report"}
+
+def test_lecture_plan_schema_follows_api_prompt():
+    """JSON mode asks for the same sections the lecture plan prompt describes"""
+    from prompts import FormData, generate_lecture_plan_prompt
+    form = FormData(
+        grade="5", topic="Fractions", country="Kenya", location="Nairobi", number_of_students="40",
+        teaching_tenure_years="3", percentage_of_girls="50", percentage_of_boys="50",
+        attendance_percentage="90", grade_level_competence="Mixed", classroom_challenges="Large class",
+    )
+    prompt = generate_lecture_plan_prompt(form)
+    for section in ("SUBTOPICS BREAKDOWN", "ENGAGEMENT STRATEGIES", "DIFFERENTIATION STRATEGIES", "TIMING AND PACING"):
+        assert section in prompt
+        assert section in schema_instructions("lecture_plan")
+
+def test_fingerprint_follows_schema_definition():
+    """Each schema has a stable fingerprint of its own"""
+    assert schema_fingerprint("lecture_plan") == schema_fingerprint("lecture_plan")
+    assert len({schema_fingerprint(name) for name in SCHEMAS}) == len(SCHEMAS)
@@ -0,0 +1,56 @@
+import pytest
+
+sr = pytest.importorskip("speech_recognition")
+
+import speech_backends
+from speech_backends import create_backend
+
+
+class FakeRecognizer:
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    def recognize_google(self, audio, language):
+        self.calls.append(("google", language))
+        return self.text
+
+    def recognize_sphinx(self, audio, language):
+        self.calls.append(("sphinx", language))
+        return self.text
+
+def test_backends_call_their_engine():
+    """Each backend calls its own engine with the configured language"""
+    recognizer = FakeRecognizer("hello class")
+    assert create_backend("google", "en-GB").recognize(recognizer, None) == "hello class"
+    assert speech_backends.SphinxBackend("en-US").recognize(recognizer, None) == "hello class"
+    assert recognizer.calls == [("google", "en-GB"), ("sphinx", "en-US")]
+
+def test_empty_sphinx_result_is_unknown_value():
+    """Silence from PocketSphinx is reported like Google reports it"""
+    with pytest.raises(sr.UnknownValueError):
+        speech_backends.SphinxBackend().recognize(FakeRecognizer("  "), None)
+
+def test_unknown_and_missing_backends(monkeypatch):
+    """Unknown names are rejected and uninstalled engines fail with a RequestError"""
+    with pytest.raises(ValueError):
+        create_backend("nope")
+    monkeypatch.setattr(speech_backends.SphinxBackend, "is_available", classmethod(lambda cls: False))
+    assert speech_backends.available_backends() == ["google"]
+    with pytest.raises(sr.RequestError):
+        create_backend("sphinx")
+
+class EchoBackend(speech_backends.SpeechBackend):
+    name = "echo"
+
+    def recognize(self, recognizer, audio):
+        return audio.upper()
+
+def test_pool_transcribes_segments(monkeypatch):
+    """Online backends get a thread pool; results come back per segment"""
+    monkeypatch.setattr(speech_backends, "SPEECH_WORKERS", 0)
+    backend = EchoBackend()
+    assert speech_backends.worker_count(backend) == 4
+    with speech_backends.create_executor(backend, 2) as executor:
+        futures = [executor.submit(speech_backends.transcribe, backend, text) for text in ["a", "b", "c"]]
+        assert [future.result() for future in futures] == ["A", "B", "C"]
@@ -0,0 +1,96 @@
+import random
+
+from stream_parser import (
+    FeedbackReportStreamParser, LecturePlanStreamParser, parse_feedback_report, parse_lecture_plan
+)
+
+REPORT = """Overall Feedback:
+Strengths:
+- Clear learning goals
+Areas for Improvement:
+- More wait time
+Avoid/Rethink:
+- Reading slides aloud
+
+DOMAIN 1: PLANNING AND PREPARATION
+Lesson Design and Coherence:
+- Logical sequence
+- Examples build on each other
+
+DOMAIN 2: CLASSROOM ENVIRONMENT
+Respectful Interactions and Relationships:
+- Students addressed by name
+
+DOMAIN 3: INSTRUCTION
+Discussion Techniques and Questioning:
+- Mostly closed questions"""
+
+PLAN = """Overview:
+- Fractions describe parts of a whole
+Learning Objectives:
+- Add fractions with like denominators
+Materials:
+- Fraction strips
+Timeline:
+0-10 min: warm-up
+- 10-25 min: guided practice
+Assessment:
+- Exit ticket"""
+
+
+def feed_in_pieces(parser, text, seed):
+    rng = random.Random(seed)
+    events = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 12)
+        events += parser.feed(text[position:position + size])
+        position += size
+    return events + parser.close()
+
+def test_chunking_does_not_change_the_result():
+    """Any split of the stream parses to the same structure as the whole text"""
+    expected = parse_feedback_report(REPORT)
+    for seed in range(20):
+        parser = FeedbackReportStreamParser()
+        feed_in_pieces(parser, REPORT, seed)
+        assert parser.sections == expected
+    assert expected["overall"]["avoid"] == ["Reading slides aloud"]
+    assert expected["planning"] == {"Lesson Design and Coherence": ["Logical sequence", "Examples build on each other"]}
+
+def test_items_are_emitted_once_their_line_is_complete():
+    """A bullet is reported when its newline arrives, not before"""
+    parser = FeedbackReportStreamParser()
+    assert parser.feed("Overall Feedback:\nStrengths:\n- Clear lea") == [
+        {"event": "section", "section": "overall"}
+    ]
+    assert parser.feed("rning goals\nAreas") == [
+        {"event": "item", "section": "overall", "subsection": "strengths", "text": "Clear learning goals"}
+    ]
+
+def test_sections_finish_before_later_ones_are_generated():
+    """Domain 1 is reported done as soon as Domain 2 starts"""
+    parser = FeedbackReportStreamParser()
+    events = parser.feed(REPORT.split("DOMAIN 3")[0])
+    assert {"event": "section_done", "section": "planning"} in events
+    assert {"event": "section_done", "section": "environment"} not in events
+    assert {"event": "subsection", "section": "planning", "subsection": "Lesson Design and Coherence"} in events
+
+    events = parser.feed("DOMAIN 3" + REPORT.split("DOMAIN 3")[1]) + parser.close()
+    assert events[0] == {"event": "section_done", "section": "environment"}
+    assert events[-1] == {"event": "section_done", "section": "instruction"}
+
+def test_repeated_overall_header_does_not_crash():
+    """A bullet under a domain subsection after a repeated overall header is skipped"""
+    sections = parse_feedback_report(REPORT + "\nOverall Feedback:\n- stray\n")
+    assert sections["overall"]["strengths"] == ["Clear learning goals"]
+
+def test_lecture_plan_stream():
+    """Lecture plans keep plain lines and strip bullet markers, like the dashboard parser"""
+    parser = LecturePlanStreamParser()
+    events = feed_in_pieces(parser, PLAN, seed=3)
+    assert parser.sections == parse_lecture_plan(PLAN)
+    assert parser.sections["Timeline"] == ["0-10 min: warm-up", "10-25 min: guided practice"]
+    assert [event["section"] for event in events if event["event"] == "section_done"] == [
+        "Overview", "Learning Objectives", "Materials", "Timeline", "Assessment"
+    ]
@@ -0,0 +1,45 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from video_recorder import VideoRecorder
+
+
+def frame_count(path):
+    capture = cv2.VideoCapture(path)
+    count = 0
+    while capture.read()[0]:
+        count += 1
+    capture.release()
+    return count
+
+def test_frames_are_placed_by_timestamp(tmp_path):
+    """Gaps in capture are filled so the video's length matches the recording's"""
+    path = str(tmp_path / "lecture.avi")
+    recorder = VideoRecorder(path, (64, 48), fps=10, fourcc="MJPG", queue_size=100)
+    recorder.start(start_time=1000.0)
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for captured_at in (1000.0, 1000.1, 1000.2, 1001.0, 1001.05, 1001.5):
+        assert recorder.add_frame(frame, captured_at)
+    recorder.stop()
+
+    # Slots 0-2, 3-10 filled up to the frame at 1.0s, 1.05s shares its slot, 11-15 filled up to 1.5s
+    assert frame_count(path) == 16
+
+def test_full_queue_drops_frames_instead_of_blocking(tmp_path):
+    """A frame that does not fit in the queue is dropped and counted"""
+    recorder = VideoRecorder(str(tmp_path / "lecture.avi"), (64, 48), fps=10, fourcc="MJPG", queue_size=2)
+    recorder.start()
+    frame = np.zeros((48, 64, 3), np.uint8)
+    results = [recorder.add_frame(frame) for _ in range(50)]
+    recorder.stop()
+
+    assert recorder.frames_dropped > 0
+    assert recorder.frames_added + recorder.frames_dropped == 50
+    assert results.count(False) == recorder.frames_dropped
+
+def test_frames_before_start_are_ignored(tmp_path):
+    """Nothing is queued before start() or after stop()"""
+    recorder = VideoRecorder(str(tmp_path / "lecture.avi"), (64, 48))
+    assert not recorder.add_frame(np.zeros((48, 64, 3), np.uint8))
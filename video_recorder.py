@@ -0,0 +1,140 @@
+"""
+Lecture video recording on a separate encoder process.
+
+The capture thread hands frames to VideoRecorder.add_frame(), which puts them on a
+bounded queue without waiting. A separate process takes them off the queue and
+encodes them with cv2.VideoWriter, so encoding never competes with the preview or
+with audio capture for the GIL. When the encoder falls behind and the queue is
+full, frames are dropped rather than blocking the camera.
+
+Every frame carries its time since the recording started, on the same clock as
+the audio segments in audio_buffer.py. The encoder places frames by that time,
+repeating the previous frame over dropped or missing ones, so second N of the
+video is second N of the recording and lines up with the exported audio.
+"""
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+import numpy as np
+
+# Frame rate of the written file, codec and file type, and how many frames may wait for the encoder
+VIDEO_FPS = float(os.getenv("VIDEO_FPS", "15"))
+VIDEO_FOURCC = os.getenv("VIDEO_FOURCC", "mp4v")
+VIDEO_EXTENSION = os.getenv("VIDEO_EXTENSION", ".mp4")
+VIDEO_QUEUE_FRAMES = int(os.getenv("VIDEO_QUEUE_FRAMES", "30"))
+
+
+def encode_frames(path, size, fps, fourcc, frames):
+    """
+    Encoder process: write queued (timestamp, frame bytes) items until None arrives.
+
+    Args:
+        path (str): Video file to write
+        size (tuple): (width, height) of the frames
+        fps (float): Frame rate of the file
+        fourcc (str): Four-character codec code, e.g. mp4v or MJPG
+        frames (multiprocessing.Queue): Frames from VideoRecorder.add_frame
+    """
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        print(f"Error opening video file {path} with codec {fourcc}")
+    written = 0
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            timestamp, data = item
+            frame = np.frombuffer(data, np.uint8).reshape(height, width, 3)
+
+            # Position in the file follows the capture time: frames that arrive early for
+            # their slot are skipped, and gaps are filled by repeating this frame
+            slot = int(timestamp * fps)
+            if slot < written:
+                continue
+            for _ in range(slot - written + 1):
+                writer.write(frame)
+            written = slot + 1
+    finally:
+        writer.release()
+
+
+class VideoRecorder:
+    """Feeds frames to an encoder process through a bounded queue, dropping them when it is full."""
+
+    def __init__(self, path, size, fps=None, fourcc=None, queue_size=None):
+        """
+        Args:
+            path (str): Video file to write
+            size (tuple): (width, height) of the frames that will be added
+            fps (float, optional): Frame rate of the file; defaults to VIDEO_FPS
+            fourcc (str, optional): Codec; defaults to VIDEO_FOURCC
+            queue_size (int, optional): Frames that may wait for the encoder; defaults to VIDEO_QUEUE_FRAMES
+        """
+        self.path = path
+        self.size = tuple(size)
+        self.fps = fps or VIDEO_FPS
+        self.fourcc = fourcc or VIDEO_FOURCC
+        self.frames_added = 0
+        self.frames_dropped = 0
+        self.start_time = None
+
+        # Spawned, not forked, because the recorder forks from a multi-threaded Qt application
+        context = multiprocessing.get_context("spawn")
+        self._frames = context.Queue(maxsize=queue_size or VIDEO_QUEUE_FRAMES)
+        self._process = context.Process(
+            target=encode_frames, args=(path, self.size, self.fps, self.fourcc, self._frames),
+            daemon=True, name="video-encoder"
+        )
+
+    def start(self, start_time=None):
+        """
+        Start the encoder.
+
+        Args:
+            start_time (float, optional): time.time() at which the recording started; frame
+                timestamps are measured from it. Defaults to now.
+        """
+        self.start_time = time.time() if start_time is None else start_time
+        self._process.start()
+
+    def add_frame(self, frame, captured_at=None):
+        """
+        Queue a BGR frame for encoding without waiting.
+
+        Args:
+            frame (numpy.ndarray): Frame of the recorder's size; copied, so the buffer can be reused
+            captured_at (float, optional): time.time() when the frame was captured; defaults to now
+
+        Returns:
+            bool: False if the frame was dropped because the encoder is behind
+        """
+        if self.start_time is None:
+            return False
+        timestamp = (time.time() if captured_at is None else captured_at) - self.start_time
+        try:
+            self._frames.put_nowait((timestamp, frame.tobytes()))
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        self.frames_added += 1
+        return True
+
+    def stop(self, timeout=10):
+        """Let the encoder finish the queued frames and close the file."""
+        if self.start_time is None:
+            return
+        self.start_time = None
+        try:
+            self._frames.put(None, timeout=timeout)
+        except queue.Full:
+            print("Video encoder is not responding; stopping it")
+            self._process.terminate()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        print(f"Recorded {self.frames_added} frames to {self.path} ({self.frames_dropped} dropped)")
@@ -0,0 +1,125 @@
+"""
+Worker pool that runs generation jobs outside the HTTP processes.
+
+The API and the workers share a SQLite job store, so any API process can answer
+/status for any job:
+
+    JOB_STORE_BACKEND=sqlite JOB_EXECUTION=worker uvicorn api:app --workers 4
+    JOB_STORE_BACKEND=sqlite python worker.py --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+
+async def worker_loop(worker_id, concurrency, poll_interval, lease_seconds, metrics_port=0):
+    """Claim jobs from the shared store and run up to `concurrency` of them at once."""
+    # Imported here so every worker process builds its own client and database connection
+    import api
+    from job_store import SQLiteJobStore, run_leased
+    from metrics import start_http_server
+
+    if not isinstance(api.job_store, SQLiteJobStore):
+        raise SystemExit("worker.py requires JOB_STORE_BACKEND=sqlite so the API can see job results")
+
+    if metrics_port:
+        # Job and upstream metrics of this process, in the same format as the API's /metrics
+        start_http_server(metrics_port)
+        print(f"Worker {worker_id} serving metrics on port {metrics_port}")
+
+    if api.WARMUP_ON_STARTUP:
+        # Connect to OpenAI before the first claimed job needs it
+        await api.run_warm_up()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    running = set()
+    print(f"Worker {worker_id} started (concurrency={concurrency})")
+
+    while not stop.is_set():
+        # Fill free slots with queued jobs
+        while len(running) < concurrency:
+            job = api.job_store.claim(worker_id, lease_seconds)
+            if job is None:
+                break
+            task = asyncio.create_task(run_leased(api.job_store, job, worker_id, lease_seconds, api.run_job))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    # Let claimed jobs finish so they are not left for the lease to expire
+    if running:
+        print(f"Worker {worker_id} finishing {len(running)} job(s)")
+        await asyncio.gather(*running, return_exceptions=True)
+    print(f"Worker {worker_id} stopped")
+
+
+def run_worker(worker_id, concurrency, poll_interval, lease_seconds, metrics_port=0):
+    """Entry point of a worker process."""
+    asyncio.run(worker_loop(worker_id, concurrency, poll_interval, lease_seconds, metrics_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run generation workers for the Teaching Assistant API")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "8")),
+                        help="Jobs each process runs concurrently")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="Seconds to wait between polls when the queue is empty")
+    parser.add_argument("--lease-seconds", type=float, default=float(os.getenv("JOB_LEASE_SECONDS", "600")),
+                        help="Reclaim processing jobs not updated for this long")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("WORKER_METRICS_PORT", "0")),
+                        help="Serve /metrics from worker N on this port + N (default: disabled)")
+    args = parser.parse_args()
+
+    # Spawn so children never inherit the parent's sockets or database handles
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    worker_args = (args.concurrency, args.poll_interval, args.lease_seconds)
+
+    def start(index):
+        worker_id = f"{host}-{os.getpid()}-{index}"
+        metrics_port = args.metrics_port + index if args.metrics_port else 0
+        process = context.Process(target=run_worker, args=(worker_id, *worker_args, metrics_port), name=worker_id)
+        process.start()
+        return process
+
+    processes = [start(index) for index in range(args.processes)]
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # Respawn workers that crash until we are asked to stop
+    while not stopping:
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {process.name} exited with code {process.exitcode}, respawning")
+                processes[index] = start(index)
+        time.sleep(1)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()